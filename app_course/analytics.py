@@ -0,0 +1,187 @@
+"""
+Аналитика курсов: рост числа подписчиков, отток (подписка -> отписка) и конверсия подписки в оплату.
+
+Подписки и подтвержденные оплаты (вместе с архивными) читаются с реплики только нужными столбцами,
+пачками по chunk_size строк; каждая пачка сразу превращается в столбцы DataFrame, а показатели
+всех курсов считаются векторными операциями pandas (слияние, группировка), без цикла по строкам в Python.
+Результат перезаписывает сводные таблицы course_funnel_stats и course_monthly_stats одной транзакцией.
+
+Месяцы считаются в часовом поясе TIME_ZONE. Подписки, время которых неизвестно (созданные до появления
+subscribed_at), учитываются в воронке, но не попадают в когорты.
+pandas импортируется при запуске расчета, а не при запуске веб-процесса и воркера.
+"""
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet, Value
+from django.utils import timezone
+
+from app_user.models import Payment, PaymentArchive
+from config.db import iterate_queryset, use_replica
+from .models import Course, CourseFunnelStats, CourseMonthlyStats, CourseSubscription, CourseSubscriptionArchive
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Столбцы DataFrame и их типы.
+SUBSCRIPTION_COLUMNS = {
+    'course_id': 'int64', 'user_id': 'int64', 'subscribed': 'bool',
+    'subscribed_at': 'datetime64[ns, UTC]', 'unsubscribed_at': 'datetime64[ns, UTC]',
+}
+PAYMENT_COLUMNS = {'course_id': 'int64', 'user_id': 'int64'}
+
+
+@dataclass
+class AnalyticsResult:
+    """
+    Результат расчета аналитики.
+
+    Attrs:
+        - subscriptions: Количество обработанных подписок.
+        - courses: Количество курсов с рассчитанной воронкой.
+        - months: Количество строк помесячной статистики.
+    """
+    subscriptions: int = 0
+    courses: int = 0
+    months: int = 0
+
+
+def read_frame(querysets: Sequence[QuerySet], fields: Sequence[str], columns: Dict[str, str],
+               chunk_size: int) -> 'pd.DataFrame':
+    """
+    Читает поля fields из querysets пачками по chunk_size строк и возвращает их одним DataFrame.
+
+    :param querysets: QuerySet'ы (например, рабочей и архивной таблиц).
+    :param fields: Поля моделей или аннотации, которые выбираются через values_list.
+    :param columns: Имена столбцов DataFrame в порядке fields и их типы.
+    :param chunk_size: Размер пачки.
+    """
+    import pandas as pd
+
+    frames = []
+    for queryset in querysets:
+        rows = iterate_queryset(queryset.values_list(*fields), chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            frames.append(pd.DataFrame.from_records(chunk, columns=list(columns)).astype(columns))
+    if not frames:
+        return pd.DataFrame(columns=list(columns)).astype(columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def month_of(values: 'pd.Series', tz: str) -> 'pd.Series':
+    """
+    Возвращает первый день месяца (в часовом поясе tz) для каждого момента времени; пропуски сохраняются.
+
+    :param values: Моменты времени.
+    :param tz: Часовой пояс.
+    """
+    local = values.dt.tz_convert(tz).dt.tz_localize(None)
+    return local.dt.to_period('M').dt.start_time.dt.date
+
+
+def compute_metrics(subscriptions: 'pd.DataFrame', payments: 'pd.DataFrame',
+                    tz: str) -> Tuple['pd.DataFrame', 'pd.DataFrame']:
+    """
+    Вычисляет воронку и помесячную статистику курсов.
+    Возвращает (воронка с индексом course_id, помесячная статистика с индексом (course_id, month)).
+
+    :param subscriptions: Подписки: столбцы SUBSCRIPTION_COLUMNS.
+    :param payments: Подтвержденные оплаты: столбцы PAYMENT_COLUMNS.
+    :param tz: Часовой пояс, в котором считаются месяцы.
+    """
+    import pandas as pd
+
+    paid = payments.drop_duplicates().assign(paying=True)
+    subs = subscriptions.merge(paid, on=['course_id', 'user_id'], how='left')
+    subs['paying'] = subs['paying'].astype('boolean').fillna(False).astype(bool)
+    subs['churned'] = ~subs['subscribed']
+    subs['subscribed_month'] = month_of(subs['subscribed_at'], tz)
+    subs['unsubscribed_month'] = month_of(subs['unsubscribed_at'], tz)
+
+    funnel = subs.groupby('course_id').agg(
+        subscribers=('user_id', 'size'), active=('subscribed', 'sum'),
+        churned=('churned', 'sum'), paying=('paying', 'sum'),
+    )
+    funnel['churn_rate'] = funnel['churned'] / funnel['subscribers']
+    funnel['conversion_rate'] = funnel['paying'] / funnel['subscribers']
+
+    cohorts = subs.dropna(subset=['subscribed_month']).groupby(['course_id', 'subscribed_month']).agg(
+        subscribed=('user_id', 'size'), cohort_active=('subscribed', 'sum'), cohort_paying=('paying', 'sum'),
+    ).rename_axis(['course_id', 'month'])
+    unsubscribed = subs[subs['churned']].dropna(subset=['unsubscribed_month']).groupby(
+        ['course_id', 'unsubscribed_month']
+    ).size().rename_axis(['course_id', 'month']).rename('unsubscribed')
+    monthly = cohorts.join(unsubscribed, how='outer').fillna(0).astype('int64')
+    if monthly.empty:
+        monthly = pd.DataFrame(columns=['subscribed', 'cohort_active', 'cohort_paying', 'unsubscribed'],
+                               index=pd.MultiIndex.from_tuples([], names=['course_id', 'month']))
+    return funnel, monthly
+
+
+class CourseAnalyticsService:
+    """
+    Класс, описывающий расчет аналитики курсов.
+    Attrs:
+        - chunk_size: Количество строк, читаемых из базы данных за один запрос.
+    """
+    chunk_size = 10_000
+
+    @classmethod
+    def load(cls) -> Tuple['pd.DataFrame', 'pd.DataFrame']:
+        """
+        Читает подписки и подтвержденные оплаты курсов из рабочих и архивных таблиц.
+        Возвращает (подписки, оплаты).
+        """
+        subscriptions = read_frame(
+            [CourseSubscription.objects.order_by(),
+             CourseSubscriptionArchive.objects.annotate(subscribed=Value(False)).order_by()],
+            ('course_id', 'user_id', 'subscribed', 'subscribed_at', 'unsubscribed_at'), SUBSCRIPTION_COLUMNS,
+            cls.chunk_size
+        )
+        payments = read_frame(
+            [Payment.objects.filter(is_confirmed=True, paid_course__isnull=False).order_by(),
+             PaymentArchive.objects.filter(paid_course__isnull=False).order_by()],
+            ('paid_course_id', 'user_id'), PAYMENT_COLUMNS, cls.chunk_size
+        )
+        return subscriptions, payments
+
+    @classmethod
+    def save(cls, funnel: 'pd.DataFrame', monthly: 'pd.DataFrame') -> None:
+        """
+        Перезаписывает сводные таблицы. Показатели курсов, удаленных во время расчета, пропускаются.
+
+        :param funnel: Воронка курсов (см. compute_metrics).
+        :param monthly: Помесячная статистика курсов (см. compute_metrics).
+        """
+        computed_at = timezone.now()
+        with transaction.atomic():
+            course_ids = list(Course.objects.values_list('id', flat=True))
+            funnel = funnel[funnel.index.isin(course_ids)]
+            monthly = monthly[monthly.index.get_level_values('course_id').isin(course_ids)]
+
+            CourseFunnelStats.objects.all().delete()
+            CourseFunnelStats.objects.bulk_create(
+                (CourseFunnelStats(course_id=course_id, computed_at=computed_at, **row)
+                 for course_id, row in zip(funnel.index.tolist(), funnel.to_dict('records'))),
+                batch_size=cls.chunk_size
+            )
+            CourseMonthlyStats.objects.all().delete()
+            CourseMonthlyStats.objects.bulk_create(
+                (CourseMonthlyStats(course_id=course_id, month=month, **row)
+                 for (course_id, month), row in zip(monthly.index.tolist(), monthly.to_dict('records'))),
+                batch_size=cls.chunk_size
+            )
+
+    @classmethod
+    def refresh(cls) -> AnalyticsResult:
+        """
+        Пересчитывает аналитику всех курсов. Данные читаются с реплики, сводные таблицы записываются в основную базу.
+        """
+        with use_replica():
+            subscriptions, payments = cls.load()
+        funnel, monthly = compute_metrics(subscriptions, payments, settings.TIME_ZONE)
+        cls.save(funnel, monthly)
+        return AnalyticsResult(subscriptions=len(subscriptions), courses=len(funnel), months=len(monthly))
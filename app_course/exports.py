@@ -0,0 +1,31 @@
+from django.db.models import QuerySet
+
+from app_user.models import CustomUser
+from config.export import Exporter
+from .filters import SubscriptionExportFilter
+from .models import CourseSubscription
+
+
+class SubscriptionExporter(Exporter):
+    """
+    Выгрузка подписок с адресом подписчика и названием курса.
+    Модератор выгружает все подписки, автор курса - подписки на свои курсы.
+    """
+    name = 'subscriptions'
+    columns = (
+        ('id', 'id'),
+        ('email', 'user__email'),
+        ('course_id', 'course_id'),
+        ('course', 'course__name'),
+        ('subscribed', 'subscribed'),
+        ('subscribed_at', 'subscribed_at'),
+        ('unsubscribed_at', 'unsubscribed_at'),
+    )
+    filterset_class = SubscriptionExportFilter
+
+    @classmethod
+    def get_queryset(cls, user: CustomUser) -> QuerySet:
+        queryset = CourseSubscription.get_all_course_subscriptions()
+        if user.is_staff:
+            return queryset
+        return queryset.filter(course__created_by=user)
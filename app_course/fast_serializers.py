@@ -0,0 +1,103 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from app_image.serializers import ImageUrlBuilder
+from .models import Lesson
+from .subscription_index import get_subscription_index
+
+
+class LessonFastSerializer:
+    """
+    Сериализатор списка уроков только для чтения.
+
+    Строит словари напрямую из строк .values(), минуя поля DRF, и выдает
+    тот же JSON, что и LessonSerializer (порядок ключей совпадает).
+
+    Attrs:
+        - columns: Колонки, которые необходимо выбрать из QuerySet уроков.
+    """
+    columns = ('id', 'name', 'description', 'preview_id', 'preview__image', 'video_url', 'video_id', 'video__title',
+               'video__author_name', 'video__thumbnail_url', 'video__duration', 'course_id', 'position',
+               'created_by_id', 'created_by__email')
+
+    @classmethod
+    def to_representation(cls, rows: Iterable[Dict[str, Any]],
+                          image_url: Optional[ImageUrlBuilder] = None) -> List[Dict[str, Any]]:
+        """
+        Преобразует строки уроков в список словарей.
+
+        :param rows: Строки QuerySet.values(*columns).
+        :param image_url: Построитель URL изображений (общий для страницы).
+        """
+        image_url = image_url or ImageUrlBuilder()
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'description': row['description'],
+                'preview': {'id': row['preview_id'], 'image': image_url(row['preview__image'])},
+                'video_url': row['video_url'],
+                'video': {
+                    'id': row['video_id'],
+                    'title': row['video__title'],
+                    'author_name': row['video__author_name'],
+                    'thumbnail_url': row['video__thumbnail_url'],
+                    'duration': row['video__duration'],
+                } if row['video_id'] is not None else None,
+                'course': row['course_id'],
+                'position': row['position'],
+                'created_by': {'id': row['created_by_id'], 'email': row['created_by__email']},
+            }
+            for row in rows
+        ]
+
+
+class CourseFastSerializer:
+    """
+    Сериализатор списка курсов только для чтения.
+
+    Строит словари напрямую из строк .values(), минуя поля DRF, и выдает
+    тот же JSON, что и CourseSerializer. Уроки всех курсов страницы загружаются
+    одним запросом, флаги подписки - одним обращением к индексу подписок.
+
+    Attrs:
+        - columns: Колонки, которые необходимо выбрать из QuerySet курсов.
+    """
+    columns = ('id', 'name', 'preview_id', 'preview__image', 'description', 'created_by_id', 'created_by__email')
+
+    @classmethod
+    def to_representation(cls, rows: Iterable[Dict[str, Any]], user_id: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Преобразует строки курсов в список словарей.
+
+        :param rows: Строки QuerySet.values(*columns).
+        :param user_id: ID текущего пользователя (для флага подписки).
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        course_ids = [row['id'] for row in rows]
+        image_url = ImageUrlBuilder()
+
+        lessons = defaultdict(list)
+        lesson_rows = Lesson.objects.filter(course_id__in=course_ids).order_by('position', 'id').values(
+            *LessonFastSerializer.columns
+        )
+        for lesson in LessonFastSerializer.to_representation(lesson_rows, image_url):
+            lessons[lesson['course']].append(lesson)
+
+        subscribed_course_ids = get_subscription_index().subscribed_courses(user_id, course_ids)
+
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'preview': {'id': row['preview_id'], 'image': image_url(row['preview__image'])},
+                'description': row['description'],
+                'lessons': lessons[row['id']],
+                'lessons_count': len(lessons[row['id']]),
+                'created_by': {'id': row['created_by_id'], 'email': row['created_by__email']},
+                'subscribed': row['id'] in subscribed_course_ids,
+            }
+            for row in rows
+        ]
@@ -0,0 +1,37 @@
+import django_filters
+
+from .models import CourseSubscription
+
+
+class SubscriptionFeedFilter(django_filters.FilterSet):
+    """
+    Класс фильтров для ленты подписок пользователя.
+
+    Фильтры:
+    - updated_since: Курсы, обновленные начиная с указанного момента (ISO 8601).
+    """
+    updated_since = django_filters.IsoDateTimeFilter(field_name='course__updated_at', lookup_expr='gte')
+
+    class Meta:
+        model = CourseSubscription
+        fields = ['updated_since']
+
+
+class SubscriptionExportFilter(django_filters.FilterSet):
+    """
+    Класс фильтров для выгрузки подписок.
+
+    Фильтры:
+    - course: ID курса.
+    - subscribed: Статус подписки.
+    - subscribed_from, subscribed_to: Подписки, оформленные с даты subscribed_from включительно
+      по дату subscribed_to не включительно (ISO 8601).
+    """
+    course = django_filters.NumberFilter(field_name='course')
+    subscribed = django_filters.BooleanFilter(field_name='subscribed')
+    subscribed_from = django_filters.IsoDateTimeFilter(field_name='subscribed_at', lookup_expr='gte')
+    subscribed_to = django_filters.IsoDateTimeFilter(field_name='subscribed_at', lookup_expr='lt')
+
+    class Meta:
+        model = CourseSubscription
+        fields = ['course', 'subscribed', 'subscribed_from', 'subscribed_to']
@@ -0,0 +1,378 @@
+"""
+Массовый импорт курсов и уроков из CSV, JSON (массив объектов) и JSON Lines.
+
+Файл читается потоком: записи разбираются по одной и проверяются пачками по batch_size записей.
+На пачку выполняется по одному запросу для проверки уникальности названий курсов, уникальности названий
+уроков, существования превью, авторов и курсов уроков; корректные записи вставляются bulk_create
+в отдельной транзакции. Сигналы сохранения не отправляются, подписчики об импорте не уведомляются.
+Метаданные видео уроков загружаются в фоне после фиксации пачки.
+
+Запись описывает курс или урок (поле type):
+- course: name, description, cost, preview (ID изображения курса), author (почта автора);
+- lesson: name, description, video_url (ссылка на YouTube), course (название курса),
+  preview (ID изображения урока), author.
+Необязательны cost, preview и author (по умолчанию автор - пользователь, выполняющий импорт).
+Урок может ссылаться на курс, созданный раньше или в предыдущих записях файла. Уроки добавляются в конец курса
+в порядке записей файла.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from app_image.models import CourseImage, LessonImage
+from app_image.videos import VideoMetadataService, youtube_video_id
+from app_user.models import CustomUser
+from .models import Course, Lesson
+from .services import LessonOrderService
+from .validators import YouTubeUrlValidator
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'json', 'jsonl')
+
+Record = Union[Dict[str, Any], Exception]
+Errors = Dict[str, List[str]]
+
+
+class ImportFormatError(Exception):
+    """
+    Файл импорта не удается разобрать.
+    """
+
+
+@dataclass
+class ImportResult:
+    """
+    Результат импорта.
+
+    Attrs:
+        - rows: Количество обработанных записей.
+        - courses: Количество созданных курсов.
+        - lessons: Количество созданных уроков.
+        - errors: Ошибки записей: номер записи и ошибки по полям (не больше max_errors).
+        - errors_total: Количество записей с ошибками.
+        - seconds: Длительность импорта.
+    """
+    rows: int = 0
+    courses: int = 0
+    lessons: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    errors_total: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def iter_csv(file: IO[bytes]) -> Iterator[Record]:
+    """
+    Возвращает записи CSV с заголовком.
+
+    :param file: Файл, открытый в двоичном режиме.
+    """
+    yield from csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+
+
+def iter_jsonl(file: IO[bytes]) -> Iterator[Record]:
+    """
+    Возвращает записи JSON Lines. Строка с некорректным JSON возвращается как исключение.
+
+    :param file: Файл, открытый в двоичном режиме.
+    """
+    for line in io.TextIOWrapper(file, encoding='utf-8-sig'):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield error
+
+
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json(file: IO[bytes], chunk_size: int = 1 << 16) -> Iterator[Record]:
+    """
+    Возвращает элементы JSON-массива, читая файл частями по chunk_size символов:
+    в памяти держится только непрочитанный остаток текущей части.
+
+    :param file: Файл, открытый в двоичном режиме.
+    :param chunk_size: Размер части.
+    :raises ImportFormatError: Если файл не является JSON-массивом.
+    """
+    decoder = json.JSONDecoder()
+    text = io.TextIOWrapper(file, encoding='utf-8-sig')
+    buffer, index, opened, eof = '', 0, False, False
+    while True:
+        index = SEPARATORS.match(buffer, index).end()
+        if index < len(buffer):
+            if not opened:
+                if buffer[index] != '[':
+                    raise ImportFormatError('Файл JSON должен содержать массив записей')
+                opened, index = True, index + 1
+                continue
+            if buffer[index] == ']':
+                return
+            try:
+                record, index = decoder.raw_decode(buffer, index)
+            except ValueError as error:
+                if eof:
+                    raise ImportFormatError(f'Некорректный JSON: {error}')
+            else:
+                yield record
+                continue
+        elif eof:
+            raise ImportFormatError('Неожиданный конец файла JSON')
+        chunk = text.read(chunk_size)
+        buffer, index, eof = buffer[index:] + chunk, 0, not chunk
+
+
+PARSERS = {'csv': iter_csv, 'json': iter_json, 'jsonl': iter_jsonl}
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """
+    Возвращает формат файла по расширению имени или None, если формат не поддерживается.
+
+    :param filename: Имя файла.
+    """
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else None
+
+
+def text_value(record: Dict[str, Any], name: str) -> str:
+    value = record.get(name)
+    return '' if value is None else str(value).strip()
+
+
+class CourseImportService:
+    """
+    Класс, описывающий массовый импорт курсов и уроков.
+    Attrs:
+        - batch_size: Количество записей в пачке (одна транзакция).
+        - max_errors: Количество ошибок записей, которые сохраняются в результате.
+        - url_validator, youtube_validator: Проверки ссылки на видео урока (те же, что в LessonSerializer).
+    """
+    batch_size = 500
+    max_errors = 1000
+    url_validator = URLValidator()
+    youtube_validator = YouTubeUrlValidator(field='video_url')
+
+    @classmethod
+    def import_file(cls, file: IO[bytes], file_format: str, user: CustomUser,
+                    batch_size: Optional[int] = None) -> ImportResult:
+        """
+        Импортирует курсы и уроки из файла.
+
+        :param file: Файл, открытый в двоичном режиме.
+        :param file_format: Формат файла: csv, json или jsonl.
+        :param user: Автор записей, в которых автор не указан.
+        :param batch_size: Размер пачки (по умолчанию - batch_size).
+        :raises ImportFormatError: Если файл не удается разобрать.
+        """
+        batch_size = batch_size or cls.batch_size
+        result, started = ImportResult(), time.perf_counter()
+        records = enumerate(PARSERS[file_format](file), 1)
+        try:
+            while batch := list(islice(records, batch_size)):
+                cls.import_batch(batch, user, result)
+                result.rows += len(batch)
+                result.seconds = time.perf_counter() - started
+                logger.info(f'Импорт: обработано записей {result.rows}, {result.rows_per_second:.0f} записей/с')
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise ImportFormatError(f'Ошибка разбора файла после записи {result.rows}: {error}')
+        result.seconds = time.perf_counter() - started
+        return result
+
+    @classmethod
+    def import_batch(cls, batch: List[Tuple[int, Record]], user: CustomUser, result: ImportResult) -> None:
+        """
+        Проверяет и вставляет пачку записей в одной транзакции. Если вставка нарушила уникальность
+        названия (запись с тем же названием создана одновременно с импортом), пачка проверяется повторно.
+
+        :param batch: Пары (номер записи, запись).
+        :param user: Автор записей, в которых автор не указан.
+        :param result: Результат импорта, в который добавляются счетчики и ошибки.
+        """
+        for attempt in range(2):
+            errors: Dict[int, Errors] = {}
+            try:
+                with transaction.atomic():
+                    courses, lessons = cls.validate_batch(batch, user, errors)
+                    Course.objects.bulk_create(courses)
+                    lessons = cls.resolve_courses(lessons, errors)
+                    LessonOrderService.assign_positions(lessons)
+                    for lesson in lessons:
+                        lesson.video_id = youtube_video_id(lesson.video_url)
+                    VideoMetadataService.register(lesson.video_id for lesson in lessons)
+                    Lesson.objects.bulk_create(lessons)
+            except IntegrityError:
+                if attempt:
+                    raise
+            else:
+                break
+        result.courses += len(courses)
+        result.lessons += len(lessons)
+        result.errors_total += len(errors)
+        for number in sorted(errors)[:max(cls.max_errors - len(result.errors), 0)]:
+            result.errors.append({'row': number, 'errors': errors[number]})
+
+    @classmethod
+    def validate_batch(cls, batch: List[Tuple[int, Record]], user: CustomUser,
+                       errors: Dict[int, Errors]) -> Tuple[List[Course], List[Tuple[int, Lesson, str]]]:
+        """
+        Проверяет записи пачки. Возвращает курсы и уроки (с номером записи и названием курса),
+        готовые к вставке; ошибки записываются в errors по номеру записи.
+
+        :param batch: Пары (номер записи, запись).
+        :param user: Автор записей, в которых автор не указан.
+        :param errors: Ошибки записей.
+        """
+        rows: List[Tuple[int, str, Dict[str, Any]]] = []
+        for number, record in batch:
+            if isinstance(record, Exception):
+                errors[number] = {'record': [f'Некорректная запись: {record}']}
+            elif not isinstance(record, dict):
+                errors[number] = {'record': ['Запись должна быть объектом']}
+            elif text_value(record, 'type') not in ('course', 'lesson'):
+                errors[number] = {'type': ['Тип записи должен быть course или lesson']}
+            else:
+                rows.append((number, text_value(record, 'type'), record))
+
+        authors = dict(CustomUser.objects.filter(
+            email__in={text_value(record, 'author') for _, _, record in rows} - {''}
+        ).values_list('email', 'id'))
+        course_rows = [(number, record) for number, kind, record in rows if kind == 'course']
+        lesson_rows = [(number, record) for number, kind, record in rows if kind == 'lesson']
+        taken_course_names = cls.taken_names(Course, course_rows)
+        taken_lesson_names = cls.taken_names(Lesson, lesson_rows)
+        course_images = cls.existing_ids(CourseImage, course_rows)
+        lesson_images = cls.existing_ids(LessonImage, lesson_rows)
+
+        courses, lessons = [], []
+        for number, record in course_rows:
+            row_errors: Errors = {}
+            fields = cls.common_fields(record, Course, taken_course_names, course_images, authors, user, row_errors)
+            cost = text_value(record, 'cost')
+            if cost:
+                try:
+                    fields['cost'] = Decimal(cost)
+                    if fields['cost'] < 0 or fields['cost'] >= 10 ** 8:
+                        raise InvalidOperation
+                except InvalidOperation:
+                    row_errors['cost'] = ['Стоимость должна быть числом от 0 до 99999999.99']
+            if row_errors:
+                errors[number] = row_errors
+            else:
+                courses.append(Course(**fields))
+
+        for number, record in lesson_rows:
+            row_errors = {}
+            fields = cls.common_fields(record, Lesson, taken_lesson_names, lesson_images, authors, user, row_errors)
+            fields['video_url'] = text_value(record, 'video_url')
+            try:
+                if not fields['video_url']:
+                    raise ValidationError('Обязательное поле')
+                cls.url_validator(fields['video_url'])
+                cls.youtube_validator(fields)
+            except ValidationError as error:
+                row_errors['video_url'] = error.messages
+            course_name = text_value(record, 'course')
+            if not course_name:
+                row_errors['course'] = ['Обязательное поле']
+            if row_errors:
+                errors[number] = row_errors
+            else:
+                lessons.append((number, Lesson(**fields), course_name))
+        return courses, lessons
+
+    @classmethod
+    def common_fields(cls, record: Dict[str, Any], model: type, taken_names: Set[str], image_ids: Set[int],
+                      authors: Dict[str, int], user: CustomUser, row_errors: Errors) -> Dict[str, Any]:
+        """
+        Проверяет поля, общие для курса и урока: название, описание, превью и автора.
+        Возвращает значения полей; название добавляется в taken_names, чтобы повтор в пачке был ошибкой.
+        """
+        name, description = text_value(record, 'name'), text_value(record, 'description')
+        max_length = model._meta.get_field('name').max_length
+        if not name:
+            row_errors['name'] = ['Обязательное поле']
+        elif len(name) > max_length:
+            row_errors['name'] = [f'Название длиннее {max_length} символов']
+        elif name.lower() in taken_names:
+            row_errors['name'] = ['Название уже занято']
+        else:
+            taken_names.add(name.lower())
+        if not description:
+            row_errors['description'] = ['Обязательное поле']
+        fields = {'name': name, 'description': description, 'created_by_id': user.id}
+
+        preview = text_value(record, 'preview')
+        if preview:
+            if not preview.isdigit() or int(preview) not in image_ids:
+                row_errors['preview'] = [f'Изображение {preview} не найдено']
+            else:
+                fields['preview_id'] = int(preview)
+        author = text_value(record, 'author')
+        if author:
+            if author not in authors:
+                row_errors['author'] = [f'Пользователь {author} не найден']
+            else:
+                fields['created_by_id'] = authors[author]
+        return fields
+
+    @staticmethod
+    def taken_names(model: type, rows: List[Tuple[int, Dict[str, Any]]]) -> Set[str]:
+        """
+        Возвращает названия записей пачки (в нижнем регистре), которые уже заняты, одним запросом
+        по уникальному индексу lower(name).
+        """
+        names = {text_value(record, 'name').lower() for _, record in rows} - {''}
+        if not names:
+            return set()
+        return set(model.objects.annotate(name_lower=Lower('name')).filter(name_lower__in=names)
+                   .values_list('name_lower', flat=True))
+
+    @staticmethod
+    def existing_ids(model: type, rows: List[Tuple[int, Dict[str, Any]]]) -> Set[int]:
+        """
+        Возвращает ID изображений, на которые ссылаются записи пачки и которые существуют, одним запросом.
+        """
+        ids = {int(value) for value in (text_value(record, 'preview') for _, record in rows) if value.isdigit()}
+        if not ids:
+            return set()
+        return set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+
+    @staticmethod
+    def resolve_courses(lessons: List[Tuple[int, Lesson, str]], errors: Dict[int, Errors]) -> List[Lesson]:
+        """
+        Находит курсы уроков по названию (без учета регистра) одним запросом.
+        Уроки, курс которых не найден, записываются в errors.
+
+        :param lessons: Тройки (номер записи, урок, название курса).
+        :param errors: Ошибки записей.
+        """
+        names = {course_name.lower() for _, _, course_name in lessons}
+        course_ids = dict(Course.objects.annotate(name_lower=Lower('name')).filter(name_lower__in=names)
+                          .values_list('name_lower', 'id')) if names else {}
+        resolved: List[Lesson] = []
+        for number, lesson, course_name in lessons:
+            lesson.course_id = course_ids.get(course_name.lower())
+            if lesson.course_id is None:
+                errors[number] = {'course': [f'Курс "{course_name}" не найден']}
+            else:
+                resolved.append(lesson)
+        return resolved
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_course.importer import FORMATS, CourseImportService, ImportFormatError, detect_format
+from app_user.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Import courses and lessons from a CSV, JSON or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--format', choices=FORMATS, help='File format (detected from the extension by default)')
+        parser.add_argument('--author', required=True, help='Email of the author for records without an author')
+        parser.add_argument('--batch-size', type=int, default=CourseImportService.batch_size,
+                            help='Records validated and inserted per transaction')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError(f'Cannot detect the file format, use --format ({", ".join(FORMATS)})')
+        author = CustomUser.objects.filter(email=options['author']).first()
+        if author is None:
+            raise CommandError(f'User {options["author"]} does not exist')
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = CourseImportService.import_file(file, file_format, author, options['batch_size'])
+        except ImportFormatError as error:
+            raise CommandError(str(error))
+
+        for error in result.errors:
+            fields = '; '.join(f'{name}: {" ".join(messages)}' for name, messages in error['errors'].items())
+            self.stderr.write(f'Record {error["row"]}: {fields}')
+        self.stdout.write(
+            f'Imported {result.courses} courses and {result.lessons} lessons from {result.rows} records '
+            f'({result.errors_total} with errors) in {result.seconds:.1f} s, {result.rows_per_second:.0f} records/s'
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_course.subscription_index import get_subscription_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild subscription index from the database'
+
+    def handle(self, *args, **options):
+        count = get_subscription_index().rebuild()
+        self.stdout.write(f'Subscription index rebuilt: {count} active subscriptions')
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 05:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_course', '0004_course_updated_at_lesson_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coursesubscription',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='app_course.course', verbose_name='Курс'),
+        ),
+        migrations.AddIndex(
+            model_name='coursesubscription',
+            index=models.Index(condition=models.Q(('subscribed', True)), fields=['user', 'id'], name='course_subs_active_user_idx'),
+        ),
+    ]
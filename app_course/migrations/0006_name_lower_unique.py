@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 05:18
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+# Названия, совпадающие без учета регистра, получают суффикс с ID записи
+# (кроме самой ранней), чтобы уникальный индекс по lower(name) мог быть создан.
+RENAME_DUPLICATES_SQL = """
+    UPDATE {table} AS target
+    SET name = left(target.name, {max_length} - length(' (' || target.id || ')')) || ' (' || target.id || ')'
+    FROM (
+        SELECT id, row_number() OVER (PARTITION BY lower(name) ORDER BY id) AS position FROM {table}
+    ) AS duplicate
+    WHERE duplicate.id = target.id AND duplicate.position > 1
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_course', '0005_coursesubscription_active_user_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(RENAME_DUPLICATES_SQL.format(table='courses', max_length=255), migrations.RunSQL.noop),
+        migrations.RunSQL(RENAME_DUPLICATES_SQL.format(table='lessons', max_length=200), migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='course',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='courses_name_lower_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='lessons_name_lower_uniq'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 06:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app_course', '0006_name_lower_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursesubscription',
+            name='unsubscribed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время отписки'),
+        ),
+        # Время отписки существующих отмененных подписок неизвестно: срок хранения отсчитывается от миграции.
+        migrations.RunSQL(
+            sql='UPDATE course_subscriptions SET unsubscribed_at = now() WHERE NOT subscribed',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.CreateModel(
+            name='CourseSubscriptionArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID подписки')),
+                ('unsubscribed_at', models.DateTimeField(blank=True, null=True, verbose_name='Время отписки')),
+                ('archived_at', models.DateTimeField(verbose_name='Время переноса в архив')),
+                ('course', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='app_course.course', verbose_name='Курс')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивная подписка',
+                'verbose_name_plural': 'Архивные подписки',
+                'db_table': 'course_subscriptions_archive',
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2 on 2026-10-19 06:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_course', '0007_subscription_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseFunnelStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='funnel_stats', serialize=False, to='app_course.course', verbose_name='Курс')),
+                ('subscribers', models.PositiveIntegerField(default=0, verbose_name='Подписывались на курс')),
+                ('active', models.PositiveIntegerField(default=0, verbose_name='Подписаны сейчас')),
+                ('churned', models.PositiveIntegerField(default=0, verbose_name='Отписались')),
+                ('paying', models.PositiveIntegerField(default=0, verbose_name='Оплатили курс')),
+                ('churn_rate', models.FloatField(default=0, verbose_name='Доля отписавшихся')),
+                ('conversion_rate', models.FloatField(default=0, verbose_name='Доля оплативших')),
+                ('computed_at', models.DateTimeField(verbose_name='Время расчета')),
+            ],
+            options={
+                'verbose_name': 'Воронка курса',
+                'verbose_name_plural': 'Воронки курсов',
+                'db_table': 'course_funnel_stats',
+            },
+        ),
+        # Время подписки существующих подписок неизвестно: поле добавляется без значения по умолчанию,
+        # чтобы такие подписки не попали в когорту месяца миграции.
+        migrations.AddField(
+            model_name='coursesubscription',
+            name='subscribed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время подписки'),
+        ),
+        migrations.AlterField(
+            model_name='coursesubscription',
+            name='subscribed_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True, verbose_name='Время подписки'),
+        ),
+        migrations.AddField(
+            model_name='coursesubscriptionarchive',
+            name='subscribed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время подписки'),
+        ),
+        migrations.CreateModel(
+            name='CourseMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('subscribed', models.PositiveIntegerField(default=0, verbose_name='Подписались')),
+                ('unsubscribed', models.PositiveIntegerField(default=0, verbose_name='Отписались')),
+                ('cohort_active', models.PositiveIntegerField(default=0, verbose_name='Из подписавшихся подписаны сейчас')),
+                ('cohort_paying', models.PositiveIntegerField(default=0, verbose_name='Из подписавшихся оплатили курс')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='app_course.course', verbose_name='Курс')),
+            ],
+            options={
+                'verbose_name': 'Статистика курса за месяц',
+                'verbose_name_plural': 'Статистика курсов по месяцам',
+                'db_table': 'course_monthly_stats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='coursemonthlystats',
+            constraint=models.UniqueConstraint(fields=('course', 'month'), name='course_monthly_stats_uniq'),
+        ),
+    ]
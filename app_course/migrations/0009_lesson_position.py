@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-19 06:58
+
+from django.db import migrations, models
+
+# Существующие уроки курса получают позиции в порядке ID с шагом 1024 (LessonOrderService.position_step).
+NUMBER_LESSONS_SQL = """
+    UPDATE lessons
+    SET position = numbered.position * 1024
+    FROM (
+        SELECT id, row_number() OVER (PARTITION BY course_id ORDER BY id) AS position FROM lessons
+    ) AS numbered
+    WHERE numbered.id = lessons.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_course', '0008_course_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='position',
+            field=models.BigIntegerField(default=0, verbose_name='Позиция в курсе'),
+        ),
+        migrations.RunSQL(NUMBER_LESSONS_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'position'], name='lessons_course_position_idx'),
+        ),
+    ]
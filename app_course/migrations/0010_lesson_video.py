@@ -0,0 +1,60 @@
+# Generated by Django 4.2 on 2026-10-19 07:05
+
+import re
+from urllib.parse import parse_qs, urlparse
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия app_image.videos.youtube_video_id на момент миграции: миграция не зависит от изменений модуля.
+VIDEO_ID_RE = re.compile(r'^[\w-]{1,64}$')
+VIDEO_PATH_PREFIXES = ('embed', 'shorts', 'live', 'v')
+
+
+def youtube_video_id(url):
+    parsed = urlparse(url or '')
+    host = (parsed.hostname or '').lower()
+    parts = [part for part in parsed.path.split('/') if part]
+    if host == 'youtu.be':
+        video_id = parts[0] if parts else ''
+    elif host == 'youtube.com' or host.endswith('.youtube.com'):
+        if parts == ['watch']:
+            video_id = parse_qs(parsed.query).get('v', [''])[0]
+        else:
+            video_id = parts[1] if len(parts) > 1 and parts[0] in VIDEO_PATH_PREFIXES else ''
+    else:
+        return None
+    return video_id if VIDEO_ID_RE.match(video_id) else None
+
+
+def link_videos(apps, schema_editor):
+    """
+    Связывает существующие уроки с видео по ссылке. Метаданные загрузит задача refresh_video_metadata.
+    """
+    Lesson = apps.get_model('app_course', 'Lesson')
+    Video = apps.get_model('app_image', 'Video')
+    lessons = []
+    for lesson in Lesson.objects.only('id', 'video_url').iterator(chunk_size=2000):
+        lesson.video_id = youtube_video_id(lesson.video_url)
+        if lesson.video_id:
+            lessons.append(lesson)
+    Video.objects.bulk_create([Video(id=video_id) for video_id in {lesson.video_id for lesson in lessons}],
+                              batch_size=2000, ignore_conflicts=True)
+    Lesson.objects.bulk_update(lessons, ['video'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_image', '0002_video'),
+        ('app_course', '0009_lesson_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='video',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lessons', to='app_image.video', verbose_name='Видео'),
+        ),
+        migrations.RunPython(link_videos, migrations.RunPython.noop),
+    ]
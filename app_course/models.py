@@ -1,8 +1,10 @@
 from typing import List, Optional
 
 from django.db import models
+from django.db.models.functions import Coalesce, Lower
+from django.utils import timezone
 
-from app_image.models import CourseImage, LessonImage
+from app_image.models import CourseImage, LessonImage, Video
 
 
 class Course(models.Model):
@@ -19,6 +21,9 @@ class Course(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Время обновления')
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='courses_name_lower_uniq'),
+        ]
         verbose_name = 'Курс'
         verbose_name_plural = 'Курсы'
         db_table = 'courses'
@@ -54,11 +59,22 @@ class Lesson(models.Model):
     preview = models.ForeignKey(LessonImage, on_delete=models.SET_DEFAULT, default=1, related_name='lessons',
                                 verbose_name='Превью')
     video_url = models.URLField(verbose_name='Ссылка на видео')
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='lessons',
+                              verbose_name='Видео')
     created_by = models.ForeignKey('app_user.CustomUser', on_delete=models.CASCADE,
                                    verbose_name='Создано пользователем')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Время обновления')
+    # Позиции уроков курса идут с шагом (см. LessonOrderService), чтобы урок можно было
+    # переместить между соседями, изменив только его позицию.
+    position = models.BigIntegerField(default=0, verbose_name='Позиция в курсе')
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='lessons_name_lower_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'position'], name='lessons_course_position_idx'),
+        ]
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
         db_table = 'lessons'
@@ -83,6 +99,13 @@ class Lesson(models.Model):
         except cls.DoesNotExist:
             return None
 
+    @classmethod
+    def get_for_course(cls, course_id: int) -> List['Lesson']:
+        """
+        Возвращает уроки курса в порядке их позиций
+        """
+        return cls.objects.filter(course_id=course_id).order_by('position', 'id')
+
 
 class CourseSubscription(models.Model):
     """
@@ -91,9 +114,15 @@ class CourseSubscription(models.Model):
     user = models.ForeignKey('app_user.CustomUser', on_delete=models.CASCADE, verbose_name='Пользователь')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='subscriptions', verbose_name='Курс')
     subscribed = models.BooleanField(default=False, verbose_name='Статус подписки')
+    subscribed_at = models.DateTimeField(default=timezone.now, blank=True, null=True, verbose_name='Время подписки')
+    unsubscribed_at = models.DateTimeField(blank=True, null=True, verbose_name='Время отписки')
 
     class Meta:
         unique_together = ('user', 'course')
+        indexes = [
+            models.Index(fields=['user', 'id'], condition=models.Q(subscribed=True),
+                         name='course_subs_active_user_idx'),
+        ]
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
         db_table = 'course_subscriptions'
@@ -107,3 +136,110 @@ class CourseSubscription(models.Model):
         Возвращает список всех подписок на курс
         """
         return cls.objects.all()
+
+    @classmethod
+    def get_active_for_user(cls, user_id: int) -> List['CourseSubscription']:
+        """
+        Возвращает активные подписки пользователя вместе с данными курса
+        (превью, создатель и количество уроков загружаются тем же запросом)
+        """
+        lessons_count = (
+            Lesson.objects.filter(course=models.OuterRef('course'))
+            .order_by()
+            .values('course')
+            .annotate(count=models.Count('id'))
+            .values('count')
+        )
+        return (
+            cls.objects.filter(user_id=user_id, subscribed=True)
+            .select_related('course', 'course__preview', 'course__created_by')
+            .annotate(lessons_count=Coalesce(models.Subquery(lessons_count), 0))
+        )
+
+
+class CourseSubscriptionArchive(models.Model):
+    """
+    Модель, описывающая архивную подписку: давно отмененная подписка, перенесенная из course_subscriptions
+    (см. app_course.services.SubscriptionArchiveService).
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID подписки')
+    user = models.ForeignKey('app_user.CustomUser', on_delete=models.CASCADE, verbose_name='Пользователь')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_index=False, verbose_name='Курс')
+    subscribed_at = models.DateTimeField(blank=True, null=True, verbose_name='Время подписки')
+    unsubscribed_at = models.DateTimeField(blank=True, null=True, verbose_name='Время отписки')
+    archived_at = models.DateTimeField(verbose_name='Время переноса в архив')
+
+    class Meta:
+        verbose_name = 'Архивная подписка'
+        verbose_name_plural = 'Архивные подписки'
+        db_table = 'course_subscriptions_archive'
+
+    def __str__(self):
+        return f'{self.user} {self.course_id}'
+
+
+class CourseFunnelStats(models.Model):
+    """
+    Модель, описывающая воронку курса: подписчики, отток и конверсия подписки в оплату
+    (см. app_course.analytics.CourseAnalyticsService).
+    Учитываются подписки и оплаты, в том числе перенесенные в архив.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='funnel_stats',
+                                  verbose_name='Курс')
+    subscribers = models.PositiveIntegerField(default=0, verbose_name='Подписывались на курс')
+    active = models.PositiveIntegerField(default=0, verbose_name='Подписаны сейчас')
+    churned = models.PositiveIntegerField(default=0, verbose_name='Отписались')
+    paying = models.PositiveIntegerField(default=0, verbose_name='Оплатили курс')
+    churn_rate = models.FloatField(default=0, verbose_name='Доля отписавшихся')
+    conversion_rate = models.FloatField(default=0, verbose_name='Доля оплативших')
+    computed_at = models.DateTimeField(verbose_name='Время расчета')
+
+    class Meta:
+        verbose_name = 'Воронка курса'
+        verbose_name_plural = 'Воронки курсов'
+        db_table = 'course_funnel_stats'
+
+    def __str__(self):
+        return f'{self.course_id} {self.subscribers}'
+
+    @classmethod
+    def get_for_course(cls, course_id: int) -> Optional['CourseFunnelStats']:
+        """
+        Возвращает воронку курса или None, если она еще не рассчитана.
+
+        :param course_id: ID курса.
+        """
+        return cls.objects.filter(course_id=course_id).first()
+
+
+class CourseMonthlyStats(models.Model):
+    """
+    Модель, описывающая помесячную статистику курса: сколько пользователей подписалось и отписалось
+    за месяц и сколько подписавшихся в этом месяце (когорта) подписаны сейчас и оплатили курс.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='monthly_stats', verbose_name='Курс')
+    month = models.DateField(verbose_name='Месяц')
+    subscribed = models.PositiveIntegerField(default=0, verbose_name='Подписались')
+    unsubscribed = models.PositiveIntegerField(default=0, verbose_name='Отписались')
+    cohort_active = models.PositiveIntegerField(default=0, verbose_name='Из подписавшихся подписаны сейчас')
+    cohort_paying = models.PositiveIntegerField(default=0, verbose_name='Из подписавшихся оплатили курс')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'month'], name='course_monthly_stats_uniq'),
+        ]
+        verbose_name = 'Статистика курса за месяц'
+        verbose_name_plural = 'Статистика курсов по месяцам'
+        db_table = 'course_monthly_stats'
+
+    def __str__(self):
+        return f'{self.course_id} {self.month}'
+
+    @classmethod
+    def get_for_course(cls, course_id: int) -> List['CourseMonthlyStats']:
+        """
+        Возвращает помесячную статистику курса по возрастанию месяца.
+
+        :param course_id: ID курса.
+        """
+        return cls.objects.filter(course_id=course_id).order_by('month')
@@ -1,7 +1,18 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class Pagination(PageNumberPagination):
     page_size = 3
     page_size_query_param = 'page_size'
     max_page_size = 50
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    """
+    Пагинация ленты подписок по ключу (ID подписки) вместо номера страницы:
+    каждая страница читается по индексу без OFFSET и без подсчета общего количества.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = '-id'
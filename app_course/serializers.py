@@ -1,15 +1,76 @@
-from typing import Dict, Any
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, Iterator, List, Optional
 
+from django.db import IntegrityError, models, transaction
+from django.http import Http404
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
 from app_image.models import CourseImage, LessonImage
-from app_image.serializers import CourseImageSerializer, LessonImageSerializer
-from .models import Course, Lesson, CourseSubscription
+from app_image.serializers import CourseImageSerializer, LessonImageSerializer, VideoSerializer
+from app_image.videos import VideoMetadataService, youtube_video_id
+from .importer import FORMATS as IMPORT_FORMATS, detect_format
+from .models import Course, CourseFunnelStats, CourseMonthlyStats, Lesson, CourseSubscription
+from .services import LessonOrderService, SubscriptionService
+from .subscription_index import get_subscription_index
 from .validators import YouTubeUrlValidator
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class UniqueNameMixin:
+    """
+    Примесь для сериализаторов моделей с уникальным без учета регистра названием.
+
+    Уникальность проверяется не отдельным запросом перед сохранением, а уникальным индексом
+    по lower(name): нарушение ограничения преобразуется в ту же ошибку 400, что возвращал
+    UniqueValidator.
+
+    Attrs:
+        - name_constraint: Имя ограничения уникальности названия в базе данных.
+    """
+    name_constraint: str
+
+    def create(self, validated_data: Dict[str, Any]) -> models.Model:
+        with self.unique_name_errors():
+            return super().create(validated_data)
+
+    def update(self, instance: models.Model, validated_data: Dict[str, Any]) -> models.Model:
+        with self.unique_name_errors():
+            return super().update(instance, validated_data)
+
+    @contextmanager
+    def unique_name_errors(self) -> Iterator[None]:
+        """
+        Преобразует нарушение ограничения уникальности названия в ValidationError.
+        Внутри транзакции запрос выполняется в точке сохранения, чтобы после ошибки
+        транзакция оставалась рабочей; в режиме autocommit точка сохранения не нужна.
+        """
+        in_transaction = transaction.get_connection().in_atomic_block
+        try:
+            with transaction.atomic() if in_transaction else nullcontext():
+                yield
+        except IntegrityError as error:
+            diag = getattr(error.__cause__, 'diag', None)
+            if getattr(diag, 'constraint_name', None) != self.name_constraint:
+                raise
+            raise serializers.ValidationError({'name': [UniqueValidator.message]}, code='unique')
+
+
+class UpdateFieldsMixin:
+    """
+    Примесь для сериализаторов моделей: обновление сохраняет не всю строку, а только переданные поля
+    и поля auto_now (время обновления) одним запросом UPDATE.
+    """
+
+    def update(self, instance: models.Model, validated_data: Dict[str, Any]) -> models.Model:
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        auto_now_fields = [field.name for field in instance._meta.concrete_fields if getattr(field, 'auto_now', False)]
+        instance.save(update_fields=[*validated_data, *auto_now_fields])
+        return instance
+
+
+class LessonSerializer(UniqueNameMixin, UpdateFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Lesson.
 
@@ -19,28 +80,67 @@ class LessonSerializer(serializers.ModelSerializer):
     - description: Строка с описанием урока.
     - preview: Идентификатор превью урока (ссылка на модель LessonImage).
     - video_url: Строка с URL-адресом видео урока.
+    - video: ID и метаданные видео YouTube (null, если ID видео не удалось извлечь из ссылки).
     - course: Идентификатор курса, к которому принадлежит урок.
+    - position: Позиция урока в курсе (только для чтения).
     - created_by: ID и почта создателя урока (ссылка на модель CustomUser).
 
     Поле preview не является обязательным для заполнения.
-    Поле name проверяется на уникальность.
+    Поле name уникально без учета регистра (ограничение lessons_name_lower_uniq).
     Поле video_url принимает только ссылки на YouTube.
+    Новый урок и урок, перенесенный в другой курс, становятся последними в курсе.
+    Метаданные нового видео загружаются в фоне (см. app_image.videos).
     """
+    name_constraint = 'lessons_name_lower_uniq'
+
     preview = serializers.PrimaryKeyRelatedField(
         queryset=LessonImage.get_all_lesson_images(),
         required=False
     )
-
-    name = serializers.CharField(
-        validators=[UniqueValidator(queryset=Lesson.get_all_lessons())]
-    )
+    video = VideoSerializer(read_only=True)
     created_by = serializers.SerializerMethodField()
 
     class Meta:
         model = Lesson
-        fields = ['id', 'name', 'description', 'preview', 'video_url', 'course', 'created_by']
+        fields = ['id', 'name', 'description', 'preview', 'video_url', 'video', 'course', 'position', 'created_by']
+        read_only_fields = ['position']
         validators = [YouTubeUrlValidator(field='video_url')]
 
+    def create(self, validated_data: Dict[str, Any]) -> Lesson:
+        course_id = validated_data['course'].id
+        with transaction.atomic():
+            self.set_video(validated_data)
+            LessonOrderService.lock_courses([course_id])
+            validated_data['position'] = LessonOrderService.next_positions([course_id])[course_id]
+            return super().create(validated_data)
+
+    def update(self, instance: Lesson, validated_data: Dict[str, Any]) -> Lesson:
+        video_changed = validated_data.get('video_url', instance.video_url) != instance.video_url
+        course = validated_data.get('course')
+        course_changed = course is not None and course.id != instance.course_id
+        if not video_changed and not course_changed:
+            return super().update(instance, validated_data)
+        with transaction.atomic():
+            if video_changed:
+                self.set_video(validated_data)
+            if course_changed:
+                LessonOrderService.lock_courses([course.id])
+                validated_data['position'] = LessonOrderService.next_positions([course.id])[course.id]
+            return super().update(instance, validated_data)
+
+    @staticmethod
+    def set_video(validated_data: Dict[str, Any]) -> None:
+        """
+        Связывает урок с видео по ссылке и ставит в очередь загрузку метаданных видео.
+        Вызывается в транзакции сохранения урока: если урок не сохранится, строка видео не останется,
+        а задача загрузки не будет поставлена (VideoMetadataService.register ставит ее после фиксации).
+
+        :param validated_data: Проверенные данные сериализатора.
+        """
+        video_id = youtube_video_id(validated_data['video_url'])
+        VideoMetadataService.register([video_id])
+        validated_data['video_id'] = video_id
+
     def to_representation(self, instance: Lesson) -> Dict[str, Any]:
         """
         Преобразует экземпляр модели Lesson в словарь.
@@ -66,7 +166,30 @@ class LessonSerializer(serializers.ModelSerializer):
         }
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор списка курсов.
+
+    Перед сериализацией страницы одним обращением к индексу подписок определяет,
+    на какие курсы страницы подписан текущий пользователь.
+    """
+
+    def to_representation(self, data: Any) -> List[Dict[str, Any]]:
+        """
+        Преобразует список курсов в список словарей.
+
+        :param data: Список или QuerySet курсов.
+        """
+        courses = list(data.all() if isinstance(data, models.Manager) else data)
+        request = self.context.get('request')
+        user_id = request.user.id if request is not None else None
+        self._context['subscribed_course_ids'] = get_subscription_index().subscribed_courses(
+            user_id, [course.id for course in courses]
+        )
+        return super().to_representation(courses)
+
+
+class CourseSerializer(UniqueNameMixin, UpdateFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Course.
 
@@ -82,15 +205,14 @@ class CourseSerializer(serializers.ModelSerializer):
 
     Поле preview не является обязательным для заполнения.
 
-    Поле name проверяется на уникальность.
+    Поле name уникально без учета регистра (ограничение courses_name_lower_uniq).
     """
+    name_constraint = 'courses_name_lower_uniq'
+
     preview = serializers.PrimaryKeyRelatedField(
         queryset=CourseImage.get_all_course_images(),
         required=False
     )
-    name = serializers.CharField(
-        validators=[UniqueValidator(queryset=Course.get_all_courses())]
-    )
     lessons = LessonSerializer(many=True, read_only=True)
     lessons_count = serializers.SerializerMethodField()
     created_by = serializers.SerializerMethodField()
@@ -99,6 +221,7 @@ class CourseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ['id', 'name', 'preview', 'description', 'lessons', 'lessons_count', 'created_by', 'subscribed']
+        list_serializer_class = CourseListSerializer
 
     def to_representation(self, instance: Course) -> Dict[str, Any]:
         """
@@ -136,17 +259,55 @@ class CourseSerializer(serializers.ModelSerializer):
     def get_subscribed(self, instance: Course) -> bool:
         """
         Возвращает флаг подписки текущего пользователя на курс.
+        При сериализации списка используется результат пакетной проверки
+        из CourseListSerializer, иначе курс проверяется по индексу подписок.
 
         :param instance: Экземпляр модели Course.
         """
-        request = self.context.get('request')
-        user = request.user
+        subscribed_course_ids = self.context.get('subscribed_course_ids')
+        if subscribed_course_ids is None:
+            user = self.context['request'].user
+            subscribed_course_ids = get_subscription_index().subscribed_courses(user.id, [instance.id])
+        return instance.id in subscribed_course_ids
 
-        try:
-            subscription = CourseSubscription.objects.get(user=user, course=instance)
-            return subscription.subscribed
-        except CourseSubscription.DoesNotExist:
-            return False
+
+class SubscriptionFeedSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор ленты подписок пользователя.
+
+    Поля:
+    - id: Целочисленный идентификатор подписки.
+    - course: Курс (ID, название, превью, описание, количество уроков, создатель и время обновления).
+
+    Ожидает подписки из CourseSubscription.get_active_for_user: данные курса и количество
+    уроков должны быть загружены заранее, сериализатор запросов к базе данных не выполняет.
+    """
+    course = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CourseSubscription
+        fields = ['id', 'course']
+
+    @staticmethod
+    def get_course(instance: CourseSubscription) -> Dict[str, Any]:
+        """
+        Возвращает информацию о курсе подписки.
+
+        :param instance: Экземпляр модели CourseSubscription.
+        """
+        course = instance.course
+        return {
+            'id': course.id,
+            'name': course.name,
+            'preview': CourseImageSerializer(course.preview).data,
+            'description': course.description,
+            'lessons_count': instance.lessons_count,
+            'created_by': {
+                'id': course.created_by.id,
+                'email': course.created_by.email
+            },
+            'updated_at': serializers.DateTimeField().to_representation(course.updated_at),
+        }
 
 
 class SubscriptionCreateSerializer(serializers.ModelSerializer):
@@ -157,47 +318,37 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
     - course: ID курса, на который пользователь хочет подписаться.
     - subscribed: Флаг подписки (только для чтения).
 
-    При попытке создать подписку, проверяет, есть ли уже подписка на данный курс у пользователя.
-    Если подписка уже существует, возбуждает исключение.
+    Подписка создается одним запросом к базе данных (см. SubscriptionService.subscribe).
+    Если курс не найден или подписка уже существует, возбуждает исключение.
     """
+    course = serializers.IntegerField(source='course_id', min_value=1)
     subscribed = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = CourseSubscription
         fields = ['course', 'subscribed']
 
-    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Проверяет, существует ли уже подписка на указанный курс у текущего пользователя.
-        Если подписка уже есть, будет выброшено исключение.
-
-        :param attrs: Входные данные сериализатора (ID курса, ID пользователя мы получим из запроса,
-        так как пользователь авторизован).
-        """
-        user = self.context['request'].user
-        course = attrs['course']
-        subscription_exists = CourseSubscription.objects.filter(user=user, course=course, subscribed=True).exists()
-
-        if subscription_exists:
-            raise serializers.ValidationError(f"Подписка на данный курс у пользователя {user} уже существует.")
-
-        return attrs
-
     def create(self, validated_data: Dict[str, Any]) -> CourseSubscription:
         """
         Создает подписку на курс.
         Возвращает созданный объект подписки.
+        Если курс не найден или подписка на курс у пользователя уже существует,
+        будет выброшено исключение.
 
         :param validated_data: Проверенные данные сериализатора.
         """
         user = self.context['request'].user
-        course = validated_data['course']
+        course_id = validated_data['course_id']
 
-        subscription, _ = CourseSubscription.objects.update_or_create(
-            user=user,
-            course=course,
-            defaults={'subscribed': True}
-        )
+        subscription, created = SubscriptionService.subscribe(user, course_id)
+
+        if subscription is None:
+            message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+            raise serializers.ValidationError({'course': [message.format(pk_value=course_id)]})
+        if not created:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [f"Подписка на данный курс у пользователя {user} уже существует."]
+            })
 
         return subscription
 
@@ -229,49 +380,35 @@ class SubscriptionDeleteSerializer(serializers.ModelSerializer):
     - course: ID курса, для которого пользователь хочет отменить подписку.
     - subscribed: Флаг подписки (только для чтения).
 
-    При попытке отменить подписку, проверяет, не отменена ли уже эта подписка.
+    Подписка отменяется одним запросом к базе данных (см. SubscriptionService.unsubscribe).
     Если подписка уже отменена, возбуждает исключение.
-    Если такая подписка не найдена, возбуждает исключение.
-
-    При успешной отмене подписки, обновляет флаг подписки на False.
+    Если такая подписка не найдена, возбуждает исключение Http404.
     """
+    course = serializers.IntegerField(source='course_id', min_value=1)
     subscribed = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = CourseSubscription
         fields = ['course', 'subscribed']
 
-    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+    def create(self, validated_data: Dict[str, Any]) -> CourseSubscription:
         """
-        Проверяет, существует ли подписка на данный курс и не отменена ли она уже.
-        Если подписка не существует или уже отменена, возбуждает исключение.
-
-        Если подписка существует и активна, возвращает входные данные сериализатора.
+        Обновляет флаг подписки на False.
+        Возвращает обновленный объект подписки.
 
-        :param attrs: Входные данные сериализатора.
+        :param validated_data: Проверенные данные сериализатора.
         """
         user = self.context['request'].user
-        course = attrs['course']
-        subscription = CourseSubscription.objects.filter(user=user, course=course).first()
+        subscription, changed = SubscriptionService.unsubscribe(user, validated_data['course_id'])
 
-        if not subscription:
-            raise serializers.ValidationError("Подписка на этот курс не найдена.")
-        elif not subscription.subscribed:
-            raise serializers.ValidationError("Подписка на этот курс уже отменена.")
+        if subscription is None:
+            raise Http404("Подписка не найдена.")
+        if not changed:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ["Подписка на этот курс уже отменена."]
+            })
 
-        return attrs
-
-    def update(self, instance: CourseSubscription, validated_data: Dict[str, Any]) -> CourseSubscription:
-        """
-        Обновляет флаг подписки на False и сохраняет изменения.
-        Возвращает обновленный объект подписки.
-
-        :param instance: Объект подписки.
-        :param validated_data: Проверенные данные сериализатора.
-        """
-        instance.subscribed = False
-        instance.save()
-        return instance
+        return subscription
 
     def to_representation(self, instance: CourseSubscription) -> Dict[str, Any]:
         """
@@ -291,3 +428,202 @@ class SubscriptionDeleteSerializer(serializers.ModelSerializer):
             'name': instance.course.name,
         }
         return response
+
+
+class SubscriptionBulkSerializer(serializers.Serializer):
+    """
+    Сериализатор для массовой подписки на курсы и отписки от них.
+
+    Поля:
+    - courses: Список ID курсов.
+    - subscribed: True - подписаться на курсы, False - отписаться от них.
+    - changed: ID курсов, подписка на которые была изменена (только для чтения).
+    - unchanged: ID курсов, подписка на которые не изменилась (только для чтения).
+    """
+    courses = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+        write_only=True
+    )
+    subscribed = serializers.BooleanField(default=True)
+    changed = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+    unchanged = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+
+    def create(self, validated_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Подписывает пользователя на курсы или отписывает от них одним запросом.
+        Возвращает словарь с результатом операции.
+
+        :param validated_data: Проверенные данные сериализатора.
+        """
+        user = self.context['request'].user
+        course_ids = sorted(set(validated_data['courses']))
+
+        if validated_data['subscribed']:
+            changed = SubscriptionService.bulk_subscribe(user, course_ids)
+        else:
+            changed = SubscriptionService.bulk_unsubscribe(user, course_ids)
+
+        changed_ids = set(changed)
+        return {
+            'subscribed': validated_data['subscribed'],
+            'changed': changed,
+            'unchanged': [course_id for course_id in course_ids if course_id not in changed_ids]
+        }
+
+
+class LessonMoveSerializer(serializers.Serializer):
+    """
+    Сериализатор перемещения урока внутри курса.
+
+    Поля:
+    - after: ID урока того же курса, после которого должен идти урок (null - в начало курса).
+
+    В ответе также возвращается новая позиция урока (position).
+    """
+    after = serializers.IntegerField(allow_null=True)
+
+    def validate_after(self, after: Optional[int]) -> Optional[int]:
+        """
+        Проверяет, что урок after входит в тот же курс.
+
+        :param after: ID урока.
+        """
+        lesson = self.instance
+        if after is not None and (
+            after == lesson.id or not Lesson.objects.filter(id=after, course_id=lesson.course_id).exists()
+        ):
+            raise serializers.ValidationError('Урок не найден среди других уроков курса.')
+        return after
+
+    def update(self, instance: Lesson, validated_data: Dict[str, Any]) -> Lesson:
+        """
+        Перемещает урок и возвращает его с новой позицией.
+
+        :param instance: Перемещаемый урок.
+        :param validated_data: Проверенные данные сериализатора.
+        """
+        try:
+            return LessonOrderService.move(instance, validated_data['after'])
+        except Lesson.DoesNotExist:
+            # Урок перенесли в другой курс после проверки after.
+            raise serializers.ValidationError({'after': ['Урок не найден среди других уроков курса.']})
+
+    def to_representation(self, instance: Lesson) -> Dict[str, Any]:
+        """
+        Возвращает словарь с ID урока after и новой позицией урока.
+
+        :param instance: Перемещенный урок.
+        """
+        return {'after': self.validated_data['after'], 'position': instance.position}
+
+
+class LessonOrderSerializer(serializers.Serializer):
+    """
+    Сериализатор нового порядка уроков курса.
+
+    Поля:
+    - lessons: ID всех уроков курса в новом порядке.
+    """
+    lessons = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=10000)
+
+    def validate_lessons(self, lessons: List[int]) -> List[int]:
+        """
+        Проверяет, что список содержит каждый урок курса ровно один раз.
+
+        :param lessons: ID уроков.
+        """
+        course_lessons = set(self.instance.lessons.values_list('id', flat=True))
+        if len(set(lessons)) != len(lessons) or set(lessons) != course_lessons:
+            raise serializers.ValidationError('Список должен содержать каждый урок курса ровно один раз.')
+        return lessons
+
+    def update(self, instance: Course, validated_data: Dict[str, Any]) -> Course:
+        """
+        Назначает урокам курса позиции в новом порядке и возвращает курс.
+
+        :param instance: Курс.
+        :param validated_data: Проверенные данные сериализатора.
+        """
+        LessonOrderService.reorder(instance.id, validated_data['lessons'])
+        return instance
+
+    def to_representation(self, instance: Course) -> Dict[str, Any]:
+        """
+        Возвращает словарь с ID уроков курса в новом порядке.
+
+        :param instance: Курс.
+        """
+        return {'lessons': self.validated_data['lessons']}
+
+
+class CourseMonthlyStatsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор статистики курса за месяц.
+    """
+    class Meta:
+        model = CourseMonthlyStats
+        fields = ('month', 'subscribed', 'unsubscribed', 'cohort_active', 'cohort_paying')
+
+
+class CourseAnalyticsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор аналитики курса (см. app_course.analytics).
+
+    Поля:
+    - course: ID курса.
+    - subscribers, active, churned, paying: Подписывались на курс, подписаны сейчас, отписались, оплатили курс.
+    - churn_rate, conversion_rate: Доли отписавшихся и оплативших среди подписывавшихся.
+    - computed_at: Время расчета (null, если аналитика еще не рассчитана).
+    - months: Статистика по месяцам.
+    """
+    months = CourseMonthlyStatsSerializer(many=True)
+
+    class Meta:
+        model = CourseFunnelStats
+        fields = ('course', 'subscribers', 'active', 'churned', 'paying', 'churn_rate', 'conversion_rate',
+                  'computed_at', 'months')
+
+
+class CourseImportSerializer(serializers.Serializer):
+    """
+    Сериализатор файла массового импорта курсов и уроков (см. app_course.importer).
+
+    Поля:
+    - file: Файл CSV, JSON (массив записей) или JSON Lines.
+    - file_format: Формат файла (по умолчанию определяется по расширению имени файла).
+    """
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=IMPORT_FORMATS, required=False)
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Определяет формат файла по расширению, если он не указан.
+
+        :param data: Входные данные.
+        """
+        data.setdefault('file_format', detect_format(data['file'].name))
+        if data['file_format'] is None:
+            raise serializers.ValidationError({'file_format': [f'Укажите формат файла: {", ".join(IMPORT_FORMATS)}']})
+        return data
+
+
+class CourseImportResultSerializer(serializers.Serializer):
+    """
+    Сериализатор результата импорта.
+
+    Поля:
+    - rows: Количество обработанных записей.
+    - courses, lessons: Количество созданных курсов и уроков.
+    - errors_total: Количество записей с ошибками.
+    - errors: Ошибки записей (номер записи и ошибки по полям), не больше 1000.
+    - seconds, rows_per_second: Длительность импорта и скорость обработки записей.
+    """
+    rows = serializers.IntegerField()
+    courses = serializers.IntegerField()
+    lessons = serializers.IntegerField()
+    errors_total = serializers.IntegerField()
+    errors = serializers.ListField(child=serializers.DictField())
+    seconds = serializers.FloatField()
+    rows_per_second = serializers.FloatField()
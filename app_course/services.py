@@ -0,0 +1,339 @@
+from datetime import timedelta
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from app_user.models import CustomUser
+from config.archive import ArchiveResult, move_rows
+from .models import Course, CourseSubscription, CourseSubscriptionArchive, Lesson
+from .subscription_index import get_subscription_index
+
+
+class SubscriptionService:
+    """
+    Класс, описывающий подписку и отписку пользователя от курсов.
+
+    Каждая операция выполняется одним SQL-запросом (INSERT ... ON CONFLICT ... RETURNING
+    или UPDATE ... RETURNING), поэтому не требует предварительных проверок существования
+    подписки и корректно работает при одновременных запросах для одной пары
+    пользователь - курс.
+
+    После фиксации транзакции изменения переносятся в индекс подписок
+    (см. app_course.subscription_index).
+    """
+    subscriptions_table = CourseSubscription._meta.db_table
+    courses_table = Course._meta.db_table
+
+    @classmethod
+    def subscribe(cls, user: CustomUser, course_id: int) -> Tuple[Optional[CourseSubscription], bool]:
+        """
+        Подписывает пользователя на курс.
+        Возвращает кортеж (подписка, изменена ли подписка).
+        Если курс не найден, вместо подписки возвращается None.
+        Если пользователь уже подписан на курс, второй элемент кортежа равен False.
+
+        :param user: Пользователь, который подписывается на курс.
+        :param course_id: ID курса.
+        """
+        sql = f"""
+            WITH course AS (
+                SELECT id, name FROM {cls.courses_table} WHERE id = %(course_id)s
+            ), upsert AS (
+                INSERT INTO {cls.subscriptions_table} (user_id, course_id, subscribed, subscribed_at)
+                SELECT %(user_id)s, course.id, TRUE, now() FROM course
+                ON CONFLICT (user_id, course_id) DO UPDATE SET subscribed = TRUE, unsubscribed_at = NULL,
+                subscribed_at = coalesce({cls.subscriptions_table}.subscribed_at, now())
+                WHERE {cls.subscriptions_table}.subscribed = FALSE
+                RETURNING id
+            )
+            SELECT upsert.id, course.name FROM course LEFT JOIN upsert ON TRUE
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {'user_id': user.id, 'course_id': course_id})
+            row = cursor.fetchone()
+
+        if row is None:
+            return None, False
+
+        subscription_id, course_name = row
+        if subscription_id is not None:
+            cls._on_commit_update_index(user.id, [course_id], subscribed=True)
+        subscription = CourseSubscription(
+            id=subscription_id,
+            user=user,
+            course=Course(id=course_id, name=course_name),
+            subscribed=True
+        )
+        return subscription, subscription_id is not None
+
+    @classmethod
+    def unsubscribe(cls, user: CustomUser, course_id: int) -> Tuple[Optional[CourseSubscription], bool]:
+        """
+        Отменяет подписку пользователя на курс.
+        Возвращает кортеж (подписка, изменена ли подписка).
+        Если подписка не найдена, вместо подписки возвращается None.
+        Если подписка уже отменена, второй элемент кортежа равен False.
+
+        :param user: Пользователь, который отписывается от курса.
+        :param course_id: ID курса.
+        """
+        sql = f"""
+            WITH target AS (
+                SELECT subscription.id, course.name
+                FROM {cls.subscriptions_table} AS subscription
+                JOIN {cls.courses_table} AS course ON course.id = subscription.course_id
+                WHERE subscription.user_id = %(user_id)s AND subscription.course_id = %(course_id)s
+            ), updated AS (
+                UPDATE {cls.subscriptions_table} SET subscribed = FALSE, unsubscribed_at = now()
+                WHERE id = (SELECT id FROM target) AND subscribed
+                RETURNING id
+            )
+            SELECT target.id, target.name, updated.id IS NOT NULL FROM target LEFT JOIN updated ON TRUE
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {'user_id': user.id, 'course_id': course_id})
+            row = cursor.fetchone()
+
+        if row is None:
+            return None, False
+
+        subscription_id, course_name, changed = row
+        if changed:
+            cls._on_commit_update_index(user.id, [course_id], subscribed=False)
+        subscription = CourseSubscription(
+            id=subscription_id,
+            user=user,
+            course=Course(id=course_id, name=course_name),
+            subscribed=False
+        )
+        return subscription, changed
+
+    @classmethod
+    def bulk_subscribe(cls, user: CustomUser, course_ids: Iterable[int]) -> List[int]:
+        """
+        Подписывает пользователя на несколько курсов одним запросом.
+        Возвращает отсортированный список ID курсов, подписка на которые была создана
+        или восстановлена. Несуществующие курсы и курсы с активной подпиской пропускаются.
+
+        Строки вставляются в порядке ID курса, чтобы одновременные запросы
+        блокировали строки в одинаковом порядке и не приводили к взаимоблокировкам.
+
+        :param user: Пользователь, который подписывается на курсы.
+        :param course_ids: ID курсов.
+        """
+        sql = f"""
+            INSERT INTO {cls.subscriptions_table} (user_id, course_id, subscribed, subscribed_at)
+            SELECT %(user_id)s, course.id, TRUE, now() FROM {cls.courses_table} AS course
+            WHERE course.id = ANY(%(course_ids)s)
+            ORDER BY course.id
+            ON CONFLICT (user_id, course_id) DO UPDATE SET subscribed = TRUE, unsubscribed_at = NULL,
+                subscribed_at = coalesce({cls.subscriptions_table}.subscribed_at, now())
+            WHERE {cls.subscriptions_table}.subscribed = FALSE
+            RETURNING course_id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {'user_id': user.id, 'course_ids': sorted(set(course_ids))})
+            changed = sorted(row[0] for row in cursor.fetchall())
+
+        cls._on_commit_update_index(user.id, changed, subscribed=True)
+        return changed
+
+    @classmethod
+    def bulk_unsubscribe(cls, user: CustomUser, course_ids: Iterable[int]) -> List[int]:
+        """
+        Отменяет подписки пользователя на несколько курсов одним запросом.
+        Возвращает отсортированный список ID курсов, подписка на которые была отменена.
+        Курсы без активной подписки пропускаются.
+
+        Строки блокируются в порядке ID курса по той же причине, что и в bulk_subscribe.
+
+        :param user: Пользователь, который отписывается от курсов.
+        :param course_ids: ID курсов.
+        """
+        sql = f"""
+            UPDATE {cls.subscriptions_table} SET subscribed = FALSE, unsubscribed_at = now()
+            WHERE id IN (
+                SELECT id FROM {cls.subscriptions_table}
+                WHERE user_id = %(user_id)s AND course_id = ANY(%(course_ids)s)
+                ORDER BY course_id
+                FOR UPDATE
+            ) AND subscribed
+            RETURNING course_id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {'user_id': user.id, 'course_ids': sorted(set(course_ids))})
+            changed = sorted(row[0] for row in cursor.fetchall())
+
+        cls._on_commit_update_index(user.id, changed, subscribed=False)
+        return changed
+
+    @staticmethod
+    def _on_commit_update_index(user_id: int, course_ids: List[int], subscribed: bool) -> None:
+        """
+        Обновляет индекс подписок после фиксации текущей транзакции.
+
+        :param user_id: ID пользователя.
+        :param course_ids: ID курсов, подписка на которые изменилась.
+        :param subscribed: Новый статус подписки.
+        """
+        if not course_ids:
+            return
+        index = get_subscription_index()
+        update = index.add if subscribed else index.remove
+        transaction.on_commit(partial(update, user_id, course_ids))
+
+
+class SubscriptionArchiveService:
+    """
+    Класс, описывающий перенос подписок, отмененных больше SUBSCRIPTION_ARCHIVE_AFTER_DAYS дней назад,
+    в архивную таблицу course_subscriptions_archive (см. config.archive).
+    Повторная подписка на курс после переноса создает новую подписку.
+    Attrs:
+        - columns: Столбцы, переносимые в архив.
+    """
+    columns = [field.column for field in CourseSubscriptionArchive._meta.concrete_fields if field.name != 'archived_at']
+
+    @classmethod
+    def archive(cls, older_than: Optional[timedelta] = None, batch_size: Optional[int] = None) -> ArchiveResult:
+        """
+        Переносит в архив подписки, отмененные раньше older_than назад.
+
+        :param older_than: Время с момента отписки (по умолчанию - SUBSCRIPTION_ARCHIVE_AFTER_DAYS дней).
+        :param batch_size: Размер пачки (по умолчанию - ARCHIVE_BATCH_SIZE).
+        """
+        older_than = older_than or timedelta(days=settings.SUBSCRIPTION_ARCHIVE_AFTER_DAYS)
+        return move_rows(
+            CourseSubscription._meta.db_table, CourseSubscriptionArchive._meta.db_table, cls.columns,
+            condition='NOT subscribed AND unsubscribed_at < %s', params=[timezone.now() - older_than],
+            batch_size=batch_size or settings.ARCHIVE_BATCH_SIZE
+        )
+
+
+class LessonOrderService:
+    """
+    Класс, описывающий порядок уроков в курсе.
+
+    Позиции уроков курса идут с шагом position_step. Перемещенный урок получает позицию
+    посередине между новыми соседями, поэтому перемещение изменяет одну строку. Только когда
+    между соседями не осталось свободной позиции, позиции всех уроков курса назначаются заново.
+    Изменения порядка уроков одного курса выполняются по очереди: строка курса блокируется
+    (см. lock_courses), в том числе при добавлении урока в конец курса.
+    Attrs:
+        - position_step: Шаг между позициями соседних уроков.
+    """
+    position_step = 1024
+
+    @classmethod
+    def next_positions(cls, course_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        Возвращает позиции в конце курсов (одним запросом).
+
+        :param course_ids: ID курсов.
+        """
+        course_ids = set(course_ids)
+        last_positions = dict(
+            Lesson.objects.filter(course_id__in=course_ids).values('course_id').annotate(
+                last_position=Max('position')
+            ).values_list('course_id', 'last_position')
+        )
+        return {course_id: last_positions.get(course_id, 0) + cls.position_step for course_id in course_ids}
+
+    @classmethod
+    def assign_positions(cls, lessons: List[Lesson]) -> None:
+        """
+        Назначает новым урокам позиции в конце их курсов в порядке списка.
+        Курсы блокируются до конца транзакции, в которой уроки должны быть сохранены.
+
+        :param lessons: Уроки, которые еще не сохранены.
+        """
+        cls.lock_courses(lesson.course_id for lesson in lessons)
+        positions = cls.next_positions(lesson.course_id for lesson in lessons)
+        for lesson in lessons:
+            lesson.position = positions[lesson.course_id]
+            positions[lesson.course_id] += cls.position_step
+
+    @classmethod
+    def move(cls, lesson: Lesson, after_id: Optional[int]) -> Lesson:
+        """
+        Перемещает урок после урока after_id того же курса (в начало курса, если after_id равен None).
+        Возвращает урок с новой позицией.
+        Урок читается заново после блокировки курса: за это время его могли перенести в другой курс.
+
+        :param lesson: Перемещаемый урок.
+        :param after_id: ID урока, после которого должен идти перемещаемый урок.
+        :raises Lesson.DoesNotExist: Если урока after_id нет среди других уроков курса.
+        """
+        with transaction.atomic():
+            course_id = lesson.course_id
+            while True:
+                cls.lock_courses([course_id])
+                lesson = Lesson.objects.select_for_update().get(id=lesson.id)
+                if lesson.course_id == course_id:
+                    break
+                course_id = lesson.course_id
+            siblings = Lesson.get_for_course(lesson.course_id).exclude(id=lesson.id)
+            if after_id is None:
+                lower = None
+                following = siblings
+            else:
+                lower = siblings.values_list('position', flat=True).get(id=after_id)
+                following = siblings.filter(Q(position__gt=lower) | Q(position=lower, id__gt=after_id))
+            upper = following.values_list('position', flat=True).first()
+
+            if upper is None:
+                position = (lower or 0) + cls.position_step
+            elif lower is None:
+                position = upper - cls.position_step
+            elif upper - lower > 1:
+                position = (lower + upper) // 2
+            else:
+                lesson_ids = list(siblings.values_list('id', flat=True))
+                lesson_ids.insert(lesson_ids.index(after_id) + 1, lesson.id)
+                lesson.position = cls._apply_order(lesson_ids)[lesson.id]
+                return lesson
+
+            Lesson.objects.filter(id=lesson.id).update(position=position)
+        lesson.position = position
+        return lesson
+
+    @classmethod
+    def reorder(cls, course_id: int, lesson_ids: List[int]) -> Dict[int, int]:
+        """
+        Назначает урокам курса позиции в порядке lesson_ids одним запросом UPDATE.
+        Возвращает новые позиции уроков по их ID.
+
+        :param course_id: ID курса.
+        :param lesson_ids: ID всех уроков курса в новом порядке.
+        """
+        with transaction.atomic():
+            cls.lock_courses([course_id])
+            return cls._apply_order(lesson_ids)
+
+    @classmethod
+    def _apply_order(cls, lesson_ids: List[int]) -> Dict[int, int]:
+        """
+        Назначает урокам позиции с шагом position_step в порядке lesson_ids.
+
+        :param lesson_ids: ID уроков в новом порядке.
+        """
+        lessons = [
+            Lesson(id=lesson_id, position=number * cls.position_step)
+            for number, lesson_id in enumerate(lesson_ids, 1)
+        ]
+        Lesson.objects.bulk_update(lessons, ['position'])
+        return {lesson.id: lesson.position for lesson in lessons}
+
+    @staticmethod
+    def lock_courses(course_ids: Iterable[int]) -> None:
+        """
+        Блокирует строки курсов до конца текущей транзакции. Курсы блокируются в порядке ID,
+        чтобы одновременные изменения нескольких курсов не ждали друг друга по кругу.
+
+        :param course_ids: ID курсов.
+        """
+        courses = Course.objects.select_for_update().filter(id__in=set(course_ids)).order_by('id')
+        list(courses.values_list('id', flat=True))
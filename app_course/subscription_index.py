@@ -0,0 +1,333 @@
+import logging
+from typing import Iterable, Iterator, Optional, Set
+
+import redis
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from config.db import iterate_queryset
+from .models import CourseSubscription
+
+logger = logging.getLogger(__name__)
+
+
+class BaseSubscriptionIndex:
+    """
+    Индекс активных подписок: множество ID подписчиков для каждого курса
+    и множество ID курсов для каждого пользователя.
+
+    Пока индекс не построен (см. rebuild), все чтения выполняются из Postgres.
+    """
+    batch_size = 1000
+
+    def __init__(self, location: Optional[str] = None, **options):
+        """
+        Инициализатор индекса подписок.
+
+        :param location: Адрес хранилища индекса (для Redis - URL).
+        :param options: Дополнительные параметры хранилища.
+        """
+
+    def is_ready(self) -> bool:
+        """
+        Возвращает True, если индекс построен и ему можно доверять.
+        """
+        return False
+
+    def add(self, user_id: int, course_ids: Iterable[int]) -> None:
+        """
+        Добавляет подписки пользователя на курсы в индекс.
+
+        :param user_id: ID пользователя.
+        :param course_ids: ID курсов.
+        """
+
+    def remove(self, user_id: int, course_ids: Iterable[int]) -> None:
+        """
+        Удаляет подписки пользователя на курсы из индекса.
+
+        :param user_id: ID пользователя.
+        :param course_ids: ID курсов.
+        """
+
+    def rebuild(self) -> int:
+        """
+        Перестраивает индекс по таблице подписок.
+        Возвращает количество активных подписок.
+        """
+        return CourseSubscription.objects.filter(subscribed=True).count()
+
+    def subscribed_courses(self, user_id: Optional[int], course_ids: Iterable[int]) -> Set[int]:
+        """
+        Возвращает множество ID курсов из переданных, на которые подписан пользователь.
+
+        :param user_id: ID пользователя.
+        :param course_ids: ID курсов.
+        """
+        course_ids = list(course_ids)
+        if user_id is None or not course_ids:
+            return set()
+        return set(
+            CourseSubscription.objects
+            .filter(user_id=user_id, course_id__in=course_ids, subscribed=True)
+            .values_list('course_id', flat=True)
+        )
+
+    def iter_subscribers(self, course_id: int) -> Iterator[int]:
+        """
+        Возвращает итератор по ID подписчиков курса.
+
+        :param course_id: ID курса.
+        """
+        return iterate_queryset(
+            CourseSubscription.objects.filter(course_id=course_id, subscribed=True).values_list('user_id', flat=True),
+            self.batch_size
+        )
+
+    def iter_active_subscriptions(self) -> Iterator[tuple]:
+        """
+        Возвращает итератор по парам (ID пользователя, ID курса) активных подписок из Postgres.
+        """
+        return iterate_queryset(
+            CourseSubscription.objects.filter(subscribed=True).values_list('user_id', 'course_id'),
+            self.batch_size
+        )
+
+
+class DatabaseSubscriptionIndex(BaseSubscriptionIndex):
+    """
+    Индекс без внешнего хранилища: все чтения выполняются из Postgres.
+    Используется, если Redis не настроен.
+    """
+
+
+class RedisSubscriptionIndex(BaseSubscriptionIndex):
+    """
+    Индекс подписок в Redis.
+
+    Ключи:
+    - <prefix>:course:<course_id> - множество ID подписчиков курса.
+    - <prefix>:user:<user_id> - множество ID курсов, на которые подписан пользователь.
+    - <prefix>:ready - флаг построенного индекса.
+    - <prefix>:rebuilding - флаг перестроения индекса.
+    - <prefix>:journal - пары '<user_id>:<course_id>', подписка по которым изменилась во время перестроения.
+
+    Перестроение читает таблицу подписок курсором, поэтому строка, прочитанная до отписки,
+    вернула бы в индекс отмененную подписку. Пока индекс перестраивается, подписки изменяются
+    в индексе и записываются в журнал одним Lua-скриптом, а после заполнения индекса подписки
+    из журнала перечитываются из Postgres.
+
+    Если Redis недоступен, чтения выполняются из Postgres. Если подписку не удалось изменить в индексе,
+    индекс отмечается непостроенным и ставится в очередь его перестроение.
+    Attrs:
+        - key_prefix: Префикс ключей индекса.
+        - rebuild_timeout: Время жизни флага перестроения, с (флаг прерванного перестроения снимается сам).
+        - update_script: Lua-скрипт изменения подписок пользователя.
+    """
+    key_prefix = 'lms:subscriptions'
+    rebuild_timeout = 3600
+    update_script = """
+        local command = ARGV[1]
+        local user_id = ARGV[2]
+        local journal = redis.call('EXISTS', KEYS[1]) == 1
+        for i = 4, #KEYS do
+            local course_id = ARGV[i - 1]
+            redis.call(command, KEYS[i], user_id)
+            redis.call(command, KEYS[3], course_id)
+            if journal then
+                redis.call('SADD', KEYS[2], user_id .. ':' .. course_id)
+            end
+        end
+    """
+
+    def __init__(self, location: str, **options):
+        super().__init__(location, **options)
+        self.client = redis.Redis.from_url(location, **options)
+        self.update_subscriptions = self.client.register_script(self.update_script)
+
+    def course_key(self, course_id: int) -> str:
+        return f'{self.key_prefix}:course:{course_id}'
+
+    def user_key(self, user_id: int) -> str:
+        return f'{self.key_prefix}:user:{user_id}'
+
+    @property
+    def ready_key(self) -> str:
+        return f'{self.key_prefix}:ready'
+
+    @property
+    def rebuilding_key(self) -> str:
+        return f'{self.key_prefix}:rebuilding'
+
+    @property
+    def journal_key(self) -> str:
+        return f'{self.key_prefix}:journal'
+
+    def is_ready(self) -> bool:
+        try:
+            return bool(self.client.exists(self.ready_key))
+        except redis.RedisError as error:
+            logger.warning(f'Индекс подписок недоступен: {error}')
+            return False
+
+    def add(self, user_id: int, course_ids: Iterable[int]) -> None:
+        self._update(user_id, course_ids, add=True)
+
+    def remove(self, user_id: int, course_ids: Iterable[int]) -> None:
+        self._update(user_id, course_ids, add=False)
+
+    def _update(self, user_id: int, course_ids: Iterable[int], add: bool) -> None:
+        course_ids = list(course_ids)
+        if not course_ids:
+            return
+        try:
+            self.update_subscriptions(
+                keys=[self.rebuilding_key, self.journal_key, self.user_key(user_id),
+                      *(self.course_key(course_id) for course_id in course_ids)],
+                args=['SADD' if add else 'SREM', user_id, *course_ids]
+            )
+        except redis.RedisError as error:
+            logger.error(f'Ошибка обновления индекса подписок пользователя {user_id}: {error}')
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        """
+        Снимает флаг построенного индекса, чтобы чтения шли в Postgres, и ставит в очередь перестроение:
+        флаг не удастся снять, если Redis недоступен, а пропущенное изменение исправит только перестроение.
+        """
+        try:
+            self.client.delete(self.ready_key)
+        except redis.RedisError as error:
+            logger.error(f'Не удалось снять флаг построенного индекса подписок: {error}')
+
+        from .tasks import rebuild_subscription_index
+        transaction.on_commit(rebuild_subscription_index.delay)
+
+    def rebuild(self) -> int:
+        self.client.delete(self.ready_key, self.journal_key)
+        self.client.set(self.rebuilding_key, 1, ex=self.rebuild_timeout)
+        for pattern in (self.course_key('*'), self.user_key('*')):
+            for key in self.client.scan_iter(match=pattern, count=self.batch_size):
+                self.client.unlink(key)
+
+        count = 0
+        pipe = self.client.pipeline(transaction=False)
+        for user_id, course_id in self.iter_active_subscriptions():
+            pipe.sadd(self.course_key(course_id), user_id)
+            pipe.sadd(self.user_key(user_id), course_id)
+            count += 1
+            if count % self.batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+        self._replay_journal()
+        return count
+
+    def _replay_journal(self) -> None:
+        """
+        Перечитывает из Postgres подписки из журнала и исправляет по ним индекс.
+        Флаг перестроения снимается и индекс отмечается построенным, только если журнал пуст
+        (WATCH): иначе изменение, записанное в журнал после его последнего чтения, потерялось бы.
+        """
+        while True:
+            pairs = self.client.spop(self.journal_key, self.batch_size)
+            if pairs:
+                self._sync_subscriptions({tuple(map(int, pair.split(b':'))) for pair in pairs})
+                continue
+            with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    pipe.watch(self.journal_key)
+                    if pipe.scard(self.journal_key):
+                        continue
+                    pipe.multi()
+                    pipe.delete(self.rebuilding_key)
+                    pipe.set(self.ready_key, 1)
+                    pipe.execute()
+                    return
+                except redis.WatchError:
+                    continue
+
+    def _sync_subscriptions(self, pairs: Set[tuple]) -> None:
+        """
+        Записывает в индекс состояние подписок из Postgres.
+
+        :param pairs: Пары (ID пользователя, ID курса).
+        """
+        active = pairs & set(
+            CourseSubscription.objects.filter(
+                user_id__in={user_id for user_id, _ in pairs},
+                course_id__in={course_id for _, course_id in pairs},
+                subscribed=True
+            ).values_list('user_id', 'course_id')
+        )
+        with self.client.pipeline(transaction=False) as pipe:
+            for user_id, course_id in pairs:
+                if (user_id, course_id) in active:
+                    pipe.sadd(self.course_key(course_id), user_id)
+                    pipe.sadd(self.user_key(user_id), course_id)
+                else:
+                    pipe.srem(self.course_key(course_id), user_id)
+                    pipe.srem(self.user_key(user_id), course_id)
+            pipe.execute()
+
+    def subscribed_courses(self, user_id: Optional[int], course_ids: Iterable[int]) -> Set[int]:
+        course_ids = list(course_ids)
+        if user_id is None or not course_ids:
+            return set()
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                pipe.exists(self.ready_key)
+                pipe.smismember(self.user_key(user_id), course_ids)
+                ready, flags = pipe.execute()
+        except redis.RedisError as error:
+            logger.warning(f'Индекс подписок недоступен: {error}')
+            ready = False
+        if not ready:
+            return super().subscribed_courses(user_id, course_ids)
+        return {course_id for course_id, flag in zip(course_ids, flags) if flag}
+
+    def iter_subscribers(self, course_id: int) -> Iterator[int]:
+        if not self.is_ready():
+            return super().iter_subscribers(course_id)
+        return self._iter_members(self.course_key(course_id))
+
+    def _iter_members(self, key: str) -> Iterator[int]:
+        """
+        Возвращает итератор по элементам множества без повторов: SSCAN может вернуть элемент дважды,
+        если множество изменилось во время обхода.
+
+        :param key: Ключ множества.
+        """
+        seen = set()
+        for member in self.client.sscan_iter(key, count=self.batch_size):
+            if member not in seen:
+                seen.add(member)
+                yield int(member)
+
+
+_index: Optional[BaseSubscriptionIndex] = None
+
+
+def get_subscription_index() -> BaseSubscriptionIndex:
+    """
+    Возвращает индекс подписок, настроенный в settings.SUBSCRIPTION_INDEX.
+    """
+    global _index
+    if _index is None:
+        config = dict(settings.SUBSCRIPTION_INDEX)
+        backend = import_string(config.pop('BACKEND'))
+        location = config.pop('LOCATION', None)
+        _index = backend(location, **config.pop('OPTIONS', {}))
+    return _index
+
+
+@receiver(setting_changed)
+def reset_subscription_index(setting: str, **kwargs) -> None:
+    """
+    Сбрасывает индекс подписок при изменении настроек (например, в тестах).
+    """
+    global _index
+    if setting == 'SUBSCRIPTION_INDEX':
+        _index = None
@@ -1,11 +1,18 @@
 import logging
+from itertools import islice
+from typing import Iterator
 
 from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
 from django.core.mail import send_mail
 from django.utils import timezone
 
+from app_user.models import CustomUser
+from config.db import use_replica
+from config.task_metrics import record_items
 from .models import Course, Lesson
+from .subscription_index import get_subscription_index
 
 logger = logging.getLogger(__name__)
 
@@ -23,30 +30,64 @@ def was_updated_recently(last_update: timezone.datetime) -> bool:
     return diff.total_seconds() < 60
 
 
-@shared_task
-def send_course_update_notifications(course_id: int) -> None:
+def iter_subscriber_emails(course_id: int, batch_size: int = 500) -> Iterator[str]:
     """
-    Отправляет уведомления об обновлении курса подписчикам.
+    Возвращает итератор по адресам электронной почты подписчиков курса.
+    ID подписчиков читаются из индекса подписок порциями,
+    адреса для каждой порции загружаются одним запросом.
 
     :param course_id: Идентификатор курса.
+    :param batch_size: Размер порции подписчиков.
     """
-    course = Course.get_by_id(course_id)
-    if course is not None:
-        subscribers = course.subscriptions.filter(subscribed=True)
-        for subscription in subscribers:
+    subscriber_ids = iter(get_subscription_index().iter_subscribers(course_id))
+    while True:
+        batch = list(islice(subscriber_ids, batch_size))
+        if not batch:
+            return
+        yield from CustomUser.objects.filter(id__in=batch).values_list('email', flat=True)
+
+
+def notify_subscribers(course_id: int, subject: str, message: str) -> None:
+    """
+    Отправляет письмо каждому подписчику курса.
+    Подписчики читаются с реплики: отставание реплики на время рассылки допустимо.
+
+    :param course_id: Идентификатор курса.
+    :param subject: Тема письма.
+    :param message: Текст письма.
+    """
+    with use_replica():
+        for email in iter_subscriber_emails(course_id):
             try:
-                logger.info(f'Отправка письма для {subscribers}')
+                logger.info(f'Отправка письма для {email}')
                 send_mail(
-                    subject='Обновление курса',
-                    message=f'Курс "{course.name}" был обновлен.',
+                    subject=subject,
+                    message=message,
                     from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[subscription.user.email],
+                    recipient_list=[email],
                 )
+            except SoftTimeLimitExceeded:
+                raise
             except Exception as error:
                 logger.error(f'Ошибка отправки письма: {error}')
+                record_items('emails_failed')
+            else:
+                record_items('emails_sent')
+
+
+@shared_task(soft_time_limit=1800, time_limit=1860)
+def send_course_update_notifications(course_id: int) -> None:
+    """
+    Отправляет уведомления об обновлении курса подписчикам.
+
+    :param course_id: Идентификатор курса.
+    """
+    course = Course.get_by_id(course_id)
+    if course is not None:
+        notify_subscribers(course.id, subject='Обновление курса', message=f'Курс "{course.name}" был обновлен.')
 
 
-@shared_task
+@shared_task(soft_time_limit=1800, time_limit=1860)
 def send_lesson_update_notifications(lesson_id: int) -> None:
     """
     Отправляет уведомления об обновлении урока подписчикам курса, в который входит этот урок.
@@ -55,15 +96,39 @@ def send_lesson_update_notifications(lesson_id: int) -> None:
     """
     lesson = Lesson.get_by_id(lesson_id)
     if lesson is not None:
-        subscribers = lesson.course.subscriptions.filter(subscribed=True)
-        for subscription in subscribers:
-            try:
-                logger.info(f'Отправка письма для {subscribers}')
-                send_mail(
-                    subject='Обновление урока',
-                    message=f'Урок "{lesson.name}" был обновлен.',
-                    from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[subscription.user.email],
-                )
-            except Exception as error:
-                logger.error(f'Ошибка отправки письма: {error}')
+        notify_subscribers(lesson.course_id, subject='Обновление урока', message=f'Урок "{lesson.name}" был обновлен.')
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=600, time_limit=660)
+def rebuild_subscription_index() -> int:
+    """
+    Перестраивает индекс подписок по таблице подписок в Postgres.
+    Возвращает количество активных подписок.
+    """
+    return get_subscription_index().rebuild()
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=3600, time_limit=3660)
+def archive_subscriptions() -> int:
+    """
+    Переносит давно отмененные подписки в архивную таблицу (см. SubscriptionArchiveService).
+    Возвращает количество перенесенных подписок.
+    """
+    from .services import SubscriptionArchiveService
+    result = SubscriptionArchiveService.archive()
+    record_items('subscriptions_archived', result.rows)
+    logger.info(f'В архив перенесено подписок: {result.rows}, освобождено {result.bytes} байт')
+    return result.rows
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=3600, time_limit=3660)
+def compute_course_analytics() -> int:
+    """
+    Пересчитывает аналитику курсов (см. app_course.analytics.CourseAnalyticsService).
+    Возвращает количество курсов с рассчитанной воронкой.
+    """
+    from .analytics import CourseAnalyticsService
+    result = CourseAnalyticsService.refresh()
+    record_items('subscriptions_analyzed', result.subscriptions)
+    logger.info(f'Аналитика курсов рассчитана: курсов {result.courses}, подписок {result.subscriptions}')
+    return result.courses
@@ -1,7 +1,9 @@
 from rest_framework import status
+from rest_framework.validators import UniqueValidator
 from rest_framework.test import APIClient, APITestCase
 
 from app_user.models import CustomUser
+from config.throttling import get_token_bucket
 
 
 class BaseTestCase(APITestCase):
@@ -42,6 +44,7 @@ class BaseTestCase(APITestCase):
         return client
 
     def setUp(self):
+        get_token_bucket().reset()
         self.user_clients = []
         for user_data in self.users_data:
             client = self.create_authenticated_client(user_data)
@@ -91,6 +94,17 @@ class CourseCreateListTestCase(BaseCourseTestCase):
         self.assertEqual(course_1.status_code, status.HTTP_201_CREATED)
         self.assertEqual(course_2.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_unique_name_course_case_insensitive(self):
+        """
+        Названия курсов сравниваются без учета регистра,
+        ошибка совпадает с ошибкой UniqueValidator
+        """
+        self.user_clients[0].post('/api/courses/', self.course_data[0])
+        course_data = {**self.course_data[0], 'name': self.course_data[0]['name'].upper()}
+        response = self.user_clients[1].post('/api/courses/', course_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'name': [str(UniqueValidator.message)]})
+
 
 class CourseReadUpdateDeleteTestCase(BaseCourseTestCase):
     def setUp(self):
@@ -219,6 +233,16 @@ class CourseReadUpdateDeleteTestCase(BaseCourseTestCase):
             self.assertEqual(course['created_by']['email'], self.users_data[i]['email'])
             self.assertFalse(course['subscribed'])
 
+    def test_can_not_rename_course_to_existing_name(self):
+        """
+        Курс нельзя переименовать в название другого курса
+        """
+        course_id = self.created_course_ids[0]
+        response = self.moderator_client.patch(f'/api/courses/{course_id}/',
+                                               {'name': self.course_data[1]['name'].lower()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'name': [str(UniqueValidator.message)]})
+
     def test_moderator_can_partial_update_courses(self):
         """
         Модератор может частично менять все курсы.
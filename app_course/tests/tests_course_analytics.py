@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app_course import tasks as course_tasks
+from app_course.analytics import CourseAnalyticsService
+from app_course.models import Course, CourseFunnelStats, CourseMonthlyStats, CourseSubscription
+from app_course.services import SubscriptionArchiveService, SubscriptionService
+from app_user.models import CustomUser, Payment
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class CourseAnalyticsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create(email='author@example.com')
+        cls.students = [CustomUser.objects.create(email=f'student{i}@example.com') for i in range(4)]
+        cls.course = Course.objects.create(name='Python', description='Course', created_by=cls.author)
+        cls.other_course = Course.objects.create(name='Java', description='Course', created_by=cls.author)
+
+    def subscribe(self, student: CustomUser, subscribed_at: datetime, unsubscribed_at: datetime = None) -> None:
+        SubscriptionService.subscribe(student, self.course.id)
+        CourseSubscription.objects.filter(user=student, course=self.course).update(
+            subscribed=unsubscribed_at is None, subscribed_at=subscribed_at, unsubscribed_at=unsubscribed_at
+        )
+
+    def test_subscribed_at(self):
+        """
+        Время подписки сохраняется при повторной подписке.
+        """
+        SubscriptionService.subscribe(self.students[0], self.course.id)
+        subscribed_at = CourseSubscription.objects.get(user=self.students[0]).subscribed_at
+        self.assertIsNotNone(subscribed_at)
+
+        SubscriptionService.unsubscribe(self.students[0], self.course.id)
+        SubscriptionService.subscribe(self.students[0], self.course.id)
+        self.assertEqual(CourseSubscription.objects.get(user=self.students[0]).subscribed_at, subscribed_at)
+
+    def test_refresh(self):
+        """
+        Воронка и когорты учитывают архивные подписки, оплаты курса и часовой пояс TIME_ZONE.
+        """
+        self.subscribe(self.students[0], utc(2026, 1, 10))
+        self.subscribe(self.students[1], utc(2026, 1, 31, 22), unsubscribed_at=utc(2026, 2, 5))
+        self.subscribe(self.students[2], utc(2026, 2, 1), unsubscribed_at=timezone.now() - timedelta(days=365))
+        self.subscribe(self.students[3], None)
+        SubscriptionArchiveService.archive(older_than=timedelta(days=180))
+        Payment.objects.create(user=self.students[0], paid_course=self.course, amount=1000, is_confirmed=True)
+        Payment.objects.create(user=self.students[0], paid_course=self.course, amount=1000, is_confirmed=True)
+        Payment.objects.create(user=self.students[1], paid_course=self.course, amount=1000)
+        Payment.objects.create(user=self.students[2], paid_course=self.other_course, amount=1000, is_confirmed=True)
+
+        result = CourseAnalyticsService.refresh()
+
+        self.assertEqual(result.subscriptions, 4)
+        self.assertEqual(result.courses, 1)
+        funnel = CourseFunnelStats.get_for_course(self.course.id)
+        self.assertEqual((funnel.subscribers, funnel.active, funnel.churned, funnel.paying), (4, 2, 2, 1))
+        self.assertEqual((funnel.churn_rate, funnel.conversion_rate), (0.5, 0.25))
+        self.assertIsNone(CourseFunnelStats.get_for_course(self.other_course.id))
+
+        months = {
+            stats.month: (stats.subscribed, stats.unsubscribed, stats.cohort_active, stats.cohort_paying)
+            for stats in CourseMonthlyStats.get_for_course(self.course.id)
+        }
+        # Подписка 31.01 22:00 UTC по московскому времени относится к февралю.
+        self.assertEqual(months[date(2026, 1, 1)], (1, 0, 1, 1))
+        self.assertEqual(months[date(2026, 2, 1)], (2, 1, 0, 0))
+
+    def test_refresh_empty(self):
+        self.assertEqual(course_tasks.compute_course_analytics.apply().get(), 0)
+        self.assertFalse(CourseFunnelStats.objects.exists())
+        self.assertFalse(CourseMonthlyStats.objects.exists())
+
+
+class CourseAnalyticsViewTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create(email='author@example.com')
+        cls.student = CustomUser.objects.create(email='student@example.com')
+        cls.moderator = CustomUser.objects.create(email='staff@example.com', is_staff=True)
+        cls.course = Course.objects.create(name='Python', description='Course', created_by=cls.author)
+        SubscriptionService.subscribe(cls.student, cls.course.id)
+
+    def test_permissions(self):
+        url = f'/api/courses/{self.course.id}/analytics/'
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(self.author)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['subscribers'], 0)
+        self.assertIsNone(response.json()['computed_at'])
+
+        CourseAnalyticsService.refresh()
+        self.client.force_authenticate(self.moderator)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['subscribers'], 1)
+        self.assertEqual(response.json()['months'][0]['subscribed'], 1)
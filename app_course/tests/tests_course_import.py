@@ -0,0 +1,117 @@
+import io
+import json
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app_course.importer import CourseImportService, ImportFormatError, iter_json
+from app_course.models import Course, Lesson
+from app_user.models import CustomUser
+
+CSV = """type,name,description,cost,preview,video_url,course,author
+course,Django,Web framework,1000,,,,author@example.com
+course,django,Duplicate in file,,,,,
+course,Existing,Name is taken,,,,,
+lesson,Models,ORM,,,https://www.youtube.com/watch?v=1,DJANGO,
+lesson,Views,Requests,,,https://vimeo.com/1,Django,
+lesson,Forms,Input,,,https://www.youtube.com/watch?v=2,Missing,
+course,Flask,Micro framework,-5,999,,,nobody@example.com
+video,Python,Language,,,,,
+"""
+
+
+def records(count: int) -> bytes:
+    return '\n'.join(
+        json.dumps({'type': 'course', 'name': f'Course {i}', 'description': 'Course'}) for i in range(count)
+    ).encode()
+
+
+class CourseImportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create(email='staff@example.com', is_staff=True)
+        cls.author = CustomUser.objects.create(email='author@example.com')
+        Course.objects.create(name='EXISTING', description='Course', created_by=cls.author)
+
+    def test_csv(self):
+        """
+        Корректные записи создаются, ошибки остальных записей возвращаются по номеру записи.
+        """
+        result = CourseImportService.import_file(io.BytesIO(CSV.encode()), 'csv', self.staff, batch_size=3)
+
+        self.assertEqual((result.rows, result.courses, result.lessons, result.errors_total), (8, 1, 1, 6))
+        errors = {error['row']: sorted(error['errors']) for error in result.errors}
+        self.assertEqual(errors, {
+            2: ['name'], 3: ['name'], 5: ['video_url'], 6: ['course'],
+            7: ['author', 'cost', 'preview'], 8: ['type'],
+        })
+        course = Course.objects.get(name='Django')
+        self.assertEqual((course.created_by, course.cost), (self.author, 1000))
+        lesson = Lesson.objects.get(name='Models')
+        self.assertEqual((lesson.course, lesson.created_by), (course, self.staff))
+        self.assertGreater(result.rows_per_second, 0)
+
+    def test_queries_per_batch(self):
+        """
+        Количество запросов на пачку не зависит от количества записей в ней.
+        """
+        def count_queries(data: bytes) -> int:
+            with CaptureQueriesContext(connection) as queries:
+                CourseImportService.import_file(io.BytesIO(data), 'jsonl', self.staff)
+            return len(queries)
+
+        small = count_queries(records(5))
+        Course.objects.filter(name__startswith='Course').delete()
+        self.assertEqual(count_queries(records(200)), small)
+        self.assertEqual(Course.objects.filter(name__startswith='Course').count(), 200)
+
+    def test_json(self):
+        data = json.dumps([{'type': 'course', 'name': f'Course {i}', 'description': 'Course'} for i in range(20)])
+        parsed = list(iter_json(io.BytesIO(data.encode()), chunk_size=7))
+        self.assertEqual(parsed, json.loads(data))
+        self.assertEqual(list(iter_json(io.BytesIO(b' [ ] '))), [])
+
+        with self.assertRaises(ImportFormatError):
+            list(iter_json(io.BytesIO(b'[{"type": "course"}, {"type"')))
+        with self.assertRaises(ImportFormatError):
+            list(iter_json(io.BytesIO(b'{"type": "course"}')))
+
+    def test_jsonl_invalid_line(self):
+        data = records(2) + b'\n{"type": \n'
+        result = CourseImportService.import_file(io.BytesIO(data), 'jsonl', self.staff)
+        self.assertEqual((result.courses, result.errors_total), (2, 1))
+        self.assertEqual(result.errors[0]['row'], 3)
+
+    @mock.patch('app_course.views.send_course_update_notifications.delay')
+    def test_api(self, delay):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        upload = SimpleUploadedFile('courses.jsonl', records(3))
+        self.assertEqual(client.post('/api/courses/import/', {'file': upload}).status_code, 403)
+
+        client.force_authenticate(self.staff)
+        response = client.post('/api/courses/import/', {'file': SimpleUploadedFile('courses.jsonl', records(3))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['courses'], 3)
+        delay.assert_not_called()
+
+        response = client.post('/api/courses/import/', {'file': SimpleUploadedFile('courses.txt', records(3))})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file_format', response.json())
+
+        response = client.post('/api/courses/import/', {'file': SimpleUploadedFile('courses.json', b'{}')})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file', response.json())
+
+    def test_command(self):
+        with mock.patch('builtins.open', return_value=io.BytesIO(CSV.encode())):
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_courses', 'courses.csv', '--author', 'author@example.com', stdout=stdout,
+                         stderr=stderr)
+        self.assertIn('Imported 1 courses and 1 lessons from 8 records (6 with errors)', stdout.getvalue())
+        self.assertIn('Record 5: video_url:', stderr.getvalue())
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from django.db.models import Prefetch
+from django.test import TestCase
+
+from app_course.fast_serializers import CourseFastSerializer, LessonFastSerializer
+from app_course.models import Course, CourseSubscription, Lesson
+from app_course.serializers import CourseSerializer, LessonSerializer
+from app_image.models import CourseImage, LessonImage
+from app_user.models import CustomUser
+from config.renderers import ORJSONRenderer
+
+
+class FastSerializerParityTestCase(TestCase):
+    """
+    Быстрые сериализаторы списков выдают тот же JSON, что и сериализаторы DRF.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create(email=f'author{i}@example.com', first_name='Автор', last_name=str(i))
+            for i in range(3)
+        ]
+        course_images = [CourseImage.objects.get(id=1), CourseImage.objects.create(image='courses/python учебник.webp')]
+        lesson_images = [LessonImage.objects.get(id=1), LessonImage.objects.create(image='lessons/урок 1.webp')]
+
+        for i in range(6):
+            course = Course.objects.create(
+                name=f'Курс «{i}»', description=f'Описание\nкурса {i}  ', created_by=cls.users[i % 3],
+                preview=course_images[i % 2]
+            )
+            for j in range(i % 4):
+                Lesson.objects.create(
+                    course=course, name=f'Урок {i}.{j}', description='Описание "урока"',
+                    preview=lesson_images[j % 2], video_url=f'https://www.youtube.com/watch?v=video{i}{j}',
+                    created_by=cls.users[(i + j) % 3]
+                )
+            CourseSubscription.objects.create(user=cls.users[0], course=course, subscribed=i % 3 == 0)
+
+    @staticmethod
+    def render(data):
+        return ORJSONRenderer().render(data)
+
+    def test_lessons(self):
+        queryset = Lesson.objects.select_related('preview', 'created_by').order_by('id')
+
+        expected = LessonSerializer(queryset, many=True).data
+        actual = LessonFastSerializer.to_representation(queryset.values(*LessonFastSerializer.columns))
+
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_courses(self):
+        queryset = Course.objects.order_by('id')
+        for user in self.users:
+            context = {'request': SimpleNamespace(user=user)}
+            prefetched = queryset.prefetch_related(Prefetch('lessons', queryset=Lesson.objects.order_by('id')))
+
+            expected = CourseSerializer(prefetched, many=True, context=context).data
+            actual = CourseFastSerializer.to_representation(queryset.values(*CourseFastSerializer.columns), user.id)
+
+            self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_empty(self):
+        self.assertEqual(CourseFastSerializer.to_representation(Course.objects.none().values(), None), [])
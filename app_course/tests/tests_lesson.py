@@ -1,4 +1,5 @@
 from rest_framework import status
+from rest_framework.validators import UniqueValidator
 
 from app_course.tests.tests_course import BaseTestCase
 
@@ -85,6 +86,17 @@ class LessonCreateListTestCase(BaseLessonTestCase):
         self.assertEqual(lesson_1.status_code, status.HTTP_201_CREATED)
         self.assertEqual(lesson_2.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_unique_name_lesson_case_insensitive(self):
+        """
+        Названия уроков сравниваются без учета регистра,
+        ошибка совпадает с ошибкой UniqueValidator
+        """
+        self.user_clients[0].post('/api/lessons/', self.lessons_data[0])
+        lesson_data = {**self.lessons_data[0], 'name': self.lessons_data[0]['name'].upper()}
+        response = self.user_clients[0].post('/api/lessons/', lesson_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'name': [str(UniqueValidator.message)]})
+
     def test_can_not_create_lesson_with_video_url_not_youtube(self):
         """
         При создании урока можно использовать только ссылки на YouTube
@@ -0,0 +1,143 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app_course.models import Course, Lesson
+from app_course.services import LessonOrderService
+from app_user.models import CustomUser
+
+
+def updates(queries: CaptureQueriesContext) -> list:
+    return [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+
+def course_locks(queries: CaptureQueriesContext) -> list:
+    return [query['sql'] for query in queries if 'FROM "courses"' in query['sql'] and 'FOR UPDATE' in query['sql']]
+
+
+class LessonOrderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create(email='author@example.com')
+        cls.other = CustomUser.objects.create(email='other@example.com')
+        cls.course = Course.objects.create(name='Python', description='Course', created_by=cls.author)
+        cls.other_course = Course.objects.create(name='Java', description='Course', created_by=cls.author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.lessons = [self.create_lesson(f'Lesson {i}', self.course) for i in range(4)]
+
+    def create_lesson(self, name: str, course: Course) -> Lesson:
+        response = self.client.post('/api/lessons/', {
+            'name': name, 'description': name, 'video_url': 'https://www.youtube.com/watch?v=1', 'course': course.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Lesson.objects.get(id=response.json()['id'])
+
+    def order(self) -> list:
+        return list(Lesson.get_for_course(self.course.id).values_list('id', flat=True))
+
+    def move(self, lesson: Lesson, after: Lesson = None):
+        return self.client.put(f'/api/lessons/{lesson.id}/move/', {'after': after and after.id}, format='json')
+
+    def test_new_lessons_are_last(self):
+        step = LessonOrderService.position_step
+        self.assertEqual([lesson.position for lesson in self.lessons], [step, 2 * step, 3 * step, 4 * step])
+        self.assertEqual(self.create_lesson('Other', self.other_course).position, step)
+
+        response = self.client.patch(f'/api/lessons/{self.lessons[3].id}/', {'course': self.other_course.id})
+        self.assertEqual(response.json()['position'], 2 * step)
+
+    def test_new_position_under_course_lock(self):
+        """
+        Позиция в конце курса выбирается под блокировкой курса: при создании урока и при переносе в другой курс.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.create_lesson('Lesson 4', self.course)
+        self.assertEqual(len(course_locks(queries)), 1)
+
+        url = f'/api/lessons/{self.lessons[0].id}/'
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.patch(url, {'course': self.other_course.id}).status_code, status.HTTP_200_OK)
+        self.assertEqual(len(course_locks(queries)), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.patch(url, {'description': 'New'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(course_locks(queries), [])
+
+    def test_move_rereads_lesson(self):
+        """
+        Урок, перенесенный в другой курс после чтения, перемещается среди уроков своего нового курса.
+        """
+        first, second, third, fourth = self.lessons
+        other = self.create_lesson('Other', self.other_course)
+        stale = Lesson.objects.get(id=fourth.id)
+        Lesson.objects.filter(id=fourth.id).update(course=self.other_course, position=other.position * 2)
+
+        moved = LessonOrderService.move(stale, None)
+
+        self.assertEqual(moved.course_id, self.other_course.id)
+        self.assertEqual(list(Lesson.get_for_course(self.other_course.id).values_list('id', flat=True)),
+                         [fourth.id, other.id])
+        with self.assertRaises(Lesson.DoesNotExist):
+            LessonOrderService.move(stale, first.id)
+
+    def test_move_updates_one_row(self):
+        first, second, third, fourth = self.lessons
+        with CaptureQueriesContext(connection) as queries:
+            response = self.move(fourth, after=first)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'after': first.id, 'position': (first.position + second.position) // 2})
+        self.assertEqual(len(updates(queries)), 1)
+        self.assertEqual(self.order(), [first.id, fourth.id, second.id, third.id])
+
+        self.move(third)
+        self.move(first, after=second)
+        self.assertEqual(self.order(), [third.id, fourth.id, second.id, first.id])
+
+    def test_move_rebalances_without_gap(self):
+        first, second, third, fourth = self.lessons
+        Lesson.objects.filter(id=second.id).update(position=first.position + 1)
+        self.move(fourth, after=first)
+        self.assertEqual(self.order(), [first.id, fourth.id, second.id, third.id])
+        positions = list(Lesson.get_for_course(self.course.id).values_list('position', flat=True))
+        self.assertEqual(positions, [LessonOrderService.position_step * i for i in range(1, 5)])
+
+    def test_move_validation(self):
+        other_lesson = self.create_lesson('Other', self.other_course)
+        self.assertEqual(self.move(self.lessons[0], after=other_lesson).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.move(self.lessons[0], after=self.lessons[0]).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.move(self.lessons[0]).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reorder(self):
+        new_order = [lesson.id for lesson in reversed(self.lessons)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(f'/api/courses/{self.course.id}/lessons-order/', {'lessons': new_order},
+                                       format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'lessons': new_order})
+        self.assertEqual(len(updates(queries)), 1)
+        self.assertEqual(self.order(), new_order)
+
+        course = self.client.get(f'/api/courses/{self.course.id}/').json()
+        self.assertEqual([lesson['id'] for lesson in course['lessons']], new_order)
+        courses = self.client.get('/api/courses/').json()['results']
+        self.assertEqual([lesson['id'] for lesson in courses[0]['lessons']], new_order)
+
+    def test_reorder_validation(self):
+        url = f'/api/courses/{self.course.id}/lessons-order/'
+        ids = [lesson.id for lesson in self.lessons]
+        for lessons in (ids[:-1], ids + ids[:1], ids[:-1] + [ids[0]]):
+            response = self.client.put(url, {'lessons': lessons}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('lessons', response.json())
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.put(url, {'lessons': ids}, format='json').status_code,
+                         status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,187 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app_course.models import Course, Lesson
+from app_image import tasks as image_tasks
+from app_image.models import Video
+from app_image.videos import VideoMetadataService, youtube_video_id
+from app_user.models import CustomUser
+
+
+class OEmbedStubHandler(BaseHTTPRequestHandler):
+    """
+    Заглушка oEmbed YouTube: отвечает по ID видео из параметра url.
+    """
+    requests = []
+
+    def do_GET(self):
+        video_id = parse_qs(urlparse(parse_qs(urlparse(self.path).query)['url'][0]).query)['v'][0]
+        self.requests.append(video_id)
+        if video_id.startswith('gone'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        if video_id.startswith('broken'):
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({
+            'title': f'Video {video_id}', 'author_name': 'Author',
+            'thumbnail_url': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg', 'type': 'video',
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LessonVideoTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), OEmbedStubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create(email='author@example.com')
+        cls.course = Course.objects.create(name='Python', description='Course', created_by=cls.author)
+
+    def setUp(self):
+        OEmbedStubHandler.requests = []
+        settings = override_settings(YOUTUBE_OEMBED_URL=f'http://127.0.0.1:{self.server.server_port}/oembed')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def create_lesson(self, name: str, video_id: str) -> Lesson:
+        return Lesson.objects.create(course=self.course, name=name, description=name, created_by=self.author,
+                                     video_url=f'https://www.youtube.com/watch?v={video_id}',
+                                     video=Video.objects.get_or_create(id=video_id)[0])
+
+    def test_youtube_video_id(self):
+        urls = {
+            'https://www.youtube.com/watch?v=FTtEF1KDBXo&t=10': 'FTtEF1KDBXo',
+            'https://youtu.be/FTtEF1KDBXo?si=share': 'FTtEF1KDBXo',
+            'https://m.youtube.com/shorts/FTtEF1KDBXo': 'FTtEF1KDBXo',
+            'https://www.youtube.com/embed/FTtEF1KDBXo': 'FTtEF1KDBXo',
+            'https://www.youtube.com/channel/UC123': None,
+            'https://www.youtube.com/watch?v=bad/id': None,
+            'https://notyoutube.com/watch?v=FTtEF1KDBXo': None,
+        }
+        self.assertEqual({url: youtube_video_id(url) for url in urls}, urls)
+
+    def test_lesson_payload(self):
+        """
+        Урок связывается с видео при создании, метаданные загружаются задачей и попадают в ответ API.
+        """
+        with mock.patch.object(image_tasks.fetch_video_metadata, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/lessons/', {
+                'name': 'Lesson', 'description': 'Lesson', 'course': self.course.id,
+                'video_url': 'https://www.youtube.com/watch?v=FTtEF1KDBXo',
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['video'],
+                         {'id': 'FTtEF1KDBXo', 'title': '', 'author_name': '', 'thumbnail_url': '', 'duration': None})
+        delay.assert_called_once_with(['FTtEF1KDBXo'])
+
+        self.assertEqual(image_tasks.fetch_video_metadata.apply(args=[['FTtEF1KDBXo']]).get(), 1)
+
+        lesson = self.client.get(f'/api/lessons/{response.json()["id"]}/').json()
+        self.assertEqual(lesson['video']['title'], 'Video FTtEF1KDBXo')
+        self.assertEqual(lesson['video']['thumbnail_url'], 'https://i.ytimg.com/vi/FTtEF1KDBXo/hqdefault.jpg')
+        course = self.client.get('/api/courses/').json()['results'][0]
+        self.assertEqual(course['lessons'][0]['video'], lesson['video'])
+
+    def test_failed_lesson_leaves_no_video(self):
+        """
+        Если урок не сохранился (название занято), строка видео не создается и загрузка не ставится в очередь.
+        """
+        self.create_lesson('Lesson', 'abc')
+        with mock.patch.object(image_tasks.fetch_video_metadata, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/lessons/', {
+                'name': 'LESSON', 'description': 'Lesson', 'course': self.course.id,
+                'video_url': 'https://www.youtube.com/watch?v=orphan',
+            })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', response.json())
+        self.assertFalse(Video.objects.filter(id='orphan').exists())
+        delay.assert_not_called()
+
+    def test_session_per_thread(self):
+        """
+        Запросы к oEmbed из разных потоков идут через разные HTTP-сессии, в потоке сессия переиспользуется.
+        """
+        results = {}
+
+        def fetch(video_id: str) -> None:
+            session = VideoMetadataService.session()
+            results[video_id] = (VideoMetadataService.fetch(video_id), session, VideoMetadataService.session())
+
+        threads = [threading.Thread(target=fetch, args=(video_id,)) for video_id in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        first, first_session, first_again = results['first']
+        second, second_session, second_again = results['second']
+        self.assertEqual((first['title'], second['title']), ('Video first', 'Video second'))
+        self.assertIs(first_session, first_again)
+        self.assertIs(second_session, second_again)
+        self.assertIsNot(first_session, second_session)
+
+    def test_ttl(self):
+        """
+        Свежие метаданные не запрашиваются повторно, устаревшие и принудительно обновляемые - запрашиваются.
+        """
+        self.create_lesson('Lesson', 'abc')
+        self.assertEqual(VideoMetadataService.refresh(['abc']), 1)
+        self.assertEqual(VideoMetadataService.refresh(['abc']), 0)
+        self.assertEqual(VideoMetadataService.refresh(['abc'], force=True), 1)
+        self.assertEqual(OEmbedStubHandler.requests, ['abc', 'abc'])
+
+        Video.objects.filter(id='abc').update(fetched_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(VideoMetadataService.refresh(['abc']), 1)
+        self.assertEqual(len(OEmbedStubHandler.requests), 3)
+
+    def test_unavailable(self):
+        """
+        Удаленное видео запоминается как недоступное, при ошибке oEmbed метаданные не изменяются.
+        """
+        self.create_lesson('Gone', 'gone1')
+        self.create_lesson('Broken', 'broken1')
+        self.assertEqual(VideoMetadataService.refresh(['gone1', 'broken1']), 1)
+
+        gone, broken = Video.objects.get(id='gone1'), Video.objects.get(id='broken1')
+        self.assertEqual((gone.available, gone.fetched_at is None), (False, False))
+        self.assertEqual((broken.available, broken.fetched_at), (None, None))
+
+    def test_refresh_batches(self):
+        for video_id in ('a1', 'a2', 'a3', 'fresh'):
+            self.create_lesson(f'Lesson {video_id}', video_id)
+        Video.objects.create(id='orphan')
+        Video.objects.filter(id='fresh').update(fetched_at=timezone.now())
+
+        with mock.patch.object(VideoMetadataService, 'batch_size', 2), \
+                mock.patch.object(image_tasks.fetch_video_metadata, 'delay') as delay:
+            self.assertEqual(image_tasks.refresh_video_metadata.apply().get(), 3)
+        self.assertEqual([call.args for call in delay.call_args_list], [(['a1', 'a2'],), (['a3'],)])
@@ -1,6 +1,17 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 
+from app_course.models import Course, CourseSubscription, Lesson
+from app_course.services import SubscriptionService
 from app_course.tests.tests_course import BaseTestCase
+from app_user.models import CustomUser
 
 
 class CourseSubscriptionTestCase(BaseTestCase):
@@ -96,3 +107,201 @@ class CourseSubscriptionTestCase(BaseTestCase):
         """
         response = self.user_clients[0].put('/api/course-unsubscribe/', {'course': 999})
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_subscribe_and_unsubscribe(self):
+        """
+        Массовая подписка и отписка. Повторная операция ничего не меняет,
+        несуществующие курсы пропускаются.
+        """
+        course_ids = self.created_course_ids + [999]
+
+        response = self.user_clients[0].post('/api/course-subscriptions/bulk/',
+                                             {'courses': course_ids, 'subscribed': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['changed'], sorted(self.created_course_ids))
+        self.assertEqual(response.json()['unchanged'], [999])
+
+        courses = self.user_clients[0].get('/api/courses/').json()['results']
+        self.assertTrue(all(course['subscribed'] for course in courses))
+
+        response = self.user_clients[0].post('/api/course-subscriptions/bulk/',
+                                             {'courses': course_ids, 'subscribed': True}, format='json')
+        self.assertEqual(response.json()['changed'], [])
+
+        response = self.user_clients[0].post('/api/course-subscriptions/bulk/',
+                                             {'courses': course_ids, 'subscribed': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['changed'], sorted(self.created_course_ids))
+
+        courses = self.user_clients[0].get('/api/courses/').json()['results']
+        self.assertFalse(any(course['subscribed'] for course in courses))
+
+    def test_bulk_subscribe_requires_courses(self):
+        """
+        Проверка, что массовая подписка без списка курсов возвращает статус 400
+        """
+        response = self.user_clients[0].post('/api/course-subscriptions/bulk/', {'courses': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SubscriptionFeedTestCase(BaseTestCase):
+    def setUp(self):
+        """
+        Создание курсов с уроками и подписка первого пользователя на часть из них.
+        """
+        super().setUp()
+        self.author = CustomUser.objects.get(email=self.users_data[1]['email'])
+        self.courses = [
+            Course.objects.create(name=f'Feed Course {i}', description='Feed', created_by=self.author)
+            for i in range(5)
+        ]
+        for i, course in enumerate(self.courses):
+            for j in range(i):
+                Lesson.objects.create(course=course, name=f'Lesson {i}.{j}', description='Lesson',
+                                      video_url='https://www.youtube.com/watch?v=FTtEF1KDBXo',
+                                      created_by=self.author)
+
+        self.subscribed_courses = self.courses[:4]
+        for course in self.subscribed_courses:
+            self.user_clients[0].post('/api/course-subscriptions/', {'course': course.id})
+        self.user_clients[0].put('/api/course-unsubscribe/', {'course': self.subscribed_courses[0].id})
+        self.active_courses = self.subscribed_courses[1:]
+
+    def test_feed_lists_active_subscriptions(self):
+        """
+        Лента содержит только активные подписки пользователя, новые подписки первыми.
+        Данные курса соответствуют ожидаемым.
+        """
+        response = self.user_clients[0].get('/api/me/subscriptions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.json()['results']
+        self.assertEqual([item['course']['id'] for item in results],
+                         [course.id for course in reversed(self.active_courses)])
+        course = results[0]['course']
+        self.assertEqual(course['name'], self.active_courses[-1].name)
+        self.assertEqual(course['lessons_count'], 3)
+        self.assertEqual(course['preview']['image'], '/media/courses/default.png')
+        self.assertEqual(course['created_by']['email'], self.author.email)
+
+        other_user_feed = self.user_clients[1].get('/api/me/subscriptions/').json()['results']
+        self.assertEqual(other_user_feed, [])
+
+    def test_feed_keyset_pagination(self):
+        """
+        Лента постранично обходится по ссылкам next без пропусков и повторов.
+        """
+        course_ids = []
+        url = '/api/me/subscriptions/?page_size=2'
+        while url:
+            page = self.user_clients[0].get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            course_ids.extend(item['course']['id'] for item in page['results'])
+            url = page['next']
+
+        self.assertEqual(course_ids, [course.id for course in reversed(self.active_courses)])
+
+    def test_feed_updated_since(self):
+        """
+        Фильтр updated_since возвращает только курсы, обновленные после указанного момента.
+        """
+        since = timezone.now() + timedelta(minutes=1)
+        Course.objects.filter(id=self.active_courses[0].id).update(updated_at=since + timedelta(minutes=1))
+
+        response = self.user_clients[0].get('/api/me/subscriptions/', {'updated_since': since.isoformat()})
+
+        self.assertEqual([item['course']['id'] for item in response.json()['results']], [self.active_courses[0].id])
+
+    def test_feed_constant_number_of_queries(self):
+        """
+        Количество запросов не зависит от числа подписок на странице.
+        """
+        with CaptureQueriesContext(connection) as few:
+            self.user_clients[0].get('/api/me/subscriptions/?page_size=1')
+        with CaptureQueriesContext(connection) as many:
+            self.user_clients[0].get('/api/me/subscriptions/?page_size=3')
+
+        self.assertEqual(len(few), len(many))
+
+
+class CourseSubscriptionConcurrencyTestCase(TransactionTestCase):
+    """
+    Одновременные запросы на подписку и отписку для одной пары пользователь - курс.
+    Каждый поток использует собственное соединение с базой данных.
+    """
+    serialized_rollback = True
+    threads_count = 12
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='race@example.com', password='qwerty123!')
+        self.courses = [
+            Course.objects.create(name=f'Race Course {i}', description='Race', created_by=self.user)
+            for i in range(5)
+        ]
+        self.course = self.courses[0]
+
+    def hammer(self, func, *args_list):
+        """
+        Запускает func одновременно в нескольких потоках и возвращает список результатов.
+        """
+        barrier = threading.Barrier(len(args_list))
+
+        def worker(args):
+            try:
+                barrier.wait()
+                return func(*args)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(args_list)) as executor:
+            return list(executor.map(worker, args_list))
+
+    def test_concurrent_subscribe(self):
+        """
+        Из одновременных подписок на один курс успешна ровно одна, строка подписки одна.
+        """
+        results = self.hammer(SubscriptionService.subscribe, *[(self.user, self.course.id)] * self.threads_count)
+
+        self.assertEqual(sum(created for _, created in results), 1)
+        self.assertEqual(CourseSubscription.objects.filter(user=self.user, course=self.course).count(), 1)
+        self.assertTrue(CourseSubscription.objects.get(user=self.user, course=self.course).subscribed)
+
+    def test_concurrent_unsubscribe(self):
+        """
+        Из одновременных отписок от одного курса успешна ровно одна.
+        """
+        SubscriptionService.subscribe(self.user, self.course.id)
+
+        results = self.hammer(SubscriptionService.unsubscribe, *[(self.user, self.course.id)] * self.threads_count)
+
+        self.assertEqual(sum(changed for _, changed in results), 1)
+        self.assertFalse(CourseSubscription.objects.get(user=self.user, course=self.course).subscribed)
+
+    def test_concurrent_subscribe_and_unsubscribe(self):
+        """
+        Чередующиеся подписки и отписки не создают дубликатов и не нарушают ограничения.
+        """
+        calls = [
+            (SubscriptionService.subscribe if i % 2 else SubscriptionService.unsubscribe, self.user, self.course.id)
+            for i in range(self.threads_count)
+        ]
+        self.hammer(lambda func, user, course_id: func(user, course_id), *calls)
+
+        self.assertEqual(CourseSubscription.objects.filter(user=self.user, course=self.course).count(), 1)
+
+    def test_concurrent_bulk_subscribe(self):
+        """
+        Одновременные массовые подписки с пересекающимися списками курсов в разном порядке
+        не приводят к взаимоблокировкам, и каждый курс подписывается ровно один раз.
+        """
+        course_ids = [course.id for course in self.courses]
+        args_list = [
+            (self.user, course_ids if i % 2 else list(reversed(course_ids)))
+            for i in range(self.threads_count)
+        ]
+
+        results = self.hammer(SubscriptionService.bulk_subscribe, *args_list)
+
+        changed = [course_id for result in results for course_id in result]
+        self.assertEqual(sorted(changed), sorted(course_ids))
+        self.assertEqual(CourseSubscription.objects.filter(user=self.user, subscribed=True).count(), len(course_ids))
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from app_course.models import Course, CourseSubscription, CourseSubscriptionArchive
+from app_course.services import SubscriptionArchiveService, SubscriptionService
+from app_user.models import CustomUser
+
+
+class SubscriptionArchiveTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='student@example.com')
+        cls.courses = [
+            Course.objects.create(name=f'Course {i}', description='Course', created_by=cls.user) for i in range(3)
+        ]
+
+    def test_unsubscribed_at(self):
+        SubscriptionService.subscribe(self.user, self.courses[0].id)
+        SubscriptionService.unsubscribe(self.user, self.courses[0].id)
+        self.assertIsNotNone(CourseSubscription.objects.get(course=self.courses[0]).unsubscribed_at)
+
+        SubscriptionService.subscribe(self.user, self.courses[0].id)
+        self.assertIsNone(CourseSubscription.objects.get(course=self.courses[0]).unsubscribed_at)
+
+    def test_archive(self):
+        """
+        В архив переносятся только подписки, отмененные раньше заданного срока.
+        После переноса на курс можно подписаться снова.
+        """
+        course_ids = [course.id for course in self.courses]
+        SubscriptionService.bulk_subscribe(self.user, course_ids)
+        SubscriptionService.bulk_unsubscribe(self.user, course_ids[:2])
+        CourseSubscription.objects.filter(course_id=course_ids[0]).update(
+            unsubscribed_at=timezone.now() - timedelta(days=200)
+        )
+
+        result = SubscriptionArchiveService.archive(older_than=timedelta(days=180))
+
+        self.assertEqual(result.rows, 1)
+        self.assertEqual(CourseSubscriptionArchive.objects.get().course_id, course_ids[0])
+        self.assertEqual(sorted(CourseSubscription.objects.values_list('course_id', flat=True)), course_ids[1:])
+
+        subscription, created = SubscriptionService.subscribe(self.user, course_ids[0])
+        self.assertTrue(created)
+        self.assertTrue(CourseSubscription.objects.get(course_id=course_ids[0]).subscribed)
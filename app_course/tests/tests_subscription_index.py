@@ -0,0 +1,188 @@
+from unittest import mock
+
+import fakeredis
+import redis
+from django.core import mail
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from app_course.models import Course, CourseSubscription
+from app_course.subscription_index import get_subscription_index
+from app_course import tasks as course_tasks
+from app_course.tasks import send_course_update_notifications
+from app_course.tests.tests_course import BaseTestCase
+from app_user.models import CustomUser
+
+LOCMEM_SUBSCRIPTION_INDEX = {'BACKEND': 'app_course.tests.utils.LocMemSubscriptionIndex'}
+REDIS_SUBSCRIPTION_INDEX = {
+    'BACKEND': 'app_course.subscription_index.RedisSubscriptionIndex',
+    'LOCATION': 'redis://subscription-index:6379/0',
+    'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+}
+
+
+@override_settings(SUBSCRIPTION_INDEX=LOCMEM_SUBSCRIPTION_INDEX)
+class SubscriptionIndexTestCase(BaseTestCase):
+    def setUp(self):
+        """
+        Создание курсов модератором в обход API и построение индекса подписок.
+        """
+        super().setUp()
+        self.user = CustomUser.objects.get(email=self.users_data[0]['email'])
+        self.courses = [
+            Course.objects.create(name=f'Indexed Course {i}', description='Indexed', created_by=self.user)
+            for i in range(5)
+        ]
+        self.index = get_subscription_index()
+        self.index.rebuild()
+
+    def mark_not_ready(self):
+        self.index.ready = False
+
+    def subscribe(self, course_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.user_clients[0].post('/api/course-subscriptions/', {'course': course_id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_subscribe_and_unsubscribe_update_index(self):
+        """
+        Подписка и отписка сразу отражаются в индексе.
+        """
+        course_id = self.courses[0].id
+        self.subscribe(course_id)
+        self.assertEqual(self.index.subscribed_courses(self.user.id, [course_id]), {course_id})
+        self.assertEqual(list(self.index.iter_subscribers(course_id)), [self.user.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_clients[0].put('/api/course-unsubscribe/', {'course': course_id})
+        self.assertEqual(self.index.subscribed_courses(self.user.id, [course_id]), set())
+        self.assertEqual(list(self.index.iter_subscribers(course_id)), [])
+
+    def test_course_list_does_not_query_subscriptions(self):
+        """
+        Флаги подписки на странице курсов берутся из индекса,
+        таблица подписок при этом не читается.
+        """
+        self.subscribe(self.courses[1].id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.user_clients[0].get('/api/courses/', {'page_size': 5})
+
+        courses = response.json()['results']
+        self.assertEqual([course['subscribed'] for course in courses], [False, True, False, False, False])
+        self.assertFalse(any(CourseSubscription._meta.db_table in query['sql'] for query in queries))
+
+    def test_rebuild_from_database(self):
+        """
+        Индекс перестраивается по таблице подписок.
+        """
+        CourseSubscription.objects.create(user=self.user, course=self.courses[2], subscribed=True)
+        CourseSubscription.objects.create(user=self.user, course=self.courses[3], subscribed=False)
+
+        self.assertEqual(self.index.rebuild(), 1)
+        course_ids = [course.id for course in self.courses]
+        self.assertEqual(self.index.subscribed_courses(self.user.id, course_ids), {self.courses[2].id})
+
+    def test_not_ready_index_reads_database(self):
+        """
+        Пока индекс не построен, подписки читаются из базы данных.
+        """
+        self.mark_not_ready()
+        CourseSubscription.objects.create(user=self.user, course=self.courses[4], subscribed=True)
+
+        self.assertEqual(self.index.subscribed_courses(self.user.id, [self.courses[4].id]), {self.courses[4].id})
+        self.assertEqual(list(self.index.iter_subscribers(self.courses[4].id)), [self.user.id])
+
+    def test_course_update_notifications_use_index(self):
+        """
+        Уведомление об обновлении курса получают все подписчики из индекса.
+        """
+        course_id = self.courses[0].id
+        self.subscribe(course_id)
+        petr = CustomUser.objects.get(email=self.users_data[1]['email'])
+        self.index.add(petr.id, [course_id])
+
+        send_course_update_notifications(course_id)
+
+        recipients = sorted(message.to[0] for message in mail.outbox)
+        self.assertEqual(recipients, sorted(user['email'] for user in self.users_data))
+
+
+@override_settings(SUBSCRIPTION_INDEX=REDIS_SUBSCRIPTION_INDEX)
+class RedisSubscriptionIndexTestCase(SubscriptionIndexTestCase):
+    """
+    Те же проверки для индекса в Redis (fakeredis) и перестроение индекса при одновременных изменениях подписок.
+    """
+    def setUp(self):
+        get_subscription_index().client.flushall()
+        super().setUp()
+
+    def mark_not_ready(self):
+        self.index.client.delete(self.index.ready_key)
+
+    def test_rebuild_removes_stale_keys(self):
+        """
+        Перестроение удаляет из индекса подписки, которых нет в таблице подписок.
+        """
+        self.index.add(self.user.id, [self.courses[0].id])
+        self.assertEqual(self.index.rebuild(), 0)
+        self.assertEqual(self.index.subscribed_courses(self.user.id, [self.courses[0].id]), set())
+        self.assertEqual(list(self.index.iter_subscribers(self.courses[0].id)), [])
+
+    def test_changes_during_rebuild(self):
+        """
+        Отписка, зафиксированная во время перестроения, не возвращается в индекс строкой,
+        прочитанной до нее, а подписка, оформленная во время перестроения, не теряется.
+        """
+        unsubscribed, subscribed = self.courses[0].id, self.courses[1].id
+        self.subscribe(unsubscribed)
+        iter_active_subscriptions = self.index.iter_active_subscriptions
+
+        def rows_read_before_changes():
+            rows = list(iter_active_subscriptions())
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user_clients[0].put('/api/course-unsubscribe/', {'course': unsubscribed})
+            self.subscribe(subscribed)
+            yield from rows
+
+        with mock.patch.object(self.index, 'iter_active_subscriptions', rows_read_before_changes):
+            self.assertEqual(self.index.rebuild(), 1)
+
+        self.assertTrue(self.index.is_ready())
+        self.assertEqual(self.index.subscribed_courses(self.user.id, [unsubscribed, subscribed]), {subscribed})
+        self.assertEqual(list(self.index.iter_subscribers(unsubscribed)), [])
+        self.assertEqual(self.index.client.exists(self.index.rebuilding_key, self.index.journal_key), 0)
+
+        # После перестроения изменения подписок в журнал не записываются.
+        self.index.remove(self.user.id, [subscribed])
+        self.assertEqual(self.index.client.exists(self.index.journal_key), 0)
+        self.assertEqual(self.index.subscribed_courses(self.user.id, [subscribed]), set())
+
+    def test_update_error_invalidates_index(self):
+        """
+        Если подписку не удалось записать в индекс, индекс отмечается непостроенным, чтения идут в Postgres,
+        и ставится в очередь перестроение.
+        """
+        course_id = self.courses[0].id
+        with mock.patch.object(self.index, 'update_subscriptions', side_effect=redis.ConnectionError('down')), \
+                mock.patch.object(course_tasks.rebuild_subscription_index, 'delay') as delay, \
+                self.assertLogs('app_course.subscription_index', level='ERROR'):
+            self.subscribe(course_id)
+
+        delay.assert_called_once_with()
+        self.assertFalse(self.index.is_ready())
+        self.assertEqual(self.index.subscribed_courses(self.user.id, [course_id]), {course_id})
+        self.assertEqual(list(self.index.iter_subscribers(course_id)), [self.user.id])
+
+    def test_subscribers_without_duplicates(self):
+        """
+        Подписчик, которого SSCAN вернул дважды, получает письмо один раз.
+        """
+        course_id = self.courses[0].id
+        self.subscribe(course_id)
+        members = [str(self.user.id).encode()] * 3
+        with mock.patch.object(self.index.client, 'sscan_iter', return_value=iter(members)):
+            emails = list(course_tasks.iter_subscriber_emails(course_id, batch_size=1))
+        self.assertEqual(emails, [self.user.email])
@@ -0,0 +1,138 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app_course.models import Course, Lesson
+from app_course.services import SubscriptionService
+from app_user.models import CustomUser
+from config.tests.utils import writes
+
+
+class UpdateQueriesTestCase(APITestCase):
+    """
+    Количество запросов эндпоинтов, изменяющих курсы, уроки и подписки.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create(email='author@example.com')
+        cls.course = Course.objects.create(name='Python', description='Course', created_by=cls.author)
+        cls.lesson = Lesson.objects.create(course=cls.course, name='Lesson', description='Lesson',
+                                           video_url='https://www.youtube.com/watch?v=1', created_by=cls.author)
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def test_lesson_update(self):
+        """
+        Урок читается один раз вместе с курсом, сохраняются только переданные поля,
+        время обновления курса изменяется одним запросом UPDATE.
+        """
+        Course.objects.filter(id=self.course.id).update(updated_at=timezone.now() - timedelta(minutes=5))
+        with mock.patch('app_course.views.send_lesson_update_notifications.delay') as delay, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/lessons/{self.lesson.id}/', {'description': 'New'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('SELECT')]), 1)
+        lesson_update, course_update = writes(queries)
+        self.assertIn('SET "description" = ', lesson_update)
+        self.assertNotIn('"name"', lesson_update)
+        self.assertRegex(course_update, r'^UPDATE "courses" SET "updated_at" = .* WHERE "courses"."id" = ')
+        self.assertGreater(Course.objects.get(id=self.course.id).updated_at, timezone.now() - timedelta(minutes=1))
+        delay.assert_called_once_with(self.lesson.id)
+
+    def test_course_update(self):
+        """
+        Курс сохраняется одним запросом UPDATE переданных полей и времени обновления.
+        """
+        with mock.patch('app_course.views.send_course_update_notifications.delay'), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/courses/{self.course.id}/', {'description': 'New'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Курс и его уроки читаются по одному разу, третий запрос - флаг подписки.
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('SELECT')]), 3)
+        (course_update,) = writes(queries)
+        self.assertRegex(course_update, r'^UPDATE "courses" SET "description" = .*, "updated_at" = .* WHERE')
+
+    def test_unsubscribe(self):
+        """
+        Отписка выполняется одним запросом.
+        """
+        SubscriptionService.subscribe(self.author, self.course.id)
+        with self.assertNumQueries(1):
+            response = self.client.put('/api/course-unsubscribe/', {'course': self.course.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_lesson_move(self):
+        """
+        Перемещение урока изменяет одну строку.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(f'/api/lessons/{self.lesson.id}/move/', {'after': None}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(writes(queries)), 1)
+
+    def test_subscribe(self):
+        """
+        Подписка выполняется одним запросом.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/course-subscriptions/', {'course': self.course.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_subscribe(self):
+        """
+        Массовая подписка выполняется одним запросом независимо от количества курсов.
+        """
+        other_course = Course.objects.create(name='Go', description='Course', created_by=self.author)
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/course-subscriptions/bulk/',
+                                        {'courses': [self.course.id, other_course.id], 'subscribed': True},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['changed'], sorted([self.course.id, other_course.id]))
+
+    def test_lessons_reorder(self):
+        """
+        Новый порядок уроков сохраняется одним запросом UPDATE под блокировкой курса.
+        """
+        other_lesson = Lesson.objects.create(course=self.course, name='Other lesson', description='Lesson',
+                                             video_url='https://www.youtube.com/watch?v=2', created_by=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(f'/api/courses/{self.course.id}/lessons-order/',
+                                       {'lessons': [other_lesson.id, self.lesson.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([query for query in queries if query['sql'].endswith('FOR UPDATE')]), 1)
+        (lessons_update,) = writes(queries)
+        self.assertRegex(lessons_update, r'^UPDATE "lessons" SET "position" = ')
+
+    def test_lesson_create(self):
+        """
+        Создание урока: одна вставка видео, одна вставка урока и одна блокировка курса.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/lessons/', {'course': self.course.id, 'name': 'New lesson',
+                                                          'description': 'Lesson',
+                                                          'video_url': 'https://www.youtube.com/watch?v=3'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len([query for query in queries if query['sql'].endswith('FOR UPDATE')]), 1)
+        video_insert, lesson_insert = writes(queries)
+        self.assertRegex(video_insert, r'^INSERT INTO "videos" ')
+        self.assertRegex(lesson_insert, r'^INSERT INTO "lessons" ')
+
+    def test_lesson_delete(self):
+        """
+        Урок читается и удаляется двумя запросами.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.delete(f'/api/lessons/{self.lesson.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Lesson.objects.filter(id=self.lesson.id).exists())
@@ -0,0 +1,56 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from app_course.subscription_index import BaseSubscriptionIndex
+
+
+class LocMemSubscriptionIndex(BaseSubscriptionIndex):
+    """
+    Индекс подписок в памяти процесса для тестов. Повторяет поведение RedisSubscriptionIndex
+    без журнала изменений, сделанных во время перестроения.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, location: Optional[str] = None, **options):
+        super().__init__(location, **options)
+        self.ready = False
+        self.courses: Dict[int, Set[int]] = defaultdict(set)
+        self.users: Dict[int, Set[int]] = defaultdict(set)
+
+    def is_ready(self) -> bool:
+        return self.ready
+
+    def add(self, user_id: int, course_ids: Iterable[int]) -> None:
+        with self._lock:
+            for course_id in course_ids:
+                self.courses[course_id].add(user_id)
+                self.users[user_id].add(course_id)
+
+    def remove(self, user_id: int, course_ids: Iterable[int]) -> None:
+        with self._lock:
+            for course_id in course_ids:
+                self.courses[course_id].discard(user_id)
+                self.users[user_id].discard(course_id)
+
+    def rebuild(self) -> int:
+        with self._lock:
+            self.ready = False
+            self.courses.clear()
+            self.users.clear()
+        count = 0
+        for user_id, course_id in self.iter_active_subscriptions():
+            self.add(user_id, [course_id])
+            count += 1
+        self.ready = True
+        return count
+
+    def subscribed_courses(self, user_id: Optional[int], course_ids: Iterable[int]) -> Set[int]:
+        if not self.ready:
+            return super().subscribed_courses(user_id, course_ids)
+        return set(course_ids) & self.users.get(user_id, set())
+
+    def iter_subscribers(self, course_id: int) -> Iterator[int]:
+        if not self.ready:
+            return super().iter_subscribers(course_id)
+        return iter(list(self.courses.get(course_id, set())))
@@ -3,9 +3,13 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CourseViewSet,
     LessonListCreateAPIView,
+    LessonMoveView,
     LessonRetrieveUpdateDestroyAPIView,
     SubscriptionCreateView,
-    SubscriptionDeleteView
+    SubscriptionDeleteView,
+    SubscriptionBulkView,
+    SubscriptionFeedView,
+    SubscriptionExportView
 )
 
 router = DefaultRouter()
@@ -15,6 +19,10 @@ urlpatterns = [
     path('', include(router.urls)),
     path('lessons/', LessonListCreateAPIView.as_view(), name='lesson-list'),
     path('lessons/<int:pk>/', LessonRetrieveUpdateDestroyAPIView.as_view(), name='lesson-detail'),
+    path('lessons/<int:pk>/move/', LessonMoveView.as_view(), name='lesson-move'),
     path('course-subscriptions/', SubscriptionCreateView.as_view(), name='course_subscription_create'),
-    path('course-unsubscribe/', SubscriptionDeleteView.as_view(), name='course_subscription_delete')
+    path('course-unsubscribe/', SubscriptionDeleteView.as_view(), name='course_subscription_delete'),
+    path('course-subscriptions/bulk/', SubscriptionBulkView.as_view(), name='course_subscription_bulk'),
+    path('course-subscriptions/export/', SubscriptionExportView.as_view(), name='course_subscription_export'),
+    path('me/subscriptions/', SubscriptionFeedView.as_view(), name='my_subscriptions')
 ]
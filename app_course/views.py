@@ -1,22 +1,41 @@
 import logging
-from datetime import datetime
 from typing import Dict, Any
 
-from django.http import Http404
-from drf_yasg import openapi
-from drf_yasg.utils import swagger_auto_schema
+from django.db.models import Prefetch
+from django.http import FileResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, generics
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 
-from .models import Course, Lesson, CourseSubscription
-from .paginations import Pagination
+from app_user.serializers import ExportSerializer
+from config.export import ExportView
+from config.openapi import QueryParameter, swagger_auto_schema
+from .exports import SubscriptionExporter
+from .fast_serializers import CourseFastSerializer, LessonFastSerializer
+from .filters import SubscriptionFeedFilter
+from .importer import CourseImportService, ImportFormatError
+from .models import Course, CourseFunnelStats, CourseMonthlyStats, Lesson, CourseSubscription
+from .paginations import Pagination, SubscriptionCursorPagination
 from .permissions import CustomPermission
 from .serializers import (
+    CourseAnalyticsSerializer,
+    CourseImportResultSerializer,
+    CourseImportSerializer,
     CourseSerializer,
+    LessonMoveSerializer,
+    LessonOrderSerializer,
     LessonSerializer,
     SubscriptionCreateSerializer,
-    SubscriptionDeleteSerializer
+    SubscriptionDeleteSerializer,
+    SubscriptionBulkSerializer,
+    SubscriptionFeedSerializer
 )
 from .tasks import was_updated_recently, send_course_update_notifications, send_lesson_update_notifications
 
@@ -30,17 +49,24 @@ class CourseViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         manual_parameters=[
-            openapi.Parameter(
-                'page',
-                openapi.IN_QUERY,
-                description='Номер страницы',
-                type=openapi.TYPE_INTEGER
-            )
+            QueryParameter('page', description='Номер страницы', type='integer')
         ],
         responses={200: CourseSerializer(many=True)}
     )
-    def list(self, request):
-        return super().list(request)
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Возвращает страницу курсов.
+        Курсы сериализуются из строк .values() сериализатором CourseFastSerializer,
+        ответ совпадает с ответом CourseSerializer.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(
+            *CourseFastSerializer.columns
+        )
+        page = self.paginate_queryset(queryset)
+        data = CourseFastSerializer.to_representation(page if page is not None else queryset, request.user.id)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def get_queryset(self):
         """
@@ -49,17 +75,68 @@ class CourseViewSet(viewsets.ModelViewSet):
         Если пользователь является модератором (is_staff=True), возвращает все курсы.
         Если пользователь не является модератором, возвращает только те курсы,
         которые были созданы этим пользователем.
+        При генерации схемы OpenAPI (swagger_fake_view) запроса нет, возвращается пустой QuerySet.
         """
+        if getattr(self, 'swagger_fake_view', False):
+            return Course.objects.none()
+
         user = self.request.user
 
         if user.is_authenticated:
+            lessons = Lesson.objects.select_related('preview', 'video', 'created_by').order_by('position', 'id')
+            queryset = Course.get_all_courses().select_related('preview', 'created_by').prefetch_related(
+                Prefetch('lessons', queryset=lessons)
+            )
             if user.is_staff:
-                return Course.get_all_courses().order_by('id')
+                return queryset.order_by('id')
             else:
-                return Course.get_all_courses().filter(created_by=user).order_by('id')
+                return queryset.filter(created_by=user).order_by('id')
         else:
             return Course.objects.none()
 
+    @swagger_auto_schema(responses={200: CourseAnalyticsSerializer})
+    @action(detail=True, methods=['get'])
+    def analytics(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Возвращает аналитику курса: воронку (подписчики, отток, конверсия в оплату) и статистику по месяцам.
+        Доступна автору курса и модераторам. Аналитика пересчитывается ночной задачей
+        compute_course_analytics; если она еще не рассчитана, показатели равны нулю.
+        """
+        course = self.get_object()
+        stats = CourseFunnelStats.get_for_course(course.id) or CourseFunnelStats(course=course, computed_at=None)
+        stats.months = CourseMonthlyStats.get_for_course(course.id)
+        return Response(CourseAnalyticsSerializer(stats).data)
+
+    @action(detail=True, methods=['put'], url_path='lessons-order', serializer_class=LessonOrderSerializer)
+    def lessons_order(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Задает порядок уроков курса: в теле запроса передаются ID всех уроков курса в новом порядке.
+        Новые позиции записываются одним запросом UPDATE.
+        """
+        serializer = self.get_serializer(self.get_object(), data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    @swagger_auto_schema(responses={200: CourseImportResultSerializer})
+    @action(detail=False, methods=['post'], url_path='import', serializer_class=CourseImportSerializer,
+            permission_classes=[IsAuthenticated, IsAdminUser], parser_classes=[MultiPartParser])
+    def import_file(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Импортирует курсы и уроки из файла CSV, JSON или JSON Lines (только для модераторов).
+        Корректные записи создаются, для остальных возвращаются ошибки по номеру записи.
+        Уведомления подписчикам при импорте не отправляются. Для очень больших файлов
+        используется команда import_courses.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = CourseImportService.import_file(serializer.validated_data['file'],
+                                                     serializer.validated_data['file_format'], request.user)
+        except ImportFormatError as error:
+            raise ValidationError({'file': [str(error)]})
+        return Response(CourseImportResultSerializer(result).data)
+
     def perform_create(self, serializer: Serializer) -> None:
         """
         Сохраняет новый объект при помощи сериализатора,
@@ -80,6 +157,17 @@ class CourseViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    def update(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Обновляет курс. Уроки курса при этом не изменяются, поэтому уроки, загруженные вместе с курсом,
+        используются в ответе повторно (UpdateModelMixin сбросил бы их и загрузил заново без select_related).
+        """
+        partial = kwargs.pop('partial', False)
+        serializer = self.get_serializer(self.get_object(), data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(serializer.data)
+
     def perform_update(self, serializer: Serializer) -> None:
         """
         Обновляет объект курса и отправляет уведомление об обновлении подписчикам курса,
@@ -87,8 +175,7 @@ class CourseViewSet(viewsets.ModelViewSet):
 
         :param serializer: Сериализатор для сохранения объекта.
         """
-        instance = self.get_object()
-        last_course_update = instance.updated_at
+        last_course_update = serializer.instance.updated_at
         instance = serializer.save()
         if not was_updated_recently(last_course_update):
             send_course_update_notifications.delay(instance.id)
@@ -102,17 +189,22 @@ class LessonListCreateAPIView(generics.ListCreateAPIView):
 
     @swagger_auto_schema(
         manual_parameters=[
-            openapi.Parameter(
-                'page',
-                openapi.IN_QUERY,
-                description='Номер страницы',
-                type=openapi.TYPE_INTEGER
-            )
+            QueryParameter('page', description='Номер страницы', type='integer')
         ],
         responses={200: LessonSerializer(many=True)}
     )
-    def list(self, request):
-        return super().list(request)
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Возвращает страницу уроков.
+        Уроки сериализуются из строк .values() сериализатором LessonFastSerializer,
+        ответ совпадает с ответом LessonSerializer.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).values(*LessonFastSerializer.columns)
+        page = self.paginate_queryset(queryset)
+        data = LessonFastSerializer.to_representation(page if page is not None else queryset)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def get_queryset(self):
         """
@@ -125,10 +217,11 @@ class LessonListCreateAPIView(generics.ListCreateAPIView):
         user = self.request.user
 
         if user.is_authenticated:
+            queryset = Lesson.get_all_lessons().select_related('preview', 'video', 'created_by')
             if user.is_staff:
-                return Lesson.get_all_lessons().order_by('id')
+                return queryset.order_by('id')
             else:
-                return Lesson.get_all_lessons().filter(created_by=user).order_by('id')
+                return queryset.filter(created_by=user).order_by('id')
         else:
             return Lesson.objects.none()
 
@@ -143,7 +236,7 @@ class LessonListCreateAPIView(generics.ListCreateAPIView):
 
 
 class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Lesson.get_all_lessons()
+    queryset = Lesson.get_all_lessons().select_related('course', 'preview', 'video', 'created_by')
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated, CustomPermission]
 
@@ -151,48 +244,97 @@ class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
         """
         Обновляет объект урока и отправляет уведомление подписчикам курса, в который
         входит этот урок, если после последнего обновления курса прошло 60 секунд и больше.
-        При обновлении урока, также обновляется и время последнего обновления курса.
+        При обновлении урока, также обновляется и время последнего обновления курса
+        (одним запросом UPDATE, без сохранения всей строки курса).
 
         :param serializer: Сериализатор для сохранения объекта.
         """
-        instance = self.get_object()
-        last_course_update = instance.course.updated_at
+        last_course_update = serializer.instance.course.updated_at
         instance = serializer.save()
-        instance.course.update_at = datetime.now()
-        instance.course.save()
+        Course.objects.filter(id=instance.course_id).update(updated_at=timezone.now())
         if not was_updated_recently(last_course_update):
             send_lesson_update_notifications.delay(instance.id)
 
 
+class LessonMoveView(generics.UpdateAPIView):
+    """
+    Перемещает урок внутри курса после урока after (в начало курса, если after равен null).
+    Обычно изменяется позиция только перемещаемого урока.
+    """
+    queryset = Lesson.get_all_lessons()
+    serializer_class = LessonMoveSerializer
+    permission_classes = [IsAuthenticated, CustomPermission]
+    http_method_names = ['put']
+
+
+class SubscriptionFeedView(generics.ListAPIView):
+    serializer_class = SubscriptionFeedSerializer
+    pagination_class = SubscriptionCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = SubscriptionFeedFilter
+
+    def get_queryset(self):
+        """
+        Возвращает активные подписки текущего пользователя вместе с данными курсов.
+        """
+        return CourseSubscription.get_active_for_user(self.request.user.id)
+
+
 class SubscriptionCreateView(generics.CreateAPIView):
     queryset = CourseSubscription.get_all_course_subscriptions()
     serializer_class = SubscriptionCreateSerializer
+    throttle_scope = 'subscriptions'
 
 
 class SubscriptionDeleteView(generics.UpdateAPIView):
     queryset = CourseSubscription.get_all_course_subscriptions()
     serializer_class = SubscriptionDeleteSerializer
     http_method_names = ['put']
+    throttle_scope = 'subscriptions'
 
-    def get_object(self):
+    def update(self, request: Request, *args, **kwargs) -> Response:
         """
-        Возвращает объект подписки, который будет обновлен при выполнении запроса.
-        В данном случае, этот метод переопределен, чтобы получить объект подписки,
-        который соответствует указанному курсу и текущему пользователю.
-        Мы не передаем ID подписки в URL.
-        Мы ищем подписку по переданному в теле запроса ID курса и
-        по ID текущего пользователя. Такая подписка может быть только одна согласно
-        реализации метода по созданию подписки.
+        Отменяет подписку текущего пользователя на курс, ID которого передан в теле запроса.
+        Мы не передаем ID подписки в URL и не загружаем подписку заранее:
+        подписка ищется и обновляется одним запросом при сохранении сериализатора.
 
-        :return: Объект подписки.
         :raises Http404: Если подписка не найдена.
         """
-        queryset = self.get_queryset()
-        user = self.request.user
-        course_id = self.request.data.get('course')
-        obj = queryset.filter(user=user, course__id=course_id).first()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
 
-        if obj is None:
-            raise Http404("Подписка не найдена.")
+class SubscriptionBulkView(generics.GenericAPIView):
+    serializer_class = SubscriptionBulkSerializer
+    throttle_scope = 'subscriptions'
 
-        return obj
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Подписывает текущего пользователя на несколько курсов или отписывает от них.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+
+class SubscriptionExportView(ExportView):
+    exporter = SubscriptionExporter
+    export_serializer_class = ExportSerializer
+
+    @swagger_auto_schema(manual_parameters=[
+        QueryParameter('file_format', description='Формат файла: csv (по умолчанию) или xlsx', type='string'),
+        QueryParameter('course', description='ID курса', type='integer'),
+        QueryParameter('subscribed', description='Статус подписки', type='boolean'),
+        QueryParameter('subscribed_from', description='Подписки с даты (включительно, ISO 8601)', type='string'),
+        QueryParameter('subscribed_to', description='Подписки до даты (не включительно, ISO 8601)', type='string'),
+    ])
+    def get(self, request: Request, *args, **kwargs) -> FileResponse:
+        """
+        Возвращает подписки (с адресом подписчика и названием курса) файлом CSV или XLSX.
+        Модератор получает все подписки, автор курса - подписки на свои курсы.
+        Большой XLSX ставится в очередь: ответ 202 с выгрузкой (см. /api/exports/).
+        """
+        return super().get(request, *args, **kwargs)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import CourseImage, LessonImage, UserImage
+from .models import CourseImage, LessonImage, UserImage, Video
 
 
 @admin.register(CourseImage)
@@ -19,3 +19,9 @@ class LessonImageAdmin(admin.ModelAdmin):
 class UserImageAdmin(admin.ModelAdmin):
     list_display = ['id', 'image']
     list_display_links = ['image']
+
+
+@admin.register(Video)
+class VideoAdmin(admin.ModelAdmin):
+    list_display = ['id', 'title', 'duration', 'available', 'fetched_at']
+    list_display_links = ['id']
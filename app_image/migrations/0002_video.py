@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-19 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_image', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Video',
+            fields=[
+                ('id', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='ID видео на YouTube')),
+                ('title', models.CharField(blank=True, max_length=255, verbose_name='Название')),
+                ('author_name', models.CharField(blank=True, max_length=255, verbose_name='Автор')),
+                ('thumbnail_url', models.URLField(blank=True, max_length=500, verbose_name='Ссылка на обложку')),
+                ('duration', models.PositiveIntegerField(blank=True, null=True, verbose_name='Длительность, с')),
+                ('available', models.BooleanField(null=True, verbose_name='Доступно для встраивания')),
+                ('fetched_at', models.DateTimeField(blank=True, null=True, verbose_name='Время загрузки метаданных')),
+            ],
+            options={
+                'verbose_name': 'Видео',
+                'verbose_name_plural': 'Видео',
+                'db_table': 'videos',
+            },
+        ),
+    ]
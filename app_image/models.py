@@ -1,6 +1,9 @@
+from datetime import timedelta
 from typing import List
 
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 
 
 class LessonImage(models.Model):
@@ -61,3 +64,32 @@ class UserImage(models.Model):
         Возвращает список всех изображений пользователей
         """
         return cls.objects.all()
+
+
+class Video(models.Model):
+    """
+    Модель, описывающая видео YouTube и его метаданные, полученные через oEmbed
+    (см. app_image.videos.VideoMetadataService). Метаданные одного видео общие для всех уроков с этим видео.
+    """
+    id = models.CharField(primary_key=True, max_length=64, verbose_name='ID видео на YouTube')
+    title = models.CharField(max_length=255, blank=True, verbose_name='Название')
+    author_name = models.CharField(max_length=255, blank=True, verbose_name='Автор')
+    thumbnail_url = models.URLField(max_length=500, blank=True, verbose_name='Ссылка на обложку')
+    duration = models.PositiveIntegerField(null=True, blank=True, verbose_name='Длительность, с')
+    available = models.BooleanField(null=True, verbose_name='Доступно для встраивания')
+    fetched_at = models.DateTimeField(null=True, blank=True, verbose_name='Время загрузки метаданных')
+
+    class Meta:
+        verbose_name = 'Видео'
+        verbose_name_plural = 'Видео'
+        db_table = 'videos'
+
+    def __str__(self):
+        return f'{self.title or self.id}'
+
+    @classmethod
+    def get_stale(cls, ttl: timedelta) -> List['Video']:
+        """
+        Возвращает видео, метаданные которых не загружались или загружены раньше, чем ttl назад
+        """
+        return cls.objects.filter(Q(fetched_at__isnull=True) | Q(fetched_at__lt=timezone.now() - ttl))
@@ -1,6 +1,8 @@
+from typing import Optional
+
 from rest_framework import serializers
 
-from .models import LessonImage, CourseImage, UserImage
+from .models import LessonImage, CourseImage, UserImage, Video
 
 
 class LessonImageSerializer(serializers.ModelSerializer):
@@ -40,3 +42,46 @@ class UserImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserImage
         fields = '__all__'
+
+
+class VideoSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для модели Video.
+
+    Поля:
+    - id: ID видео на YouTube.
+    - title: Название видео.
+    - author_name: Автор видео.
+    - thumbnail_url: Ссылка на обложку.
+    - duration: Длительность в секундах (null, если неизвестна).
+
+    Пока метаданные не загружены, строковые поля пустые.
+    """
+    class Meta:
+        model = Video
+        fields = ('id', 'title', 'author_name', 'thumbnail_url', 'duration')
+
+
+class ImageUrlBuilder:
+    """
+    Строит URL изображений по именам файлов так же, как поле image сериализаторов выше
+    (без объекта запроса в контексте - относительный URL хранилища).
+    Результаты запоминаются: на странице обычно используется несколько одинаковых изображений.
+    """
+
+    def __init__(self):
+        self.storage = CourseImage._meta.get_field('image').storage
+        self.urls = {}
+
+    def __call__(self, name: str) -> Optional[str]:
+        """
+        Возвращает URL изображения или None, если имя файла не задано.
+
+        :param name: Имя файла изображения в хранилище.
+        """
+        if not name:
+            return None
+        url = self.urls.get(name)
+        if url is None:
+            url = self.urls[name] = self.storage.url(name)
+        return url
@@ -0,0 +1,37 @@
+import logging
+from typing import List
+
+from celery import shared_task
+
+from config.task_metrics import record_items
+from .videos import VideoMetadataService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=300, time_limit=330)
+def fetch_video_metadata(video_ids: List[str], force: bool = False) -> int:
+    """
+    Загружает метаданные видео через oEmbed (см. VideoMetadataService.refresh).
+    Возвращает количество видео с обновленными метаданными.
+
+    :param video_ids: ID видео.
+    :param force: Загрузить метаданные, даже если они моложе TTL.
+    """
+    updated = VideoMetadataService.refresh(video_ids, force=force)
+    record_items('videos_fetched', updated)
+    return updated
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=600, time_limit=660)
+def refresh_video_metadata() -> int:
+    """
+    Ставит в очередь загрузку метаданных видео уроков, которые устарели или еще не загружались,
+    пачками по VideoMetadataService.batch_size видео. Возвращает количество видео.
+    """
+    count = 0
+    for video_ids in VideoMetadataService.stale_batches():
+        fetch_video_metadata.delay(video_ids)
+        count += len(video_ids)
+    logger.info(f'Поставлена загрузка метаданных видео: {count}')
+    return count
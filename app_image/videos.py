@@ -0,0 +1,169 @@
+"""
+Метаданные видео YouTube для уроков.
+
+ID видео извлекается из ссылки урока при сохранении урока, метаданные (название, автор, обложка)
+загружаются в фоне через oEmbed (задача app_image.tasks.fetch_video_metadata) и хранятся в таблице videos.
+Строка видео служит кешем: пока метаданные моложе VIDEO_METADATA_TTL_DAYS дней, YouTube не запрашивается;
+устаревшие метаданные пачками обновляет ежедневная задача refresh_video_metadata.
+oEmbed YouTube не сообщает длительность видео, поэтому она заполняется, только если провайдер ее вернул.
+"""
+import logging
+import re
+import threading
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Video
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+VIDEO_ID_RE = re.compile(r'^[\w-]{1,64}$')
+# Префиксы пути ссылок вида youtube.com/<префикс>/<ID видео>.
+VIDEO_PATH_PREFIXES = ('embed', 'shorts', 'live', 'v')
+
+
+def youtube_video_id(url: str) -> Optional[str]:
+    """
+    Возвращает ID видео из ссылки на YouTube (watch?v=, youtu.be, embed, shorts, live)
+    или None, если ссылка не указывает на видео.
+
+    :param url: Ссылка на видео.
+    """
+    parsed = urlparse(url or '')
+    host = (parsed.hostname or '').lower()
+    parts = [part for part in parsed.path.split('/') if part]
+    if host == 'youtu.be':
+        video_id = parts[0] if parts else ''
+    elif host == 'youtube.com' or host.endswith('.youtube.com'):
+        if parts == ['watch']:
+            video_id = parse_qs(parsed.query).get('v', [''])[0]
+        else:
+            video_id = parts[1] if len(parts) > 1 and parts[0] in VIDEO_PATH_PREFIXES else ''
+    else:
+        return None
+    return video_id if VIDEO_ID_RE.match(video_id) else None
+
+
+class VideoMetadataService:
+    """
+    Класс, описывающий загрузку метаданных видео через oEmbed.
+    Attrs:
+        - timeout: Таймаут запроса к oEmbed, с.
+        - batch_size: Количество видео в одной задаче обновления метаданных.
+        - unavailable_statuses: Ответы oEmbed, означающие, что видео удалено, скрыто или не встраивается.
+        - _local: HTTP-сессии потоков для запросов к oEmbed (см. session).
+    """
+    timeout = 5
+    batch_size = 50
+    unavailable_statuses = (400, 401, 403, 404)
+    _local = threading.local()
+
+    @classmethod
+    def session(cls) -> 'requests.Session':
+        """
+        Возвращает HTTP-сессию текущего потока для запросов к oEmbed, соединения переиспользуются.
+        requests.Session не рассчитан на одновременное использование из нескольких потоков.
+        """
+        session = getattr(cls._local, 'session', None)
+        if session is None:
+            import requests
+
+            session = cls._local.session = requests.Session()
+        return session
+
+    @staticmethod
+    def ttl() -> timedelta:
+        return timedelta(days=settings.VIDEO_METADATA_TTL_DAYS)
+
+    @classmethod
+    def register(cls, video_ids: Iterable[Optional[str]]) -> None:
+        """
+        Создает строки видео, которых еще нет, одним запросом и после фиксации транзакции
+        ставит в очередь загрузку их метаданных (свежие метаданные задача не загружает повторно).
+
+        :param video_ids: ID видео (None пропускаются).
+        """
+        video_ids = sorted(set(filter(None, video_ids)))
+        if not video_ids:
+            return
+        Video.objects.bulk_create([Video(id=video_id) for video_id in video_ids], ignore_conflicts=True)
+
+        from .tasks import fetch_video_metadata
+        transaction.on_commit(lambda: fetch_video_metadata.delay(video_ids))
+
+    @classmethod
+    def fetch(cls, video_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Запрашивает метаданные видео у oEmbed. Возвращает поля модели Video
+        (для недоступного видео - только available=False) или None, если запрос не удался.
+
+        :param video_id: ID видео.
+        """
+        import requests
+
+        try:
+            response = cls.session().get(settings.YOUTUBE_OEMBED_URL, timeout=cls.timeout, params={
+                'url': f'https://www.youtube.com/watch?v={video_id}', 'format': 'json'
+            })
+            if response.status_code in cls.unavailable_statuses:
+                return {'available': False}
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as error:
+            logger.warning(f'Не удалось загрузить метаданные видео {video_id}: {error}')
+            return None
+
+        duration = data.get('duration')
+        return {
+            'available': True,
+            'title': str(data.get('title') or '')[:255],
+            'author_name': str(data.get('author_name') or '')[:255],
+            'thumbnail_url': str(data.get('thumbnail_url') or '')[:500],
+            'duration': int(duration) if isinstance(duration, (int, float)) and duration >= 0 else None,
+        }
+
+    @classmethod
+    def refresh(cls, video_ids: Iterable[str], force: bool = False) -> int:
+        """
+        Загружает метаданные видео и сохраняет их одним запросом.
+        Возвращает количество видео с обновленными метаданными.
+
+        :param video_ids: ID видео.
+        :param force: Загрузить метаданные, даже если они моложе TTL.
+        """
+        videos = (Video.objects.all() if force else Video.get_stale(cls.ttl())).filter(id__in=list(video_ids))
+
+        updated: List[Video] = []
+        for video in videos:
+            fields = cls.fetch(video.id)
+            if fields is None:
+                continue
+            for name, value in fields.items():
+                setattr(video, name, value)
+            video.fetched_at = timezone.now()
+            updated.append(video)
+        Video.objects.bulk_update(
+            updated, ['title', 'author_name', 'thumbnail_url', 'duration', 'available', 'fetched_at']
+        )
+        return len(updated)
+
+    @classmethod
+    def stale_batches(cls) -> Iterable[List[str]]:
+        """
+        Возвращает пачки по batch_size ID видео уроков с устаревшими метаданными.
+        """
+        video_ids = list(
+            Video.get_stale(cls.ttl()).filter(lessons__isnull=False).distinct().order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+        for start in range(0, len(video_ids), cls.batch_size):
+            yield video_ids[start:start + cls.batch_size]
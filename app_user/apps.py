@@ -5,3 +5,10 @@ class AppUserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_user'
     verbose_name = 'Пользователи'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from config.db import count_connection
+
+        connection_created.connect(count_connection, dispatch_uid='config.db.count_connection')
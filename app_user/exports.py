@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Type
+
+from django.db.models import QuerySet, Value
+
+from app_course.exports import SubscriptionExporter
+from config.export import Exporter
+from .filters import PaymentExportFilter
+from .models import CustomUser, Payment, PaymentArchive
+
+
+class PaymentExporter(Exporter):
+    """
+    Выгрузка платежей с адресом плательщика и названием курса для бухгалтерии.
+    Модератор выгружает все платежи, пользователь - свои.
+    Архивные платежи (payments_archive) выгружаются вместе с платежами, если не передан include_archived=false.
+    Строки упорядочены по ID: первичный ключ секций (id, payment_date) позволяет читать их
+    без сортировки всей выборки, поэтому первые строки отдаются сразу.
+    """
+    name = 'payments'
+    columns = (
+        ('id', 'id'),
+        ('payment_date', 'payment_date'),
+        ('email', 'user__email'),
+        ('course_id', 'paid_course_id'),
+        ('course', 'paid_course__name'),
+        ('amount', 'amount'),
+        ('status', 'status'),
+        ('is_confirmed', 'is_confirmed'),
+        ('payment_intent_id', 'payment_intent_id'),
+    )
+    filterset_class = PaymentExportFilter
+
+    @classmethod
+    def get_queryset(cls, user: CustomUser) -> QuerySet:
+        queryset = Payment.get_all_payments()
+        if user.is_staff:
+            return queryset
+        return queryset.filter(user=user)
+
+    @classmethod
+    def get_archived_queryset(cls, user: CustomUser) -> QuerySet:
+        """
+        Возвращает архивные платежи, доступные пользователю. Архивные платежи всегда подтверждены.
+
+        :param user: Пользователь, который запрашивает выгрузку.
+        """
+        queryset = PaymentArchive.objects.annotate(is_confirmed=Value(True))
+        if user.is_staff:
+            return queryset
+        return queryset.filter(user=user)
+
+    @classmethod
+    def get_querysets(cls, user: CustomUser, params: Dict[str, Any]) -> List[QuerySet]:
+        querysets = super().get_querysets(user, params)
+        archived = cls.apply_filters(cls.get_archived_queryset(user), params)
+        if archived.form.cleaned_data.get('include_archived') is not False:
+            querysets.append(archived.qs.order_by(*cls.ordering))
+        return querysets
+
+
+EXPORTERS: Dict[str, Type[Exporter]] = {
+    PaymentExporter.name: PaymentExporter,
+    SubscriptionExporter.name: SubscriptionExporter,
+}
@@ -0,0 +1,44 @@
+from typing import Any, Dict, Iterable, List
+
+from .serializers import PaymentSerializer
+
+
+class PaymentFastSerializer:
+    """
+    Сериализатор списка платежей только для чтения.
+
+    Строит словари напрямую из строк .values(), минуя поля DRF, и выдает
+    тот же JSON, что и PaymentSerializer (порядок ключей совпадает).
+    Дата и сумма платежа преобразуются полями PaymentSerializer,
+    чтобы формат времени и округление суммы совпадали.
+
+    Attrs:
+        - columns: Колонки, которые необходимо выбрать из QuerySet платежей.
+    """
+    columns = ('id', 'payment_intent_id', 'payment_method_id', 'user_id', 'user__email', 'payment_date',
+               'paid_course_id', 'amount', 'status', 'is_confirmed')
+
+    @classmethod
+    def to_representation(cls, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Преобразует строки платежей в список словарей.
+
+        :param rows: Строки QuerySet.values(*columns).
+        """
+        fields = PaymentSerializer().fields
+        payment_date = fields['payment_date'].to_representation
+        amount = fields['amount'].to_representation
+        return [
+            {
+                'id': row['id'],
+                'payment_intent_id': row['payment_intent_id'],
+                'payment_method_id': row['payment_method_id'],
+                'user': {'id': row['user_id'], 'email': row['user__email']},
+                'payment_date': payment_date(row['payment_date']) if row['payment_date'] is not None else None,
+                'paid_course': row['paid_course_id'],
+                'amount': amount(row['amount']),
+                'status': row['status'],
+                'is_confirmed': row['is_confirmed'],
+            }
+            for row in rows
+        ]
@@ -9,9 +9,33 @@ class PaymentFilter(django_filters.FilterSet):
 
     Фильтры:
     - paid_course: Числовой фильтр по полю "paid_course" (оплаченный курс).
+    - date_from, date_to: Платежи с даты date_from включительно по дату date_to не включительно
+      (ISO 8601). Запрос с этими фильтрами читает только секции таблицы платежей нужных месяцев.
+    - status: Stripe статус платежа.
     """
     paid_course = django_filters.NumberFilter(field_name="paid_course")
+    date_from = django_filters.IsoDateTimeFilter(field_name='payment_date', lookup_expr='gte')
+    date_to = django_filters.IsoDateTimeFilter(field_name='payment_date', lookup_expr='lt')
+    status = django_filters.CharFilter(field_name='status')
 
     class Meta:
         model = Payment
-        fields = ['paid_course']
+        fields = ['paid_course', 'date_from', 'date_to', 'status']
+
+
+class PaymentExportFilter(PaymentFilter):
+    """
+    Класс фильтров выгрузки платежей (см. app_user.exports.PaymentExporter).
+
+    Фильтры:
+    - Фильтры PaymentFilter.
+    - include_archived: Включать в выгрузку архивные платежи (по умолчанию - да).
+    """
+    include_archived = django_filters.BooleanFilter(method='filter_include_archived')
+
+    class Meta(PaymentFilter.Meta):
+        fields = PaymentFilter.Meta.fields + ['include_archived']
+
+    def filter_include_archived(self, queryset, name, value):
+        # Архивные платежи добавляет PaymentExporter.get_querysets, выборка не меняется.
+        return queryset
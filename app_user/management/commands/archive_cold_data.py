@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app_course.models import CourseSubscription
+from app_course.services import SubscriptionArchiveService
+from app_user.models import Payment
+from app_user.services import PaymentArchiveService
+from config.archive import table_size
+
+
+class Command(BaseCommand):
+    help = 'Move settled payments and long-inactive subscriptions to archive tables and report reclaimed space'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments-days', type=int, default=settings.PAYMENT_ARCHIVE_AFTER_DAYS,
+                            help='Archive confirmed payments older than this many days')
+        parser.add_argument('--subscriptions-days', type=int, default=settings.SUBSCRIPTION_ARCHIVE_AFTER_DAYS,
+                            help='Archive subscriptions cancelled more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                            help='Rows moved per transaction')
+        parser.add_argument('--vacuum', action='store_true', help='Run VACUUM ANALYZE on the tables afterwards')
+
+    def handle(self, *args, **options):
+        jobs = [
+            (PaymentArchiveService, Payment._meta.db_table, options['payments_days']),
+            (SubscriptionArchiveService, CourseSubscription._meta.db_table, options['subscriptions_days']),
+        ]
+        for service, table, days in jobs:
+            size_before = table_size(table)
+            result = service.archive(older_than=timedelta(days=days), batch_size=options['batch_size'])
+            if options['vacuum']:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'VACUUM ANALYZE {table}')
+            self.stdout.write(
+                f'{table}: archived {result.rows} rows, reclaimed {result.bytes} bytes of row data '
+                f'(table size {size_before} -> {table_size(table)} bytes)'
+            )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from kombu.exceptions import OperationalError
+
+from config.task_metrics import queue_depths, task_queues
+
+
+class Command(BaseCommand):
+    help = 'Print the number of messages waiting in each Celery queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queues', nargs='*', help='Queue names (default: all routed queues)')
+
+    def handle(self, *args, **options):
+        try:
+            depths = queue_depths(options['queues'] or task_queues())
+        except OperationalError as error:
+            raise CommandError(f'Broker is not available: {error}')
+        for queue, messages in depths.items():
+            self.stdout.write(f'{queue:<12} {messages:>8}')
@@ -0,0 +1,24 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Generate OpenAPI schema file served at /swagger.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.OPENAPI_SCHEMA_PATH, help='Path to the schema file')
+
+    def handle(self, *args, **options):
+        from config.schema import generate_schema
+
+        output = options['output']
+        schema = generate_schema()
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        # Файл заменяется атомарно, чтобы воркеры не отдали недописанную схему.
+        tmp_output = f'{output}.tmp'
+        with open(tmp_output, 'wb') as file:
+            file.write(schema)
+        os.replace(tmp_output, output)
+        self.stdout.write(f'OpenAPI schema written to {output} ({len(schema)} bytes)')
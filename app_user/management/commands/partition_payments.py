@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app_user.partitioning import MONTHS_AHEAD, ensure_partitions, is_partitioned, partition_payments
+
+
+class Command(BaseCommand):
+    help = ('Convert the payments table to monthly partitions without blocking writes '
+            '(run before the app_user.0006 migration), or create upcoming partitions if it is already partitioned')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows copied per transaction')
+        parser.add_argument('--months-ahead', type=int, default=MONTHS_AHEAD, help='Partitions created in advance')
+
+    def handle(self, *args, **options):
+        if is_partitioned():
+            created = ensure_partitions(options['months_ahead'])
+            self.stdout.write(f'payments is already partitioned, created partitions: {", ".join(created) or "none"}')
+            return
+        copied = partition_payments(batch_size=options['batch_size'], months_ahead=options['months_ahead'])
+        self.stdout.write(f'payments is partitioned by month, copied {copied} rows')
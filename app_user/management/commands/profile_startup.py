@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from config.startup import BOOT_SCRIPTS, measure_startup
+
+
+class Command(BaseCommand):
+    help = 'Report WSGI and Celery worker boot time: phases, imports by package and slowest imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=[*BOOT_SCRIPTS, 'all'], default='all')
+        parser.add_argument('--limit', type=int, default=15, help='Number of slowest imports to show')
+        parser.add_argument('--depth', type=int, default=None, help='Max nesting level of slowest imports')
+
+    def handle(self, *args, **options):
+        targets = list(BOOT_SCRIPTS) if options['target'] == 'all' else [options['target']]
+        for target in targets:
+            report = measure_startup(target)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{target}: {report.total * 1000:.1f} ms'))
+
+            self.stdout.write('  Phases:')
+            for name, seconds in report.phases.items():
+                self.stdout.write(f'    {name:<20} {seconds * 1000:8.1f} ms')
+
+            self.stdout.write('  Imports by package (cumulative / self, first imported by):')
+            for package, stats in report.packages().items():
+                self.stdout.write(
+                    f'    {package:<26} {stats.cumulative_us / 1000:8.1f} ms {stats.self_us / 1000:8.1f} ms'
+                    f'  {stats.imported_by or "-"}'
+                )
+
+            self.stdout.write('  Slowest imports (cumulative):')
+            for record in report.slowest(options['limit'], options['depth']):
+                self.stdout.write(f'    {record.cumulative_us / 1000:8.1f} ms  {"  " * record.level}{record.name}')
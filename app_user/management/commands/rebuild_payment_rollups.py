@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_user.services import RevenueService
+
+
+class Command(BaseCommand):
+    help = 'Recalculate daily payment rollups from confirmed and archived payments'
+
+    def handle(self, *args, **options):
+        rows = RevenueService.rebuild()
+        self.stdout.write(f'payment_rollups rebuilt: {rows} rows')
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-19 06:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_user', '0004_payment_is_confirmed_alter_payment_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='check_attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество проверок статуса'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время последней проверки статуса'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True, verbose_name='Время следующей проверки статуса'),
+        ),
+        # Подтвержденные и отмененные платежи больше не проверяются.
+        migrations.RunSQL(
+            sql="UPDATE payments SET next_check_at = NULL WHERE is_confirmed OR status = 'canceled'",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('next_check_at__isnull', False)), fields=['next_check_at'], name='payments_next_check_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2 on 2026-10-19 07:02
+
+from django.db import migrations
+
+# Переводит payments на секции по месяцам (UTC), если таблица еще не переведена командой partition_payments.
+# Строки копируются под блокировкой таблицы: для больших таблиц команду нужно выполнить до миграции.
+# Секции создаются с месяца самого раннего платежа на 3 месяца вперед, индексы и внешние ключи
+# переносятся с payments. SQL не зависит от app_user.partitioning, чтобы изменения модуля не меняли миграцию.
+PARTITION_PAYMENTS_SQL = r"""
+DO $$
+DECLARE
+    month timestamptz;
+    last_month timestamptz;
+    item record;
+    temporary_names text[] := '{}';
+    index_names text[] := '{}';
+    sequence_name text;
+    staging_sequence text;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('payments')) = 'p' THEN
+        RETURN;
+    END IF;
+    LOCK TABLE payments IN ACCESS EXCLUSIVE MODE;
+
+    CREATE TABLE payments_partitioned (LIKE payments INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY)
+        PARTITION BY RANGE (payment_date);
+    ALTER TABLE payments_partitioned ADD CONSTRAINT payments_partitioned_pkey PRIMARY KEY (id, payment_date);
+    CREATE TABLE payments_default PARTITION OF payments_partitioned DEFAULT;
+
+    SELECT date_trunc('month', coalesce(min(payment_date), now()), 'UTC') INTO month FROM payments;
+    last_month := (date_trunc('month', now(), 'UTC') AT TIME ZONE 'UTC' + interval '3 months') AT TIME ZONE 'UTC';
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF payments_partitioned FOR VALUES FROM (%L) TO (%L)',
+            'payments_p' || to_char(month AT TIME ZONE 'UTC', 'YYYY_MM'), month,
+            (month AT TIME ZONE 'UTC' + interval '1 month') AT TIME ZONE 'UTC'
+        );
+        month := (month AT TIME ZONE 'UTC' + interval '1 month') AT TIME ZONE 'UTC';
+    END LOOP;
+
+    FOR item IN SELECT indexrelid::regclass::text AS name, pg_get_indexdef(indexrelid) AS definition FROM pg_index
+                WHERE indrelid = 'payments'::regclass AND NOT indisprimary LOOP
+        temporary_names := temporary_names || ('payments_partitioned_idx' || cardinality(temporary_names));
+        index_names := index_names || item.name;
+        EXECUTE regexp_replace(
+            item.definition, 'INDEX ' || item.name || ' ON (\w+\.)?payments ',
+            'INDEX ' || temporary_names[cardinality(temporary_names)] || ' ON payments_partitioned '
+        );
+    END LOOP;
+
+    FOR item IN SELECT conname, pg_get_constraintdef(oid) AS definition FROM pg_constraint
+                WHERE conrelid = 'payments'::regclass AND contype = 'f' LOOP
+        EXECUTE format('ALTER TABLE payments_partitioned ADD CONSTRAINT %I %s', item.conname, item.definition);
+    END LOOP;
+
+    INSERT INTO payments_partitioned SELECT * FROM payments;
+
+    sequence_name := pg_get_serial_sequence('payments', 'id');
+    staging_sequence := pg_get_serial_sequence('payments_partitioned', 'id');
+    EXECUTE format('SELECT setval(%L, last_value, is_called) FROM %s', staging_sequence, sequence_name);
+
+    DROP TABLE payments;
+    ALTER TABLE payments_partitioned RENAME TO payments;
+    ALTER INDEX payments_partitioned_pkey RENAME TO payments_pkey;
+    FOR number IN 1 .. cardinality(index_names) LOOP
+        EXECUTE format('ALTER INDEX %s RENAME TO %s', temporary_names[number], index_names[number]);
+    END LOOP;
+    EXECUTE format('ALTER SEQUENCE %s RENAME TO %I', staging_sequence, split_part(sequence_name, '.', 2));
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_user', '0005_payment_reconciliation'),
+    ]
+
+    operations = [
+        # Обратная миграция оставляет таблицу секционированной: схема столбцов при этом не меняется.
+        migrations.RunSQL(PARTITION_PAYMENTS_SQL, migrations.RunSQL.noop),
+    ]
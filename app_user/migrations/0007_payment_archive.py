@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 06:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_course', '0007_subscription_archive'),
+        ('app_user', '0006_partition_payments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID платежа')),
+                ('payment_date', models.DateTimeField(verbose_name='Дата оплаты')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Сумма оплаты')),
+                ('payment_method_id', models.CharField(blank=True, max_length=50, null=True, verbose_name='ID метода платежа Stripe')),
+                ('payment_intent_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='ID намерения платежа Stripe')),
+                ('status', models.CharField(blank=True, max_length=50, null=True, verbose_name='Stripe cтатус платежа')),
+                ('archived_at', models.DateTimeField(verbose_name='Время переноса в архив')),
+                ('paid_course', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app_course.course', verbose_name='Оплаченный курс')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_payments', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивный платеж',
+                'verbose_name_plural': 'Архивные платежи',
+                'db_table': 'payments_archive',
+            },
+        ),
+    ]
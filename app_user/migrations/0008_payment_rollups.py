@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-19 06:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_course', '0007_subscription_archive'),
+        ('app_user', '0007_payment_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status', models.CharField(blank=True, default='', max_length=50, verbose_name='Stripe cтатус платежа')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество платежей')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма платежей')),
+                ('course', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app_course.course', verbose_name='Курс')),
+            ],
+            options={
+                'verbose_name': 'Сводка платежей',
+                'verbose_name_plural': 'Сводки платежей',
+                'db_table': 'payment_rollups',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='paymentrollup',
+            index=models.Index(fields=['day'], name='payment_rollups_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentrollup',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('course', 0), models.F('day'), models.F('status'), name='payment_rollups_key_uniq'),
+        ),
+    ]
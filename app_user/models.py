@@ -1,7 +1,10 @@
-from typing import List, Optional
+from decimal import Decimal
+from typing import List, Optional, Sequence
 
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from app_course.models import Course
 from app_image.models import UserImage
@@ -54,11 +57,20 @@ class Payment(models.Model):
                                          verbose_name='ID намерения платежа Stripe')
     status = models.CharField(max_length=50, blank=True, null=True, verbose_name='Stripe cтатус платежа')
     is_confirmed = models.BooleanField(default=False, verbose_name='Подтвержден')
+    last_checked_at = models.DateTimeField(**NULLABLE, verbose_name='Время последней проверки статуса')
+    next_check_at = models.DateTimeField(default=timezone.now, **NULLABLE,
+                                         verbose_name='Время следующей проверки статуса')
+    check_attempts = models.PositiveIntegerField(default=0, verbose_name='Количество проверок статуса')
 
     class Meta:
         verbose_name = 'Платеж'
         verbose_name_plural = 'Платежи'
         db_table = 'payments'
+        indexes = [
+            # Платежи, ожидающие сверки со Stripe (next_check_at сбрасывается у завершенных платежей).
+            models.Index(fields=['next_check_at'], condition=models.Q(next_check_at__isnull=False),
+                         name='payments_next_check_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.payment_date}"
@@ -80,9 +92,167 @@ class Payment(models.Model):
         except cls.DoesNotExist:
             return None
 
-    def confirm_payment(self) -> None:
+    @classmethod
+    def get_due_for_check(cls) -> models.QuerySet:
+        """
+        Возвращает неподтвержденные платежи с привязанным способом оплаты,
+        время проверки статуса которых наступило.
         """
-        Делает платеж подтвержденным.
+        return cls.objects.filter(
+            next_check_at__lte=timezone.now(),
+            is_confirmed=False,
+            payment_method_id__isnull=False,
+            payment_intent_id__isnull=False
+        )
+
+    def confirm_payment(self, update_fields: Sequence[str] = ()) -> None:
+        """
+        Делает платеж подтвержденным, прекращает проверку его статуса
+        и учитывает платеж в сводке выручки (один раз, даже при повторном подтверждении).
+        Платеж обновляется одним условным запросом UPDATE; условие на payment_date
+        ограничивает запрос секцией платежа. Поля is_confirmed и next_check_at метод устанавливает сам,
+        в update_fields они пропускаются.
+
+        :param update_fields: Поля платежа, измененные вызывающим кодом, которые нужно сохранить тем же запросом.
         """
         self.is_confirmed = True
-        self.save()
+        self.next_check_at = None
+        values = {name: getattr(self, name) for name in update_fields if name not in ('is_confirmed', 'next_check_at')}
+        payment = Payment.objects.filter(id=self.id, payment_date=self.payment_date)
+        with transaction.atomic():
+            newly_confirmed = payment.filter(is_confirmed=False).update(is_confirmed=True, next_check_at=None, **values)
+            if newly_confirmed:
+                PaymentRollup.add_payment(self)
+            elif values:
+                payment.update(**values)
+
+
+class PaymentArchive(models.Model):
+    """
+    Модель, описывающая архивный платеж: подтвержденный платеж, перенесенный из payments
+    (см. app_user.services.PaymentArchiveService). Хранит только поля, которые отдает API,
+    и сохраняет ID платежа.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID платежа')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_payments',
+                             verbose_name='Пользователь')
+    payment_date = models.DateTimeField(verbose_name='Дата оплаты')
+    paid_course = models.ForeignKey(Course, on_delete=models.SET_NULL, **NULLABLE, db_index=False,
+                                    verbose_name='Оплаченный курс')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Сумма оплаты')
+    payment_method_id = models.CharField(max_length=50, blank=True, null=True, verbose_name='ID метода платежа Stripe')
+    payment_intent_id = models.CharField(max_length=255, blank=True, null=True,
+                                         verbose_name='ID намерения платежа Stripe')
+    status = models.CharField(max_length=50, blank=True, null=True, verbose_name='Stripe cтатус платежа')
+    archived_at = models.DateTimeField(verbose_name='Время переноса в архив')
+
+    # В архив переносятся только подтвержденные платежи.
+    is_confirmed = True
+
+    class Meta:
+        verbose_name = 'Архивный платеж'
+        verbose_name_plural = 'Архивные платежи'
+        db_table = 'payments_archive'
+
+    def __str__(self):
+        return f"{self.user} - {self.payment_date}"
+
+    @classmethod
+    def get_by_id(cls, payment_id: int) -> Optional['PaymentArchive']:
+        """
+        Возвращает архивный платеж по ID платежа
+        """
+        try:
+            return cls.objects.select_related('user').get(id=payment_id)
+        except cls.DoesNotExist:
+            return None
+
+
+class PaymentRollup(models.Model):
+    """
+    Модель, описывающая сводку подтвержденных платежей за день: количество и сумма платежей
+    по курсу, дню оплаты (в часовом поясе TIME_ZONE) и статусу Stripe.
+    Строка обновляется при подтверждении платежа (см. Payment.confirm_payment),
+    история пересчитывается командой rebuild_payment_rollups.
+    ID курса хранится без внешнего ключа: выручка удаленного курса остается в сводке.
+    """
+    course = models.ForeignKey(Course, on_delete=models.DO_NOTHING, db_constraint=False, **NULLABLE,
+                               related_name='+', verbose_name='Курс')
+    day = models.DateField(verbose_name='День')
+    status = models.CharField(max_length=50, blank=True, default='', verbose_name='Stripe cтатус платежа')
+    count = models.PositiveIntegerField(default=0, verbose_name='Количество платежей')
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Сумма платежей')
+
+    class Meta:
+        verbose_name = 'Сводка платежей'
+        verbose_name_plural = 'Сводки платежей'
+        db_table = 'payment_rollups'
+        constraints = [
+            # Платежи без курса попадают в строку с course_id = NULL (0 в индексе).
+            models.UniqueConstraint(Coalesce('course', 0), 'day', 'status', name='payment_rollups_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='payment_rollups_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.course_id} {self.day} {self.status}: {self.count} / {self.total}'
+
+    @classmethod
+    def add_payment(cls, payment: Payment) -> None:
+        """
+        Учитывает подтвержденный платеж в сводке его дня одним запросом INSERT ... ON CONFLICT.
+
+        :param payment: Подтвержденный платеж.
+        """
+        sql = f"""
+            INSERT INTO {cls._meta.db_table} (course_id, day, status, count, total)
+            VALUES (%s, %s, %s, 1, %s)
+            ON CONFLICT ((coalesce(course_id, 0)), day, status)
+            DO UPDATE SET count = {cls._meta.db_table}.count + 1, total = {cls._meta.db_table}.total + EXCLUDED.total
+        """
+        day = timezone.localdate(payment.payment_date)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [payment.paid_course_id, day, payment.status or '', Decimal(payment.amount)])
+
+
+class Export(models.Model):
+    """
+    Модель, описывающая выгрузку, которая записывается в файл задачей Celery (см. app_user.tasks.run_export).
+    Для больших выгрузок, которые не успеют отдаться потоком за время HTTP-запроса.
+    """
+    STATUSES = (
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готова'),
+        ('failed', 'Ошибка'),
+    )
+    FORMATS = (
+        ('csv', 'CSV'),
+        ('xlsx', 'XLSX'),
+    )
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='exports', verbose_name='Пользователь')
+    dataset = models.CharField(max_length=50, verbose_name='Данные')
+    file_format = models.CharField(max_length=10, choices=FORMATS, default='csv', verbose_name='Формат файла')
+    params = models.JSONField(default=dict, blank=True, verbose_name='Параметры фильтров')
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending', verbose_name='Статус')
+    file = models.FileField(upload_to='exports/%Y/%m/', **NULLABLE, verbose_name='Файл')
+    rows = models.PositiveIntegerField(**NULLABLE, verbose_name='Количество строк')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время создания')
+    finished_at = models.DateTimeField(**NULLABLE, verbose_name='Время завершения')
+
+    class Meta:
+        verbose_name = 'Выгрузка'
+        verbose_name_plural = 'Выгрузки'
+        db_table = 'exports'
+
+    def __str__(self):
+        return f'{self.user} {self.dataset} {self.status}'
+
+    @classmethod
+    def get_for_user(cls, user: CustomUser) -> List['Export']:
+        """
+        Возвращает выгрузки пользователя
+        """
+        return cls.objects.filter(user=user)
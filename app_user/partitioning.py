@@ -0,0 +1,292 @@
+"""
+Секционирование таблицы платежей по месяцу payment_date (декларативное секционирование Postgres).
+
+Таблица payments секционирована по диапазону payment_date: секция payments_pYYYY_MM содержит платежи
+одного месяца (границы месяцев - по UTC), секция payments_default - платежи вне созданных секций.
+Секции создаются заранее на MONTHS_AHEAD месяцев вперед периодической задачей create_payment_partitions,
+поэтому секция по умолчанию обычно пуста. Запросы с условием на payment_date читают только секции
+нужных месяцев (partition pruning).
+
+Первичный ключ секционированной таблицы - (id, payment_date): уникальные ограничения должны включать
+ключ секционирования. Уникальность id обеспечивается последовательностью.
+
+Существующая таблица переводится на секции миграцией app_user.0006 (копированием под блокировкой)
+или заранее, без остановки записи, командой partition_payments: новая таблица заполняется пачками,
+изменения строк во время копирования переносятся триггером, таблицы меняются местами в короткой транзакции.
+"""
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'payments'
+DEFAULT_PARTITION = f'{TABLE}_default'
+MONTHS_AHEAD = 3
+# Таблица, заполняемая при переводе payments на секции.
+STAGING_TABLE = f'{TABLE}_partitioned'
+SYNC_FUNCTION = f'{TABLE}_partition_sync'
+
+
+def month_start(value: datetime) -> datetime:
+    """
+    Возвращает начало месяца (UTC), которому принадлежит момент времени.
+
+    :param value: Момент времени.
+    """
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """
+    Возвращает начало месяца, отстоящего от month на months месяцев.
+
+    :param month: Начало месяца.
+    :param months: Количество месяцев.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def month_range(first: datetime, last: datetime) -> List[datetime]:
+    """
+    Возвращает начала месяцев от first до last включительно.
+    """
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def is_partitioned(connection=default_connection, table: str = TABLE) -> bool:
+    """
+    Проверяет, что таблица секционирована.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def get_partitions(connection=default_connection, table: str = TABLE) -> List[str]:
+    """
+    Возвращает имена секций таблицы.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = to_regclass(%s) ORDER BY 1', [table]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def attach_partition(cursor, month: datetime, table: str = TABLE) -> bool:
+    """
+    Создает секцию месяца и присоединяет ее к таблице. Возвращает False, если секция уже существует.
+
+    Секция создается отдельной таблицей с ограничением на границы месяца, поэтому ATTACH PARTITION
+    не проверяет строки повторно. Платежи месяца, попавшие в секцию по умолчанию, переносятся в новую секцию.
+
+    :param cursor: Курсор соединения в открытой транзакции.
+    :param month: Начало месяца.
+    :param table: Секционированная таблица.
+    """
+    name = partition_name(month)
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+    if cursor.fetchone()[0]:
+        return False
+    start, end = month, add_months(month, 1)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(f'ALTER TABLE {name} ADD CONSTRAINT {name}_bounds '
+                   f'CHECK (payment_date >= %s AND payment_date < %s)', [start, end])
+    cursor.execute('SELECT partdefid::regclass::text FROM pg_partitioned_table '
+                   'WHERE partrelid = %s::regclass AND partdefid <> 0', [table])
+    default = cursor.fetchone()
+    if default:
+        cursor.execute(f'WITH moved AS (DELETE FROM {default[0]} WHERE payment_date >= %s AND payment_date < %s '
+                       f'RETURNING *) INSERT INTO {name} SELECT * FROM moved', [start, end])
+    cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', [start, end])
+    cursor.execute(f'ALTER TABLE {name} DROP CONSTRAINT {name}_bounds')
+    return True
+
+
+def ensure_partitions(months_ahead: int = MONTHS_AHEAD, now: Optional[datetime] = None,
+                      connection=default_connection) -> List[str]:
+    """
+    Создает секции payments с текущего месяца на months_ahead месяцев вперед и возвращает имена созданных секций.
+    Если таблица не секционирована, ничего не делает.
+
+    :param months_ahead: Количество месяцев вперед.
+    :param now: Текущее время (по умолчанию - timezone.now()).
+    :param connection: Соединение с базой данных.
+    """
+    if not is_partitioned(connection):
+        return []
+    current = month_start(now or timezone.now())
+    created = []
+    for month in month_range(current, add_months(current, months_ahead)):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            if attach_partition(cursor, month):
+                created.append(partition_name(month))
+    return created
+
+
+def create_partitioned_copy(cursor, months: List[datetime]) -> List[Tuple[str, str]]:
+    """
+    Создает пустую секционированную таблицу STAGING_TABLE со столбцами, ограничениями, индексами
+    и внешними ключами payments, секции месяцев и секцию по умолчанию.
+    Индексы создаются с временными именами, возвращаются пары (временное имя, имя индекса payments).
+
+    :param cursor: Курсор соединения в открытой транзакции.
+    :param months: Месяцы, для которых создаются секции.
+    """
+    cursor.execute(f'CREATE TABLE {STAGING_TABLE} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+                   f'INCLUDING IDENTITY) PARTITION BY RANGE (payment_date)')
+    cursor.execute(f'ALTER TABLE {STAGING_TABLE} ADD CONSTRAINT {STAGING_TABLE}_pkey PRIMARY KEY (id, payment_date)')
+    cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {STAGING_TABLE} DEFAULT')
+    for month in months:
+        attach_partition(cursor, month, table=STAGING_TABLE)
+
+    cursor.execute("SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index "
+                   "WHERE indrelid = %s::regclass AND NOT indisprimary", [TABLE])
+    renames = []
+    for number, (name, definition) in enumerate(cursor.fetchall()):
+        temporary = f'{STAGING_TABLE}_idx{number}'
+        cursor.execute(re.sub(rf'INDEX {name} ON (\w+\.)?{TABLE} ', f'INDEX {temporary} ON {STAGING_TABLE} ',
+                              definition))
+        renames.append((temporary, name))
+
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                   "WHERE conrelid = %s::regclass AND contype = 'f'", [TABLE])
+    for name, definition in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {STAGING_TABLE} ADD CONSTRAINT {name} {definition}')
+    return renames
+
+
+def install_sync_trigger(cursor) -> None:
+    """
+    Создает триггер, переносящий в STAGING_TABLE изменения строк payments на время копирования.
+    При изменении id или payment_date строка со старым ключом удаляется, иначе после замены таблиц
+    платеж останется в STAGING_TABLE дважды.
+    """
+    cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s "
+                   "AND table_schema = current_schema() AND column_name NOT IN ('id', 'payment_date')", [TABLE])
+    assignments = ', '.join(f'{column} = EXCLUDED.{column}' for column, in cursor.fetchall())
+    cursor.execute(f"""
+        CREATE FUNCTION {SYNC_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM {STAGING_TABLE} WHERE id = OLD.id AND payment_date = OLD.payment_date;
+            ELSE
+                IF TG_OP = 'UPDATE' AND (OLD.id, OLD.payment_date) IS DISTINCT FROM (NEW.id, NEW.payment_date) THEN
+                    DELETE FROM {STAGING_TABLE} WHERE id = OLD.id AND payment_date = OLD.payment_date;
+                END IF;
+                INSERT INTO {STAGING_TABLE} SELECT NEW.*
+                ON CONFLICT (id, payment_date) DO UPDATE SET {assignments};
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    cursor.execute(f'CREATE TRIGGER {SYNC_FUNCTION} AFTER INSERT OR UPDATE OR DELETE ON {TABLE} '
+                   f'FOR EACH ROW EXECUTE FUNCTION {SYNC_FUNCTION}()')
+
+
+def copy_batch(cursor, after_id: int, batch_size: int) -> Tuple[Optional[int], int]:
+    """
+    Копирует в STAGING_TABLE пачку строк payments с id больше after_id.
+    Возвращает (наибольший id пачки, количество строк пачки).
+
+    Строки пачки блокируются FOR SHARE до конца транзакции: изменение скопированной строки ждет
+    окончания копирования и переносится триггером. Строки, уже перенесенные триггером, не перезаписываются.
+
+    :param cursor: Курсор соединения в открытой транзакции.
+    :param after_id: Наибольший id предыдущей пачки.
+    :param batch_size: Размер пачки.
+    """
+    cursor.execute(f"""
+        WITH batch AS (SELECT * FROM {TABLE} WHERE id > %s ORDER BY id LIMIT %s FOR SHARE),
+             copied AS (INSERT INTO {STAGING_TABLE} SELECT * FROM batch ON CONFLICT DO NOTHING)
+        SELECT max(id), count(*) FROM batch
+    """, [after_id, batch_size])
+    return cursor.fetchone()
+
+
+def swap_tables(cursor, renames: List[Tuple[str, str]]) -> None:
+    """
+    Заменяет payments заполненной секционированной таблицей: удаляет payments и переименовывает
+    STAGING_TABLE, ее первичный ключ, индексы и последовательность id в имена payments.
+    Последовательность продолжает нумерацию payments.
+
+    :param cursor: Курсор соединения в открытой транзакции.
+    :param renames: Пары (временное имя, имя индекса payments) из create_partitioned_copy.
+    """
+    cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id'), pg_get_serial_sequence(%s, 'id')",
+                   [TABLE, STAGING_TABLE])
+    sequence, staging_sequence = cursor.fetchone()
+    cursor.execute(f'SELECT last_value, is_called FROM {sequence}')
+    cursor.execute('SELECT setval(%s, %s, %s)', [staging_sequence, *cursor.fetchone()])
+
+    cursor.execute(f'DROP TABLE {TABLE}')
+    cursor.execute(f'DROP FUNCTION IF EXISTS {SYNC_FUNCTION}()')
+    cursor.execute(f'ALTER TABLE {STAGING_TABLE} RENAME TO {TABLE}')
+    cursor.execute(f'ALTER INDEX {STAGING_TABLE}_pkey RENAME TO {TABLE}_pkey')
+    for temporary, name in renames:
+        cursor.execute(f'ALTER INDEX {temporary} RENAME TO {name}')
+    cursor.execute(f'ALTER SEQUENCE {staging_sequence} RENAME TO {sequence.split(".")[-1]}')
+
+
+def partition_payments(connection=default_connection, batch_size: Optional[int] = None,
+                       months_ahead: int = MONTHS_AHEAD) -> int:
+    """
+    Переводит таблицу payments на секции по месяцам и возвращает количество скопированных строк.
+    Секции создаются с месяца самого раннего платежа на months_ahead месяцев вперед.
+
+    Без batch_size все строки копируются одним запросом под блокировкой payments.
+    С batch_size перевод выполняется без остановки записи: каждый шаг - в отдельной транзакции,
+    строки копируются пачками, изменения во время копирования переносит триггер.
+
+    :param connection: Соединение с базой данных.
+    :param batch_size: Размер пачки копируемых строк.
+    :param months_ahead: Количество месяцев вперед.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(payment_date) FROM {TABLE}')
+        first = cursor.fetchone()[0] or timezone.now()
+    months = month_range(first, add_months(month_start(timezone.now()), months_ahead))
+
+    if batch_size is None:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+            renames = create_partitioned_copy(cursor, months)
+            cursor.execute(f'INSERT INTO {STAGING_TABLE} SELECT * FROM {TABLE}')
+            copied = cursor.rowcount
+            swap_tables(cursor, renames)
+        return copied
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        renames = create_partitioned_copy(cursor, months)
+        install_sync_trigger(cursor)
+
+    copied, after_id = 0, 0
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            last_id, count = copy_batch(cursor, after_id, batch_size)
+        if not count:
+            break
+        copied, after_id = copied + count, last_id
+        logger.info(f'Скопировано платежей: {copied}')
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        swap_tables(cursor, renames)
+    return copied
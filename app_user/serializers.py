@@ -1,12 +1,15 @@
 from typing import Dict, Any
 
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
 
 from app_course.models import Course
 from app_image.models import UserImage
 from app_image.serializers import UserImageSerializer
-from .models import CustomUser, Payment
+from .exports import EXPORTERS
+from .models import CustomUser, Export, Payment
 from .validators import PhoneValidator
 
 
@@ -198,7 +201,7 @@ class PaymentMethodCreateSerializer(serializers.Serializer):
         """
         Проверяет существование платежа с указанным ID намерения платежа.
         Проверяет не является ли этот платеж уже подтвержденным.
-        При успешной валидации возвращает словарь с данными.
+        При успешной валидации возвращает словарь с данными и найденным платежом (payment).
         :param data: Входные данные.
         """
         payment_intent_id = data.get('payment_intent_id')
@@ -207,6 +210,7 @@ class PaymentMethodCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError(f"Платеж с ID {payment_intent_id} не найден")
         if payment.is_confirmed:
             raise serializers.ValidationError(f"Платеж с ID {payment_intent_id} уже подтвержден")
+        data['payment'] = payment
         return data
 
 
@@ -224,7 +228,7 @@ class PaymentIntentConfirmSerializer(serializers.Serializer):
         Проверяет существование платежа с указанным ID намерения платежа.
         Проверяет привязан ли к платежу способ оплаты.
         Проверяет не является ли этот платеж уже подтвержденным.
-        При успешной валидации возвращает словарь с данными.
+        При успешной валидации возвращает словарь с данными и найденным платежом (payment).
         :param data: Входные данные.
         """
         payment_intent_id = data.get('payment_intent_id')
@@ -235,4 +239,114 @@ class PaymentIntentConfirmSerializer(serializers.Serializer):
             raise serializers.ValidationError(f"К платежу с ID {payment_intent_id} не привязан ни один способ оплаты")
         if payment.is_confirmed:
             raise serializers.ValidationError(f"Платеж с ID {payment_intent_id} уже подтвержден")
+        data['payment'] = payment
         return data
+
+
+class RevenueQuerySerializer(serializers.Serializer):
+    """
+    Сериализатор параметров отчета о выручке.
+
+    Поля:
+    - date_from: Первый день периода.
+    - date_to: Последний день периода (включительно).
+    - course: ID курса (необязательно).
+    """
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    course = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Проверяет, что период не пустой.
+
+        :param data: Входные данные.
+        """
+        if data['date_from'] > data['date_to']:
+            raise serializers.ValidationError('Дата начала периода позже даты окончания')
+        return data
+
+
+class RevenueTotalSerializer(serializers.Serializer):
+    """
+    Сериализатор количества и суммы подтвержденных платежей.
+    """
+    count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class RevenueCourseSerializer(RevenueTotalSerializer):
+    course = serializers.IntegerField(source='course_id', allow_null=True)
+
+
+class RevenueDaySerializer(RevenueTotalSerializer):
+    day = serializers.DateField()
+
+
+class RevenueSerializer(RevenueTotalSerializer):
+    """
+    Сериализатор отчета о выручке (см. RevenueService.get_revenue).
+
+    Поля:
+    - date_from, date_to: Период отчета.
+    - count, total: Количество и сумма подтвержденных платежей за период.
+    - courses: Количество и сумма по курсам.
+    - days: Количество и сумма по дням.
+    """
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    courses = RevenueCourseSerializer(many=True)
+    days = RevenueDaySerializer(many=True)
+
+
+class ExportSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор выгрузки в файл (см. app_user.tasks.run_export).
+
+    Поля:
+    - dataset: Данные (payments или subscriptions).
+    - file_format: Формат файла (csv или xlsx).
+    - params: Параметры фильтров, как в строке запроса потоковой выгрузки.
+    - status, rows, created_at, finished_at: Состояние выгрузки (только для чтения).
+    - download_url: Адрес файла готовой выгрузки (только для чтения).
+    """
+    dataset = serializers.ChoiceField(choices=list(EXPORTERS))
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Export
+        fields = ('id', 'dataset', 'file_format', 'params', 'status', 'rows', 'created_at', 'finished_at',
+                  'download_url')
+        read_only_fields = ('status', 'rows', 'created_at', 'finished_at')
+
+    def get_download_url(self, export: Export) -> Any:
+        if export.status != 'done':
+            return None
+        url = reverse('export_download', args=[export.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Проверяет параметры фильтров до постановки выгрузки в очередь.
+
+        :param data: Входные данные.
+        """
+        exporter = EXPORTERS[data['dataset']]
+        try:
+            exporter.filter_queryset(self.context['request'].user, data.get('params') or {})
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({'params': error.detail})
+        return data
+
+    def create(self, validated_data: Dict[str, Any]) -> Export:
+        """
+        Создает выгрузку и ставит задачу ее записи в очередь после фиксации транзакции.
+
+        :param validated_data: Проверенные данные сериализатора.
+        """
+        from .tasks import run_export
+
+        export = Export.objects.create(user=self.context['request'].user, **validated_data)
+        transaction.on_commit(lambda: run_export.delay(export.id))
+        return export
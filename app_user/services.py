@@ -1,10 +1,24 @@
-from typing import Dict, Any
+import logging
+import math
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 
-import requests
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, QuerySet, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from app_course.models import Course
-from app_user.models import Payment, CustomUser
+from app_user.models import Payment, PaymentArchive, PaymentRollup, CustomUser
+from config.archive import ArchiveResult, move_rows
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
 
 
 class StripeService:
@@ -14,10 +28,27 @@ class StripeService:
         - api_key: Ключ для работы с API Stripe.
         - headers: Заголовки.
         - base_url: Базовый URL.
+        - _local: HTTP-сессии для запросов к Stripe, по одной на поток (см. session).
     """
     api_key = settings.STRIPE_API_KEY
     headers = {'Authorization': f'Bearer {api_key}'}
     base_url = 'https://api.stripe.com/v1'
+    _local = threading.local()
+
+    @classmethod
+    def session(cls) -> 'requests.Session':
+        """
+        Возвращает HTTP-сессию текущего потока для запросов к Stripe, соединения с API переиспользуются.
+        requests.Session не потокобезопасна, поэтому потоки воркера gthread не делят одну сессию.
+        Модуль requests импортируется при первом запросе к Stripe, а не при запуске воркера.
+        """
+        session = getattr(cls._local, 'session', None)
+        if session is None:
+            import requests
+
+            session = cls._local.session = requests.Session()
+            session.headers.update(cls.headers)
+        return session
 
     @classmethod
     def create_payment_intent(cls, course_id: int, user: CustomUser) -> Dict[str, Any]:
@@ -37,7 +68,7 @@ class StripeService:
             ('metadata[user_id]', user.id)
         ]
 
-        response = requests.post(f'{cls.base_url}/payment_intents', headers=cls.headers, data=data)
+        response = cls.session().post(f'{cls.base_url}/payment_intents', data=data)
 
         if response.status_code != 200:
             raise Exception(f'Ошибка создания намерения платежа: {response.json()["error"]["message"]}')
@@ -66,7 +97,7 @@ class StripeService:
             'card[token]': payment_token,
         }
 
-        response = requests.post(f'{cls.base_url}/payment_methods', headers=cls.headers, data=data)
+        response = cls.session().post(f'{cls.base_url}/payment_methods', data=data)
         payment_method = response.json()
         if response.status_code != 200:
             raise Exception(f'Ошибка создания способа платежа: {payment_method["error"]["message"]}')
@@ -77,21 +108,20 @@ class StripeService:
     def attach_payment_method_to_intent(cls, payment_intent_id: str, payment_method_id: str) -> Dict[str, Any]:
         """
         Привязывает способ платежа к намерению платежа и возвращает данные ответа.
+        Статус платежа сохраняется одним запросом UPDATE (см. save_status).
 
         :param payment_intent_id: ID намерения платежа.
         :param payment_method_id: ID способа платежа.
         """
         url = f'{cls.base_url}/payment_intents/{payment_intent_id}'
         data = {'payment_method': payment_method_id}
-        response = requests.post(url, headers=cls.headers, data=data)
+        response = cls.session().post(url, data=data)
         response_data = response.json()
 
         if response.status_code != 200:
             raise Exception(f'Ошибка привязки метода платежа: {response_data["error"]["message"]}')
 
-        payment = Payment.get_by_payment_intent_id(payment_intent_id)
-        payment.status = response_data['status']
-        payment.save()
+        cls.save_status(Payment.objects.filter(payment_intent_id=payment_intent_id), response_data['status'])
 
         return response_data
 
@@ -99,41 +129,60 @@ class StripeService:
     def create_and_attach_payment_method(cls, payment_intent_id: str, payment_token: str) -> Dict[str, Any]:
         """
         Создает и привязывает способ платежа к намерению платежа и возвращает данные способа платежа.
+        ID способа платежа сохраняется одним запросом UPDATE.
 
         :param payment_intent_id: ID намерения платежа.
         :param payment_token: Токен платежа.
         :return: Данные способа платежа.
         """
         payment_method = cls.create_payment_method(payment_token)
-        payment = Payment.get_by_payment_intent_id(payment_intent_id)
-        payment.payment_method_id = payment_method['id']
-        payment.save()
+        Payment.objects.filter(payment_intent_id=payment_intent_id).update(payment_method_id=payment_method['id'])
 
         cls.attach_payment_method_to_intent(payment_intent_id, payment_method['id'])
         return payment_method
 
     @classmethod
-    def confirm_payment_intent(cls, payment_intent_id: str) -> Dict[str, Any]:
+    def confirm_payment_intent(cls, payment_intent_id: str, payment_method_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Подтверждает намерение платежа и возвращает данные ответа.
+        Статус платежа сохраняется одним запросом UPDATE (см. save_status).
 
         :param payment_intent_id: ID намерения платежа.
+        :param payment_method_id: ID способа платежа (если не передан, читается из платежа).
         """
-        payment = Payment.get_by_payment_intent_id(payment_intent_id)
+        payments = Payment.objects.filter(payment_intent_id=payment_intent_id)
+        if payment_method_id is None:
+            payment_method_id = payments.values_list('payment_method_id', flat=True).first()
 
         url = f'{cls.base_url}/payment_intents/{payment_intent_id}/confirm'
-        data = {'payment_method': payment.payment_method_id}
-        response = requests.post(url, headers=cls.headers, data=data)
+        data = {'payment_method': payment_method_id}
+        response = cls.session().post(url, data=data)
         response_data = response.json()
 
         if response.status_code != 200:
             raise Exception(f'Ошибка подтверждения платежа: {response_data["error"]["message"]}')
 
-        payment.status = response_data['status']
-        payment.save()
+        cls.save_status(payments, response_data['status'])
 
         return response_data
 
+    @staticmethod
+    def save_status(payments: QuerySet, status: str) -> None:
+        """
+        Сохраняет статус намерения платежа после действия пользователя. Неподтвержденный платеж
+        сверка проверит при следующем запуске: время проверки и счетчик проверок сбрасываются
+        тем же запросом UPDATE, иначе подтверждение ждало бы интервал backoff до часа.
+
+        :param payments: Платежи намерения.
+        :param status: Статус намерения в Stripe.
+        """
+        payments.update(
+            status=status,
+            check_attempts=Case(When(is_confirmed=False, then=0), default=F('check_attempts'),
+                                output_field=PositiveIntegerField()),
+            next_check_at=Case(When(is_confirmed=False, then=Value(timezone.now())), default=F('next_check_at')),
+        )
+
     @classmethod
     def retrieve_payment_intent(cls, payment_intent_id: str) -> Dict[str, Any]:
         """
@@ -142,22 +191,198 @@ class StripeService:
         :param payment_intent_id: ID намерения платежа.
         """
         url = f'{cls.base_url}/payment_intents/{payment_intent_id}'
-        response = requests.get(url, headers=cls.headers)
+        response = cls.session().get(url)
         response_data = response.json()
 
         if response_data.get('error'):
             raise Exception(f'{response_data["error"]["message"]}')
         return response.json()
 
+
+class PaymentReconciliationService:
+    """
+    Класс, описывающий сверку статусов неподтвержденных платежей со Stripe.
+
+    Воркеры забирают платежи пачками через SELECT ... FOR UPDATE SKIP LOCKED: строки, которые уже
+    забирает другой воркер, пропускаются. У забранных платежей время следующей проверки сдвигается
+    на время аренды, поэтому до окончания проверки их не заберет другая задача, а платежи упавшего
+    воркера снова станут доступны после окончания аренды. После каждой проверки интервал до следующей
+    удваивается, платежи в завершенных статусах больше не проверяются.
+    Attrs:
+        - batch_size: Количество платежей, проверяемых одной задачей.
+        - max_parallel_batches: Максимальное количество задач сверки, запускаемых одновременно.
+        - lease_seconds: Время аренды забранных платежей, секунды.
+        - backoff_base_seconds: Интервал до второй проверки платежа, секунды.
+        - backoff_max_seconds: Максимальный интервал между проверками, секунды.
+        - intent_expiry: Время, после которого намерение без способа платежа считается заброшенным.
+        - terminal_statuses: Статусы Stripe, после которых платеж больше не проверяется.
+    """
+    batch_size = 50
+    max_parallel_batches = 4
+    lease_seconds = 60
+    backoff_base_seconds = 5
+    backoff_max_seconds = 3600
+    intent_expiry = timedelta(hours=24)
+    terminal_statuses = ('canceled',)
+
     @classmethod
-    def confirm_payment(cls, payment_intent_id: str) -> None:
+    def batches_to_dispatch(cls) -> int:
+        """
+        Возвращает количество задач сверки, которые нужно запустить для платежей, время проверки которых наступило.
         """
-        Подтверждает платеж с указанным ID намерения платежа.
+        due = Payment.get_due_for_check().count()
+        return min(math.ceil(due / cls.batch_size), cls.max_parallel_batches)
 
-        :param payment_intent_id: ID намерения платежа
+    @classmethod
+    def claim_batch(cls) -> List[Payment]:
+        """
+        Забирает пачку платежей для проверки, начиная с давно не проверявшихся,
+        и сдвигает время их следующей проверки на время аренды.
+        Блокировки снимаются до обращения к Stripe.
         """
-        payment = Payment.get_by_payment_intent_id(payment_intent_id)
-        payment_intent = cls.retrieve_payment_intent(payment_intent_id)
+        with transaction.atomic():
+            payments = list(
+                Payment.get_due_for_check()
+                .select_for_update(skip_locked=True)
+                .order_by(F('last_checked_at').asc(nulls_first=True), 'id')[:cls.batch_size]
+            )
+            if payments:
+                lease_until = timezone.now() + timedelta(seconds=cls.lease_seconds)
+                Payment.objects.filter(id__in=[payment.id for payment in payments]).update(next_check_at=lease_until)
+        return payments
 
-        if payment_intent['status'] == 'succeeded' and payment:
-            payment.confirm_payment()
+    @classmethod
+    def backoff(cls, attempts: int) -> timedelta:
+        """
+        Возвращает интервал до следующей проверки платежа.
+
+        :param attempts: Количество выполненных проверок.
+        """
+        return timedelta(seconds=min(cls.backoff_base_seconds * 2 ** max(attempts - 1, 0), cls.backoff_max_seconds))
+
+    @classmethod
+    def is_terminal(cls, payment: Payment, now: datetime) -> bool:
+        """
+        Проверяет, что платеж больше не нужно проверять: намерение отменено
+        или так и осталось без способа платежа дольше intent_expiry.
+
+        :param payment: Платеж с актуальным статусом Stripe.
+        :param now: Время проверки.
+        """
+        if payment.status in cls.terminal_statuses:
+            return True
+        return payment.status == 'requires_payment_method' and payment.payment_date + cls.intent_expiry <= now
+
+    @classmethod
+    def reconcile(cls, payment: Payment) -> None:
+        """
+        Получает статус намерения платежа в Stripe, подтверждает успешный платеж,
+        прекращает проверку завершенного и назначает время следующей проверки остальным.
+        Ошибка Stripe не прерывает сверку пачки: платеж будет проверен повторно.
+
+        :param payment: Забранный на проверку платеж.
+        """
+        now = timezone.now()
+        payment.last_checked_at = now
+        payment.check_attempts += 1
+        payment.next_check_at = now + cls.backoff(payment.check_attempts)
+        try:
+            payment.status = StripeService.retrieve_payment_intent(payment.payment_intent_id)['status']
+        except Exception as error:
+            logger.warning(f'Не удалось получить статус платежа {payment.payment_intent_id}: {error}')
+        else:
+            if payment.status == 'succeeded':
+                payment.confirm_payment(update_fields=['status', 'last_checked_at', 'check_attempts'])
+                return
+            if cls.is_terminal(payment, now):
+                payment.next_check_at = None
+        payment.save(update_fields=['status', 'last_checked_at', 'check_attempts', 'next_check_at'])
+
+    @classmethod
+    def reconcile_batch(cls) -> int:
+        """
+        Забирает и проверяет пачку платежей, возвращает количество проверенных платежей.
+        """
+        payments = cls.claim_batch()
+        for payment in payments:
+            cls.reconcile(payment)
+        return len(payments)
+
+
+class PaymentArchiveService:
+    """
+    Класс, описывающий перенос подтвержденных платежей старше PAYMENT_ARCHIVE_AFTER_DAYS дней
+    в архивную таблицу payments_archive (см. config.archive).
+    Архивный платеж по-прежнему доступен по ID в /api/payments/<id>/.
+    Attrs:
+        - columns: Столбцы, переносимые в архив.
+    """
+    columns = [field.column for field in PaymentArchive._meta.concrete_fields if field.name != 'archived_at']
+
+    @classmethod
+    def archive(cls, older_than: Optional[timedelta] = None, batch_size: Optional[int] = None) -> ArchiveResult:
+        """
+        Переносит в архив подтвержденные платежи, совершенные раньше older_than назад.
+
+        :param older_than: Возраст платежа (по умолчанию - PAYMENT_ARCHIVE_AFTER_DAYS дней).
+        :param batch_size: Размер пачки (по умолчанию - ARCHIVE_BATCH_SIZE).
+        """
+        older_than = older_than or timedelta(days=settings.PAYMENT_ARCHIVE_AFTER_DAYS)
+        return move_rows(
+            Payment._meta.db_table, PaymentArchive._meta.db_table, cls.columns,
+            condition='is_confirmed AND payment_date < %s', params=[timezone.now() - older_than],
+            batch_size=batch_size or settings.ARCHIVE_BATCH_SIZE, key=('id', 'payment_date')
+        )
+
+
+class RevenueService:
+    """
+    Класс, описывающий отчеты о выручке по сводке подтвержденных платежей (PaymentRollup).
+    Attrs:
+        - rollups_table: Таблица сводки.
+    """
+    rollups_table = PaymentRollup._meta.db_table
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """
+        Пересчитывает сводку по подтвержденным платежам (включая архивные) и возвращает количество строк сводки.
+        Таблица сводки блокируется на время пересчета: подтверждения платежей ждут его окончания
+        и учитываются после него.
+        """
+        sql = f"""
+            INSERT INTO {cls.rollups_table} (course_id, day, status, count, total)
+            SELECT paid_course_id, (payment_date AT TIME ZONE %(tz)s)::date, coalesce(status, ''), count(*), sum(amount)
+            FROM (
+                SELECT paid_course_id, payment_date, status, amount FROM {Payment._meta.db_table} WHERE is_confirmed
+                UNION ALL
+                SELECT paid_course_id, payment_date, status, amount FROM {PaymentArchive._meta.db_table}
+            ) AS confirmed
+            GROUP BY 1, 2, 3
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {cls.rollups_table} IN EXCLUSIVE MODE')
+            cursor.execute(f'DELETE FROM {cls.rollups_table}')
+            cursor.execute(sql, {'tz': settings.TIME_ZONE})
+            return cursor.rowcount
+
+    @classmethod
+    def get_revenue(cls, date_from: date, date_to: date, course_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Возвращает количество и сумму подтвержденных платежей за период: итог, разбивку по курсам и по дням.
+
+        :param date_from: Первый день периода.
+        :param date_to: Последний день периода (включительно).
+        :param course_id: ID курса (по умолчанию - все курсы).
+        """
+        rollups = PaymentRollup.objects.filter(day__range=(date_from, date_to))
+        if course_id is not None:
+            rollups = rollups.filter(course_id=course_id)
+        totals = {'count': Coalesce(Sum('count'), 0), 'total': Coalesce(Sum('total'), Decimal(0))}
+        return {
+            'date_from': date_from,
+            'date_to': date_to,
+            **rollups.aggregate(**totals),
+            'courses': list(rollups.values('course_id').annotate(**totals).order_by('course_id')),
+            'days': list(rollups.values('day').annotate(**totals).order_by('day')),
+        }
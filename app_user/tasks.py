@@ -1,16 +1,28 @@
-from datetime import datetime, timedelta
+import logging
+from datetime import timedelta
 
 from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from config.task_metrics import record_items
+
+logger = logging.getLogger(__name__)
 
 
 def create_periodic_task() -> None:
     """
     Создает периодическую задачу для проверки и обновления статуса платежей.
-    Если задача уже существует, она не будет создаваться повторно.
+    Если задача уже существует, она не будет создаваться повторно
+    (у существующей задачи исправляется имя вызываемой задачи Celery).
+    Запуски, не взятые воркером за интервал, отбрасываются и не копятся в очереди платежей.
+    Также создаются ежедневные задачи обслуживания: создание секций таблицы платежей
+    перенос старых платежей и подписок в архив и обновление метаданных видео уроков,
+    а также ночной расчет аналитики курсов.
     """
-    from django_celery_beat.models import IntervalSchedule, PeriodicTask
+    from django_celery_beat.models import CrontabSchedule, IntervalSchedule, PeriodicTask
     interval, _ = IntervalSchedule.objects.get_or_create(every=5, period=IntervalSchedule.SECONDS)
-    task_name = 'app_user.tasks.py.check_and_update_payment_status'
+    task_name = 'app_user.tasks.check_and_update_payment_status'
     task_description = 'Check and Update Payment Status'
 
     existing_task = PeriodicTask.objects.filter(name=task_description).first()
@@ -20,26 +32,117 @@ def create_periodic_task() -> None:
             interval=interval,
             name=task_description,
             task=task_name,
+            expire_seconds=interval.every,
             enabled=True,
-            start_time=datetime.now() + timedelta(seconds=5)
+            start_time=timezone.now() + timedelta(seconds=5)
         )
         task.save()
+    elif existing_task.task != task_name:
+        existing_task.task = task_name
+        existing_task.expire_seconds = interval.every
+        existing_task.save(update_fields=['task', 'expire_seconds'])
+
+    daily, _ = IntervalSchedule.objects.get_or_create(every=1, period=IntervalSchedule.DAYS)
+    daily_tasks = {
+        'Create Payment Partitions': 'app_user.tasks.create_payment_partitions',
+        'Archive Payments': 'app_user.tasks.archive_payments',
+        'Archive Subscriptions': 'app_course.tasks.archive_subscriptions',
+        'Refresh Video Metadata': 'app_image.tasks.refresh_video_metadata',
+    }
+    for name, daily_task in daily_tasks.items():
+        PeriodicTask.objects.get_or_create(
+            name=name, defaults={'interval': daily, 'task': daily_task, 'start_time': timezone.now()}
+        )
 
+    nightly, _ = CrontabSchedule.objects.get_or_create(minute='0', hour='3', day_of_week='*', day_of_month='*',
+                                                       month_of_year='*', timezone=settings.TIME_ZONE)
+    PeriodicTask.objects.get_or_create(
+        name='Compute Course Analytics',
+        defaults={'crontab': nightly, 'task': 'app_course.tasks.compute_course_analytics'}
+    )
 
-@shared_task
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=30, time_limit=60)
 def check_and_update_payment_status() -> None:
     """
-    Проверяет и обновляет статус неподтвержденных платежей.
+    Запускает сверку статусов неподтвержденных платежей со Stripe.
+
+    Запускается каждые 5 секунд и только распределяет работу: по количеству платежей,
+    время проверки которых наступило, ставит в очередь до
+    PaymentReconciliationService.max_parallel_batches задач reconcile_payments,
+    каждая из которых забирает и проверяет свою пачку платежей.
+    """
+    from .services import PaymentReconciliationService
+    for _ in range(PaymentReconciliationService.batches_to_dispatch()):
+        reconcile_payments.delay()
 
-    Использует модель Payment для получения неподтвержденных платежей,
-    у которых есть указанные ID метода платежа и намерения платежа.
-    Затем вызывает метод StripeService.confirm_payment() для каждого платежа,
-    чтобы подтвердить его.
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=30, time_limit=60)
+def reconcile_payments() -> None:
+    """
+    Забирает пачку платежей, время проверки которых наступило, и сверяет их статусы со Stripe
+    (см. PaymentReconciliationService).
+    """
+    from .services import PaymentReconciliationService
+    record_items('payments_checked', PaymentReconciliationService.reconcile_batch())
+
+
+@shared_task(soft_time_limit=60, time_limit=90)
+def create_payment_partitions() -> None:
+    """
+    Создает секции таблицы платежей на несколько месяцев вперед (см. app_user.partitioning).
     """
-    from .models import Payment
-    from .services import StripeService
-    unconfirmed_payments = Payment.objects.filter(is_confirmed=False,
-                                                  payment_method_id__isnull=False,
-                                                  payment_intent_id__isnull=False)
-    for payment in unconfirmed_payments:
-        StripeService.confirm_payment(payment_intent_id=payment.payment_intent_id)
+    from .partitioning import ensure_partitions
+    ensure_partitions()
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=3600, time_limit=3660)
+def archive_payments() -> int:
+    """
+    Переносит старые подтвержденные платежи в архивную таблицу (см. PaymentArchiveService).
+    Возвращает количество перенесенных платежей.
+    """
+    from .services import PaymentArchiveService
+    result = PaymentArchiveService.archive()
+    record_items('payments_archived', result.rows)
+    logger.info(f'В архив перенесено платежей: {result.rows}, освобождено {result.bytes} байт')
+    return result.rows
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=3600, time_limit=3660)
+def run_export(export_id: int) -> int:
+    """
+    Записывает выгрузку в файл в хранилище медиафайлов (см. app_user.models.Export).
+    Строки читаются с реплики. Возвращает количество выгруженных строк.
+
+    :param export_id: ID выгрузки.
+    """
+    import tempfile
+
+    from django.core.files import File
+
+    from config.db import use_replica
+    from .exports import EXPORTERS
+    from .models import Export
+
+    export = Export.objects.select_related('user').get(id=export_id)
+    Export.objects.filter(id=export.id).update(status='running')
+    exporter = EXPORTERS[export.dataset]
+    try:
+        with tempfile.TemporaryFile() as file:
+            with use_replica():
+                export.rows = exporter.write(exporter.get_querysets(export.user, export.params),
+                                             export.file_format, file)
+            file.seek(0)
+            export.file.save(exporter.filename(export.file_format), File(file), save=False)
+    except Exception:
+        logger.exception(f'Ошибка выгрузки {export.id}')
+        export.status = 'failed'
+        raise
+    else:
+        export.status = 'done'
+        record_items('rows_exported', export.rows)
+    finally:
+        export.finished_at = timezone.now()
+        export.save(update_fields=['status', 'file', 'rows', 'finished_at'])
+    return export.rows
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app_course.models import Course
+from app_user.models import CustomUser, Payment, PaymentArchive
+from app_user.serializers import PaymentSerializer
+from app_user.services import PaymentArchiveService
+
+
+class PaymentArchiveTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='payer@example.com')
+        cls.other = CustomUser.objects.create(email='other@example.com')
+        course = Course.objects.create(name='Python', description='Python', created_by=cls.user)
+        payments = Payment.objects.bulk_create(
+            Payment(user=cls.user, paid_course=course, amount=1000 + i, payment_intent_id=f'pi_{i}',
+                    payment_method_id=f'pm_{i}', status='succeeded', is_confirmed=i < 5)
+            for i in range(7)
+        )
+        cls.old_ids = [payment.id for payment in payments[:5]] + [payments[5].id]
+        Payment.objects.filter(id__in=cls.old_ids).update(payment_date=timezone.now() - timedelta(days=400))
+        cls.recent_id = payments[6].id
+
+    def test_archive(self):
+        """
+        В архив пачками переносятся только подтвержденные платежи старше заданного возраста.
+        """
+        expected = {payment.id: PaymentSerializer(payment).data for payment in Payment.objects.filter(is_confirmed=True)}
+
+        result = PaymentArchiveService.archive(older_than=timedelta(days=365), batch_size=2)
+
+        self.assertEqual(result.rows, 5)
+        self.assertGreater(result.bytes, 0)
+        self.assertEqual(set(Payment.objects.values_list('id', flat=True)), {self.old_ids[5], self.recent_id})
+        archived = PaymentArchive.objects.select_related('user').order_by('id')
+        self.assertEqual({payment.id: PaymentSerializer(payment).data for payment in archived}, expected)
+        self.assertEqual(PaymentArchiveService.archive(older_than=timedelta(days=365)).rows, 0)
+
+    def test_detail_fallback(self):
+        """
+        Архивный платеж доступен по прежнему адресу только владельцу и модератору.
+        """
+        PaymentArchiveService.archive(older_than=timedelta(days=365))
+        client = APIClient()
+        url = f'/api/payments/{self.old_ids[0]}/'
+
+        client.force_authenticate(self.user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.old_ids[0])
+        self.assertTrue(response.json()['is_confirmed'])
+        self.assertEqual(client.get('/api/payments/999999/').status_code, 404)
+
+        client.force_authenticate(self.other)
+        self.assertEqual(client.get(url).status_code, 403)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_cold_data', payments_days=365, stdout=out)
+        self.assertIn('payments: archived 5 rows', out.getvalue())
+        self.assertIn('course_subscriptions: archived 0 rows', out.getvalue())
@@ -0,0 +1,179 @@
+import csv
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app_course.models import Course
+from app_course.services import SubscriptionService
+from app_user import tasks as user_tasks
+from app_user.exports import PaymentExporter
+from app_user.models import CustomUser, Export, Payment, PaymentArchive
+from app_user.services import PaymentArchiveService
+
+
+def read_csv(response) -> list:
+    content = b''.join(response.streaming_content).decode()
+    return list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+
+
+class ExportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create(email='staff@example.com', is_staff=True)
+        cls.users = [CustomUser.objects.create(email=f'user{i}@example.com') for i in range(2)]
+        cls.course = Course.objects.create(name='=HYPERLINK("http://example.com")', description='Course',
+                                           created_by=cls.users[0])
+        cls.payments = [
+            Payment.objects.create(user=cls.users[0], paid_course=cls.course, amount=1000, status='succeeded'),
+            Payment.objects.create(user=cls.users[0], amount=500, status='canceled'),
+            Payment.objects.create(user=cls.users[1], paid_course=cls.course, amount=1000, status='succeeded'),
+        ]
+        SubscriptionService.subscribe(cls.users[1], cls.course.id)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_csv(self):
+        """
+        CSV отдается потоком пачками по chunk_size строк, фильтры совпадают с фильтрами списка платежей.
+        """
+        self.client.force_authenticate(self.staff)
+        with mock.patch.object(PaymentExporter, 'chunk_size', 1):
+            response = self.client.get('/api/payments/export/', {'status': 'succeeded'})
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename="payments-', response['Content-Disposition'])
+        self.assertEqual(len(chunks), 2)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode().lstrip('\ufeff'))))
+        self.assertEqual(rows[0], [header for header, _ in PaymentExporter.columns])
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.payments[0].id), str(self.payments[2].id)])
+        self.assertEqual(rows[1][2:6], ['user0@example.com', str(self.course.id), f"'{self.course.name}", '1000.00'])
+
+    def test_user_payments(self):
+        self.client.force_authenticate(self.users[0])
+        rows = read_csv(self.client.get('/api/payments/export/'))
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.payments[0].id), str(self.payments[1].id)])
+
+        response = self.client.get('/api/payments/export/', {'date_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_from', response.json())
+
+    def test_xlsx(self):
+        """
+        XLSX продолжается на следующем листе, когда лист заполнен.
+        """
+        self.client.force_authenticate(self.staff)
+        with mock.patch.object(PaymentExporter, 'sheet_rows', 2):
+            response = self.client.get('/api/payments/export/', {'file_format': 'xlsx'})
+
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as workbook:
+            sheets = sorted(name for name in workbook.namelist() if name.startswith('xl/worksheets/sheet'))
+            second_sheet = workbook.read('xl/worksheets/sheet2.xml').decode()
+        self.assertEqual(sheets, ['xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml'])
+        self.assertIn('user1@example.com', second_sheet)
+
+    def test_archived_payments(self):
+        """
+        Архивные платежи выгружаются вместе с остальными в порядке ID, include_archived=false их исключает.
+        """
+        Payment.objects.filter(id=self.payments[0].id).update(is_confirmed=True,
+                                                              payment_date=timezone.now() - timedelta(days=400))
+        PaymentArchiveService.archive(older_than=timedelta(days=365))
+        self.assertTrue(PaymentArchive.objects.filter(id=self.payments[0].id).exists())
+        ids = [str(payment.id) for payment in self.payments]
+
+        self.client.force_authenticate(self.staff)
+        rows = read_csv(self.client.get('/api/payments/export/'))
+        self.assertEqual([row[0] for row in rows[1:]], ids)
+        self.assertEqual(rows[1][2:8], ['user0@example.com', str(self.course.id), f"'{self.course.name}", '1000.00',
+                                        'succeeded', 'True'])
+        rows = read_csv(self.client.get('/api/payments/export/', {'include_archived': 'false'}))
+        self.assertEqual([row[0] for row in rows[1:]], ids[1:])
+        rows = read_csv(self.client.get('/api/payments/export/', {'status': 'canceled'}))
+        self.assertEqual([row[0] for row in rows[1:]], [ids[1]])
+
+        self.client.force_authenticate(self.users[1])
+        rows = read_csv(self.client.get('/api/payments/export/'))
+        self.assertEqual([row[0] for row in rows[1:]], [ids[2]])
+
+        export = Export.objects.create(user=self.staff, dataset='payments')
+        with override_settings(MEDIA_ROOT=self.media_root):
+            self.assertEqual(user_tasks.run_export.apply(args=[export.id]).get(), 3)
+
+    def test_large_xlsx_queued(self):
+        """
+        XLSX больше xlsx_sync_rows строк не собирается во время запроса: создается выгрузка для задачи Celery.
+        """
+        self.client.force_authenticate(self.staff)
+        with mock.patch.object(PaymentExporter, 'xlsx_sync_rows', 2), \
+                mock.patch.object(user_tasks.run_export, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get('/api/payments/export/', {'file_format': 'xlsx', 'status': 'succeeded'})
+            self.assertEqual(response.status_code, 200)
+            delay.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get('/api/payments/export/', {'file_format': 'xlsx'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'pending')
+        export = Export.objects.get(id=response.json()['id'])
+        self.assertEqual((export.user, export.dataset, export.file_format, export.params),
+                         (self.staff, 'payments', 'xlsx', {}))
+        delay.assert_called_once_with(export.id)
+
+    def test_subscriptions(self):
+        """
+        Автор курса выгружает подписки на свои курсы.
+        """
+        self.client.force_authenticate(self.users[0])
+        rows = read_csv(self.client.get('/api/course-subscriptions/export/'))
+        self.assertEqual([row[1] for row in rows[1:]], ['user1@example.com'])
+
+        self.client.force_authenticate(self.users[1])
+        self.assertEqual(len(read_csv(self.client.get('/api/course-subscriptions/export/'))), 1)
+
+    def test_export_task(self):
+        """
+        Выгрузка через задачу Celery записывается в хранилище медиафайлов и доступна только автору.
+        """
+        self.client.force_authenticate(self.staff)
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch.object(user_tasks.run_export, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/exports/', {
+                    'dataset': 'payments', 'params': {'paid_course': self.course.id}
+                }, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()['status'], 'pending')
+            delay.assert_called_once_with(response.json()['id'])
+
+            self.assertEqual(user_tasks.run_export.apply(args=[response.json()['id']]).get(), 2)
+
+            detail = self.client.get(f'/api/exports/{response.json()["id"]}/').json()
+            self.assertEqual((detail['status'], detail['rows']), ('done', 2))
+            rows = read_csv(self.client.get(detail['download_url']))
+            self.assertEqual(len(rows), 3)
+
+            self.client.force_authenticate(self.users[0])
+            self.assertEqual(self.client.get(detail['download_url']).status_code, 404)
+
+    def test_export_validation(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.post('/api/exports/', {'dataset': 'payments', 'params': {'date_to': 'bad'}},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_to', response.json()['params'])
+        self.assertFalse(Export.objects.exists())
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase
+
+from app_course.models import Course
+from app_user.fast_serializers import PaymentFastSerializer
+from app_user.models import CustomUser, Payment
+from app_user.serializers import PaymentSerializer
+from config.renderers import ORJSONRenderer
+
+
+class PaymentFastSerializerParityTestCase(TestCase):
+    """
+    Быстрый сериализатор списка платежей выдает тот же JSON, что и PaymentSerializer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create(email='payer@example.com')
+        course = Course.objects.create(name='Python', description='Python', created_by=user)
+        payments = [
+            Payment(user=user, paid_course=course, amount=Decimal('50000'), payment_intent_id='pi_1',
+                    payment_method_id='pm_1', status='succeeded', is_confirmed=True),
+            Payment(user=user, paid_course=None, amount=Decimal('2000.5')),
+            Payment(user=user, paid_course=course, amount=Decimal('0.01'), payment_intent_id='pi_3',
+                    status='requires_payment_method'),
+        ]
+        Payment.objects.bulk_create(payments)
+        Payment.objects.filter(amount=Decimal('0.01')).update(
+            payment_date=datetime(2023, 7, 18, 7, 5, 56, 172000, tzinfo=dt_timezone.utc)
+        )
+
+    def test_payments(self):
+        queryset = Payment.objects.select_related('user').order_by('id')
+
+        expected = PaymentSerializer(queryset, many=True).data
+        actual = PaymentFastSerializer.to_representation(queryset.values(*PaymentFastSerializer.columns))
+
+        renderer = ORJSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
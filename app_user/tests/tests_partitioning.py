@@ -0,0 +1,154 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from app_user.filters import PaymentFilter
+from app_user.models import CustomUser, Payment
+from app_user.partitioning import (MONTHS_AHEAD, STAGING_TABLE, add_months, copy_batch, ensure_partitions,
+                                   get_partitions, is_partitioned, month_start, partition_name, partition_payments,
+                                   swap_tables)
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def partition_of(payment: Payment) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT tableoid::regclass::text FROM payments WHERE id = %s', [payment.id])
+        return cursor.fetchone()[0]
+
+
+class PaymentPartitioningTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='payer@example.com')
+
+    def test_months(self):
+        self.assertEqual(month_start(datetime(2026, 12, 31, 23, 30, tzinfo=dt_timezone.utc)), utc(2026, 12, 1))
+        self.assertEqual(add_months(utc(2026, 11, 1), 3), utc(2027, 2, 1))
+        self.assertEqual(add_months(utc(2027, 1, 1), -1), utc(2026, 12, 1))
+        self.assertEqual(partition_name(utc(2027, 2, 1)), 'payments_p2027_02')
+
+    def test_migrated_table(self):
+        """
+        Миграция секционирует payments и создает секции на MONTHS_AHEAD месяцев вперед.
+        """
+        current = month_start(timezone.now())
+        self.assertTrue(is_partitioned())
+        partitions = get_partitions()
+        self.assertIn('payments_default', partitions)
+        for months in range(MONTHS_AHEAD + 1):
+            self.assertIn(partition_name(add_months(current, months)), partitions)
+
+        payment = Payment.objects.create(user=self.user, amount=1000)
+        self.assertEqual(partition_of(payment), partition_name(current))
+
+    def test_ensure_partitions(self):
+        """
+        Секции создаются заранее, платежи месяца из секции по умолчанию переносятся в новую секцию.
+        """
+        payment = Payment.objects.create(user=self.user, amount=1000)
+        Payment.objects.filter(id=payment.id).update(payment_date=utc(2030, 2, 10))
+        self.assertEqual(partition_of(payment), 'payments_default')
+
+        created = ensure_partitions(months_ahead=2, now=utc(2030, 1, 20))
+
+        self.assertEqual(created, ['payments_p2030_01', 'payments_p2030_02', 'payments_p2030_03'])
+        self.assertEqual(partition_of(payment), 'payments_p2030_02')
+        self.assertEqual(ensure_partitions(months_ahead=2, now=utc(2030, 1, 20)), [])
+
+    def test_partition_pruning(self):
+        """
+        Запрос платежей за период читает только секции месяцев этого периода.
+        """
+        start = month_start(timezone.now())
+        queryset = PaymentFilter({'date_from': start.isoformat(), 'date_to': add_months(start, 1).isoformat()},
+                                 queryset=Payment.objects.order_by('payment_date')).qs
+
+        plan = queryset.explain()
+
+        self.assertIn(partition_name(start), plan)
+        scanned = {name for name in get_partitions() if name in plan}
+        self.assertEqual(scanned, {partition_name(start)})
+
+
+class OnlinePartitioningTestCase(TestCase):
+    """
+    Перевод несекционированной таблицы payments на секции пачками (команда partition_payments).
+    Таблица создается в схеме legacy, которая на время теста стоит первой в search_path.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(email='payer@example.com')
+        self.execute('CREATE SCHEMA legacy')
+        self.execute('SET LOCAL search_path TO legacy, public')
+        self.execute('''
+            CREATE TABLE payments (
+                id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                user_id bigint NOT NULL REFERENCES users (id),
+                amount integer NOT NULL,
+                payment_date timestamptz NOT NULL
+            )
+        ''')
+        self.execute('CREATE INDEX payments_user_id ON payments (user_id)')
+        for month in range(1, 7):
+            self.insert(month * 100, utc(2026, month, 10))
+
+    def execute(self, sql: str, params=None) -> list:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else []
+
+    def insert(self, amount: int, payment_date: datetime) -> None:
+        self.execute('INSERT INTO payments (user_id, amount, payment_date) VALUES (%s, %s, %s)',
+                     [self.user.id, amount, payment_date])
+
+    def test_changes_between_batches(self):
+        """
+        Изменения, удаления и перенос строк на другой месяц во время копирования попадают в новую таблицу,
+        перед заменой таблицы совпадают.
+        """
+        batches = []
+
+        def copy_and_change(cursor, after_id, batch_size):
+            result = copy_batch(cursor, after_id, batch_size)
+            batches.append(result)
+            if len(batches) == 1:
+                self.execute('UPDATE payments SET amount = 150 WHERE id = 1')
+                self.execute('UPDATE payments SET payment_date = %s WHERE id = 2', [utc(2026, 9, 15)])
+                self.execute('UPDATE payments SET payment_date = %s WHERE id = 4', [utc(2026, 8, 1)])
+                self.execute('DELETE FROM payments WHERE id = 5')
+                self.insert(700, utc(2025, 12, 31))
+            elif len(batches) == 2:
+                self.execute('DELETE FROM payments WHERE id = 3')
+                self.execute('UPDATE payments SET payment_date = %s WHERE id = 4', [utc(2026, 7, 1)])
+            return result
+
+        def compare_and_swap(cursor, renames):
+            self.assertEqual(self.execute(f'SELECT * FROM {STAGING_TABLE} ORDER BY id'),
+                             self.execute('SELECT * FROM payments ORDER BY id'))
+            swap_tables(cursor, renames)
+
+        with mock.patch('app_user.partitioning.copy_batch', side_effect=copy_and_change), \
+                mock.patch('app_user.partitioning.swap_tables', side_effect=compare_and_swap) as swap:
+            copied = partition_payments(batch_size=2)
+
+        swap.assert_called_once()
+        self.assertEqual(copied, 6)
+        self.assertTrue(is_partitioned())
+        self.assertEqual(self.execute('SELECT id, amount, tableoid::regclass::text FROM payments ORDER BY id'), [
+            (1, 150, 'payments_p2026_01'),
+            (2, 200, 'payments_p2026_09'),
+            (4, 400, 'payments_p2026_07'),
+            (6, 600, 'payments_p2026_06'),
+            (7, 700, 'payments_default'),
+        ])
+        self.assertEqual(self.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'legacy' "
+                                      "AND tablename = 'payments' ORDER BY 1"),
+                         [('payments_pkey',), ('payments_user_id',)])
+        self.insert(800, timezone.now())
+        self.assertEqual(self.execute('SELECT max(id) FROM payments'), [(8,)])
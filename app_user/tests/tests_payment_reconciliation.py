@@ -0,0 +1,199 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from app_user import tasks as user_tasks
+from app_user.models import CustomUser, Payment
+from app_user.services import PaymentReconciliationService, StripeService
+
+
+def create_payments(user: CustomUser, count: int, **fields) -> list:
+    return Payment.objects.bulk_create(
+        Payment(user=user, amount=1000, payment_method_id=f'pm_{i}', payment_intent_id=f'pi_{i}', **fields)
+        for i in range(count)
+    )
+
+
+class PaymentReconciliationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='payer@example.com')
+
+    def reconcile(self, payment: Payment, status: str) -> Payment:
+        with mock.patch('app_user.services.StripeService.retrieve_payment_intent', return_value={'status': status}):
+            PaymentReconciliationService.reconcile(payment)
+        payment.refresh_from_db()
+        return payment
+
+    def test_succeeded(self):
+        """
+        Успешное намерение подтверждает платеж, и платеж больше не проверяется.
+        """
+        payment = self.reconcile(create_payments(self.user, 1)[0], 'succeeded')
+
+        self.assertTrue(payment.is_confirmed)
+        self.assertEqual(payment.status, 'succeeded')
+        self.assertIsNone(payment.next_check_at)
+        self.assertFalse(Payment.get_due_for_check().exists())
+
+    def test_backoff(self):
+        """
+        Интервал между проверками ожидающего платежа удваивается до backoff_max_seconds.
+        """
+        payment = create_payments(self.user, 1)[0]
+        intervals = []
+        for _ in range(12):
+            payment = self.reconcile(payment, 'processing')
+            intervals.append((payment.next_check_at - payment.last_checked_at).total_seconds())
+
+        self.assertEqual(intervals[:4], [5, 10, 20, 40])
+        self.assertEqual(intervals[-1], PaymentReconciliationService.backoff_max_seconds)
+        self.assertEqual(payment.check_attempts, 12)
+
+    def test_user_action_resets_backoff(self):
+        """
+        Платеж, который пользователь подтвердил во время интервала backoff, забирается следующей пачкой.
+        """
+        payment = create_payments(self.user, 1)[0]
+        for _ in range(12):
+            payment = self.reconcile(payment, 'processing')
+        self.assertEqual(PaymentReconciliationService.claim_batch(), [])
+
+        response = mock.Mock(status_code=200, json=mock.Mock(return_value={'id': 'pi_0', 'status': 'succeeded'}))
+        with mock.patch.object(StripeService, 'session') as session:
+            session.return_value.post.return_value = response
+            StripeService.confirm_payment_intent(payment.payment_intent_id)
+
+        self.assertEqual(PaymentReconciliationService.claim_batch(), [payment])
+        payment = self.reconcile(Payment.objects.get(id=payment.id), 'succeeded')
+        self.assertEqual((payment.is_confirmed, payment.check_attempts), (True, 1))
+
+    def test_terminal_statuses(self):
+        """
+        Отмененные намерения и намерения без способа платежа старше intent_expiry больше не проверяются.
+        """
+        canceled, fresh, expired = create_payments(self.user, 3)
+        Payment.objects.filter(id=expired.id).update(
+            payment_date=timezone.now() - PaymentReconciliationService.intent_expiry - timedelta(minutes=1)
+        )
+        expired.refresh_from_db()
+
+        self.assertIsNone(self.reconcile(canceled, 'canceled').next_check_at)
+        self.assertIsNotNone(self.reconcile(fresh, 'requires_payment_method').next_check_at)
+        self.assertIsNone(self.reconcile(expired, 'requires_payment_method').next_check_at)
+
+    @mock.patch('app_user.services.StripeService.retrieve_payment_intent', side_effect=Exception('No such intent'))
+    def test_stripe_error(self, retrieve_payment_intent):
+        """
+        Ошибка Stripe не прерывает пачку, платеж проверяется повторно позже.
+        """
+        create_payments(self.user, 2, status='succeeded')
+
+        with self.assertLogs('app_user.services', level='WARNING'):
+            self.assertEqual(PaymentReconciliationService.reconcile_batch(), 2)
+
+        self.assertEqual(retrieve_payment_intent.call_count, 2)
+        for payment in Payment.objects.all():
+            self.assertFalse(payment.is_confirmed)
+            self.assertEqual(payment.check_attempts, 1)
+            self.assertGreater(payment.next_check_at, payment.last_checked_at)
+
+    def test_claim_batch(self):
+        """
+        Пачка начинается с давно не проверявшихся платежей, забранные платежи не забираются повторно.
+        """
+        payments = create_payments(self.user, 3)
+        now = timezone.now()
+        Payment.objects.filter(id=payments[0].id).update(last_checked_at=now - timedelta(minutes=1))
+        Payment.objects.filter(id=payments[1].id).update(last_checked_at=now - timedelta(minutes=5))
+        create_payments(self.user, 1, next_check_at=now + timedelta(minutes=1))
+        create_payments(self.user, 1, is_confirmed=True)
+
+        with mock.patch.object(PaymentReconciliationService, 'batch_size', 2):
+            first = PaymentReconciliationService.claim_batch()
+            second = PaymentReconciliationService.claim_batch()
+
+        self.assertEqual([payment.id for payment in first], [payments[2].id, payments[1].id])
+        self.assertEqual([payment.id for payment in second], [payments[0].id])
+        self.assertEqual(PaymentReconciliationService.claim_batch(), [])
+
+    def test_dispatch(self):
+        """
+        Периодическая задача запускает задачу сверки на каждую пачку, но не больше max_parallel_batches.
+        """
+        with mock.patch.object(user_tasks.reconcile_payments, 'delay') as delay:
+            user_tasks.check_and_update_payment_status.apply()
+            self.assertEqual(delay.call_count, 0)
+
+            create_payments(self.user, 120)
+            user_tasks.check_and_update_payment_status.apply()
+            self.assertEqual(delay.call_count, 3)
+
+            create_payments(self.user, 500)
+            delay.reset_mock()
+            user_tasks.check_and_update_payment_status.apply()
+            self.assertEqual(delay.call_count, PaymentReconciliationService.max_parallel_batches)
+
+
+class PaymentClaimConcurrencyTestCase(TransactionTestCase):
+    """
+    Одновременная выборка платежей несколькими воркерами.
+    Каждый поток использует собственное соединение с базой данных.
+    """
+    serialized_rollback = True
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(email='payer@example.com')
+        self.payments = create_payments(self.user, 10)
+
+    def test_concurrent_claims(self):
+        """
+        Одновременные задачи сверки забирают непересекающиеся пачки.
+        """
+        barrier = threading.Barrier(4)
+
+        def claim(_):
+            try:
+                barrier.wait()
+                return [payment.id for payment in PaymentReconciliationService.claim_batch()]
+            finally:
+                connection.close()
+
+        with mock.patch.object(PaymentReconciliationService, 'batch_size', 3):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                batches = list(executor.map(claim, range(4)))
+
+        claimed = [payment_id for batch in batches for payment_id in batch]
+        self.assertEqual(sorted(claimed), sorted(payment.id for payment in self.payments))
+
+    def test_skip_locked(self):
+        """
+        Строки, заблокированные другой транзакцией, пропускаются без ожидания.
+        """
+        locked, claimed = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    Payment.objects.select_for_update().filter(id=self.payments[0].id).get()
+                    locked.set()
+                    claimed.wait(timeout=10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait(timeout=10)
+        try:
+            batch = PaymentReconciliationService.claim_batch()
+        finally:
+            claimed.set()
+            thread.join()
+
+        self.assertEqual(len(batch), 9)
+        self.assertNotIn(self.payments[0].id, [payment.id for payment in batch])
@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app_course.models import Course
+from app_user.models import CustomUser, Payment, PaymentRollup
+from app_user.services import StripeService
+from config.tests.utils import writes
+
+
+def stripe_response(data: dict) -> mock.Mock:
+    return mock.Mock(status_code=200, json=mock.Mock(return_value=data))
+
+
+class PaymentUpdatesTestCase(APITestCase):
+    """
+    Платеж изменяется условными запросами UPDATE только нужных полей, без повторного чтения.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='payer@example.com')
+        cls.course = Course.objects.create(name='Python', description='Course', created_by=cls.user)
+
+    def setUp(self):
+        self.payment = Payment.objects.create(user=self.user, paid_course=self.course, amount=1000,
+                                              payment_intent_id='pi_1', status='requires_payment_method')
+        self.client.force_authenticate(self.user)
+        session = mock.patch.object(StripeService, 'session')
+        self.session = session.start().return_value
+        self.addCleanup(session.stop)
+
+    def test_create_payment_method(self):
+        """
+        Способ оплаты и статус платежа сохраняются двумя запросами UPDATE без повторного чтения платежа.
+        """
+        self.session.post.side_effect = [
+            stripe_response({'id': 'pm_1'}), stripe_response({'id': 'pi_1', 'status': 'requires_confirmation'})
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/payments/method/create', {
+                'payment_intent_id': 'pi_1', 'payment_token': 'tok_visa'
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.json()['payment_method_id'], response.json()['status']),
+                         ('pm_1', 'requires_confirmation'))
+        method_update, status_update = writes(queries)
+        self.assertRegex(method_update, r'^UPDATE "payments" SET "payment_method_id" = \S+ WHERE')
+        self.assertRegex(status_update, r'^UPDATE "payments" SET "status" = \S+, "check_attempts" = CASE .* WHERE')
+
+    def test_confirm_payment_intent(self):
+        """
+        Подтверждение намерения платежа сохраняет только статус, платеж не читается повторно.
+        """
+        Payment.objects.filter(id=self.payment.id).update(payment_method_id='pm_1')
+        self.session.post.return_value = stripe_response({'id': 'pi_1', 'status': 'succeeded'})
+        # Платеж при проверке запроса, обновление статуса и пользователь платежа в ответе.
+        with self.assertNumQueries(3), CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/payments/confirm/', {'payment_intent_id': 'pi_1'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['status'], 'succeeded')
+        self.assertEqual(self.session.post.call_args.kwargs['data'], {'payment_method': 'pm_1'})
+        (status_update,) = writes(queries)
+        self.assertRegex(status_update, r'^UPDATE "payments" SET "status" = \S+, "check_attempts" = CASE .* WHERE')
+
+    def test_confirm_payment(self):
+        """
+        Подтверждение - один условный UPDATE платежа; повторное подтверждение не учитывается в сводке.
+        """
+        self.payment.status = 'succeeded'
+        with CaptureQueriesContext(connection) as queries:
+            self.payment.confirm_payment(update_fields=['status'])
+        payment_update, rollup_insert = writes(queries)
+        self.assertRegex(payment_update, r'^UPDATE "payments" SET "is_confirmed" = true, "next_check_at" = NULL, '
+                                         r'"status" = \S+ WHERE .*"is_confirmed"\)')
+        self.assertIn('"payment_date" = ', payment_update)
+        self.assertTrue(rollup_insert.startswith('INSERT INTO payment_rollups'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.payment.confirm_payment()
+        self.assertEqual(len(writes(queries)), 1)
+        payment = Payment.objects.get(id=self.payment.id)
+        self.assertEqual((payment.is_confirmed, payment.status, payment.next_check_at), (True, 'succeeded', None))
+        self.assertEqual(PaymentRollup.objects.get().count, 1)
+
+    def test_confirm_payment_skips_own_fields(self):
+        """
+        Поля, которые confirm_payment устанавливает сам, в update_fields пропускаются.
+        """
+        self.payment.status = 'succeeded'
+        with CaptureQueriesContext(connection) as queries:
+            self.payment.confirm_payment(update_fields=['status', 'is_confirmed', 'next_check_at'])
+        payment_update, _ = writes(queries)
+        self.assertRegex(payment_update, r'^UPDATE "payments" SET "is_confirmed" = true, "next_check_at" = NULL, '
+                                         r'"status" = \S+ WHERE')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.payment.confirm_payment(update_fields=['is_confirmed'])
+        self.assertEqual(len(writes(queries)), 1)
+        self.assertEqual(PaymentRollup.objects.get().count, 1)
@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from app_course.models import Course
+from app_user.models import CustomUser, Payment, PaymentRollup
+from app_user.services import PaymentArchiveService, RevenueService
+
+
+def rollups() -> list:
+    return sorted(PaymentRollup.objects.values_list('course_id', 'day', 'status', 'count', 'total'),
+                  key=lambda row: (row[0] or 0, row[1], row[2]))
+
+
+class RevenueTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='payer@example.com')
+        cls.staff = CustomUser.objects.create(email='staff@example.com', is_staff=True)
+        cls.courses = [Course.objects.create(name=f'Course {i}', description='Course', created_by=cls.user)
+                       for i in range(2)]
+        # 22:30 UTC 1 марта - 2 марта по Москве (TIME_ZONE).
+        cls.moments = [datetime(2026, 3, 1, 22, 30, tzinfo=dt_timezone.utc),
+                       datetime(2026, 3, 5, 10, 0, tzinfo=dt_timezone.utc)]
+
+    def create_payment(self, course, amount, moment) -> Payment:
+        payment = Payment.objects.create(user=self.user, paid_course=course, amount=amount, status='succeeded')
+        Payment.objects.filter(id=payment.id).update(payment_date=moment)
+        payment.refresh_from_db()
+        return payment
+
+    def confirm_payments(self) -> None:
+        for course, amount, moment in [(self.courses[0], '1000', self.moments[0]),
+                                       (self.courses[0], '500.50', self.moments[0]),
+                                       (self.courses[1], '2000', self.moments[1]),
+                                       (None, '300', self.moments[1])]:
+            self.create_payment(course, Decimal(amount), moment).confirm_payment()
+
+    def test_incremental(self):
+        """
+        Подтверждение платежа увеличивает сводку его курса и дня, повторное подтверждение не учитывается.
+        """
+        self.confirm_payments()
+        Payment.objects.filter(paid_course=self.courses[1]).get().confirm_payment()
+        self.create_payment(self.courses[1], Decimal('999'), self.moments[1])
+
+        self.assertEqual(rollups(), [
+            (None, date(2026, 3, 5), 'succeeded', 1, Decimal('300.00')),
+            (self.courses[0].id, date(2026, 3, 2), 'succeeded', 2, Decimal('1500.50')),
+            (self.courses[1].id, date(2026, 3, 5), 'succeeded', 1, Decimal('2000.00')),
+        ])
+
+    def test_rebuild(self):
+        """
+        Пересчет сводки по платежам, включая архивные, совпадает со сводкой, накопленной при подтверждении.
+        """
+        self.confirm_payments()
+        expected = rollups()
+        PaymentArchiveService.archive(older_than=timedelta(days=1))
+        PaymentRollup.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_payment_rollups', stdout=out)
+
+        self.assertEqual(rollups(), expected)
+        self.assertEqual(RevenueService.rebuild(), 3)
+
+    def test_endpoint(self):
+        self.confirm_payments()
+        client = APIClient()
+        client.force_authenticate(self.staff)
+
+        with self.assertNumQueries(3):
+            response = client.get('/api/payments/revenue/', {'date_from': '2026-03-01', 'date_to': '2026-03-31'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'date_from': '2026-03-01', 'date_to': '2026-03-31', 'count': 4, 'total': '3800.50',
+            'courses': [
+                {'course': self.courses[0].id, 'count': 2, 'total': '1500.50'},
+                {'course': self.courses[1].id, 'count': 1, 'total': '2000.00'},
+                {'course': None, 'count': 1, 'total': '300.00'},
+            ],
+            'days': [
+                {'day': '2026-03-02', 'count': 2, 'total': '1500.50'},
+                {'day': '2026-03-05', 'count': 2, 'total': '2300.00'},
+            ],
+        })
+
+        response = client.get('/api/payments/revenue/',
+                              {'date_from': '2026-03-03', 'date_to': '2026-03-31', 'course': self.courses[0].id})
+        self.assertEqual((response.json()['count'], response.json()['total'], response.json()['days']), (0, '0.00', []))
+        self.assertEqual(client.get('/api/payments/revenue/', {'date_from': '2026-03-31', 'date_to': '2026-03-01'})
+                         .status_code, 400)
+
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/payments/revenue/', {'date_from': '2026-03-01', 'date_to': '2026-03-31'})
+                         .status_code, 403)
@@ -0,0 +1,28 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from app_user.services import StripeService
+
+
+class StripeSessionTestCase(SimpleTestCase):
+    def test_session_per_thread(self):
+        """
+        Каждый поток получает свою HTTP-сессию с заголовком авторизации и переиспользует ее.
+        """
+        sessions = {}
+
+        def get_sessions(name: str) -> None:
+            sessions[name] = (StripeService.session(), StripeService.session())
+
+        threads = [threading.Thread(target=get_sessions, args=(name,)) for name in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        (first, first_again), (second, second_again) = sessions['first'], sessions['second']
+        self.assertIs(first, first_again)
+        self.assertIs(second, second_again)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.headers['Authorization'], StripeService.headers['Authorization'])
@@ -1,25 +1,36 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
+    LoginView,
     UserRegisterView,
     UserListAPIView,
     UserRetrieveUpdateDestroyAPIView,
     PaymentListView,
     PaymentRetrieveView,
+    PaymentExportView,
+    ExportListCreateView,
+    ExportRetrieveView,
+    ExportDownloadView,
+    RevenueView,
     PaymentIntentCreateView,
     PaymentMethodCreateView,
     PaymentIntentConfirmView
 )
 
 urlpatterns = [
-    path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('login/', LoginView.as_view(), name='token_obtain_pair'),
     path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', UserRegisterView.as_view(), name='register'),
     path('users/', UserListAPIView.as_view(), name='user_list'),
     path('users/<int:pk>/', UserRetrieveUpdateDestroyAPIView.as_view(), name='user_detail'),
     path('payments/', PaymentListView.as_view(), name='payment_list'),
     path('payments/<int:pk>/', PaymentRetrieveView.as_view(), name='payment_detail'),
+    path('payments/revenue/', RevenueView.as_view(), name='payment_revenue'),
+    path('payments/export/', PaymentExportView.as_view(), name='payment_export'),
+    path('exports/', ExportListCreateView.as_view(), name='export_list'),
+    path('exports/<int:pk>/', ExportRetrieveView.as_view(), name='export_detail'),
+    path('exports/<int:pk>/download/', ExportDownloadView.as_view(), name='export_download'),
     path('payments/create/', PaymentIntentCreateView.as_view(), name='payment_create'),
     path('payments/method/create', PaymentMethodCreateView.as_view(), name='payment_method_create'),
     path('payments/confirm/', PaymentIntentConfirmView.as_view(), name='payments_confirm'),
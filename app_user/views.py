@@ -1,29 +1,44 @@
+import os
+from typing import Union
+
+from django.http import FileResponse, Http404
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_yasg import openapi
-from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, status
 from rest_framework.filters import OrderingFilter
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenObtainPairView
 
+from config.export import ExportView
+from config.openapi import QueryParameter, ResponseSpec, swagger_auto_schema
+from .fast_serializers import PaymentFastSerializer
 from .filters import PaymentFilter
-from .models import CustomUser, Payment
+from .exports import PaymentExporter
+from .models import CustomUser, Export, Payment, PaymentArchive
 from .permissions import ProfilePermission, PaymentPermission
 from .serializers import (
     CustomUserSerializer,
+    ExportSerializer,
     PaymentSerializer,
     RegisterUserSerializer,
     PaymentIntentCreateSerializer,
     PaymentMethodCreateSerializer,
     PaymentIntentConfirmSerializer,
+    RevenueQuerySerializer,
+    RevenueSerializer,
 )
-from .services import StripeService
+from .services import RevenueService, StripeService
+
+
+class LoginView(TokenObtainPairView):
+    throttle_scope = 'login'
 
 
 class UserRegisterView(generics.CreateAPIView):
     queryset = CustomUser.get_all_users()
     permission_classes = (AllowAny,)
+    throttle_scope = 'register'
     serializer_class = RegisterUserSerializer
 
 
@@ -47,13 +62,19 @@ class PaymentListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated, PaymentPermission]
 
     @swagger_auto_schema(manual_parameters=[
-        openapi.Parameter('paid_course', openapi.IN_QUERY, description="Оплаченный курс", type=openapi.TYPE_INTEGER),
-        openapi.Parameter('ordering', openapi.IN_QUERY, description="Сортировка по дате", type=openapi.TYPE_STRING),
+        QueryParameter('paid_course', description="Оплаченный курс", type='integer'),
+        QueryParameter('date_from', description="Платежи с даты (включительно, ISO 8601)", type='string'),
+        QueryParameter('date_to', description="Платежи до даты (не включительно, ISO 8601)", type='string'),
+        QueryParameter('ordering', description="Сортировка по дате", type='string'),
     ])
     def list(self, request: Request, *args, **kwargs) -> Response:
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """
+        Возвращает список платежей.
+        Платежи сериализуются из строк .values() сериализатором PaymentFastSerializer,
+        ответ совпадает с ответом PaymentSerializer.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).values(*PaymentFastSerializer.columns)
+        return Response(PaymentFastSerializer.to_representation(queryset))
 
     def get_queryset(self):
         """
@@ -64,9 +85,10 @@ class PaymentListView(generics.ListAPIView):
         которые были созданы этим пользователем.
         """
         user = self.request.user
+        queryset = Payment.get_all_payments().select_related('user')
         if user.is_staff:
-            return Payment.get_all_payments()
-        return Payment.get_all_payments().filter(user=user)
+            return queryset
+        return queryset.filter(user=user)
 
 
 class PaymentRetrieveView(generics.RetrieveAPIView):
@@ -74,14 +96,107 @@ class PaymentRetrieveView(generics.RetrieveAPIView):
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated, PaymentPermission]
 
+    def get_object(self) -> Union[Payment, PaymentArchive]:
+        """
+        Возвращает платеж, а если он перенесен в архив - архивный платеж с тем же ID.
+
+        :raises Http404: Если платеж не найден ни в payments, ни в архиве.
+        """
+        try:
+            return super().get_object()
+        except Http404:
+            payment = PaymentArchive.get_by_id(self.kwargs['pk'])
+            if payment is None:
+                raise
+            self.check_object_permissions(self.request, payment)
+            return payment
+
+
+class PaymentExportView(ExportView):
+    exporter = PaymentExporter
+    export_serializer_class = ExportSerializer
+    permission_classes = [IsAuthenticated, PaymentPermission]
+
+    @swagger_auto_schema(manual_parameters=[
+        QueryParameter('file_format', description="Формат файла: csv (по умолчанию) или xlsx", type='string'),
+        QueryParameter('paid_course', description="Оплаченный курс", type='integer'),
+        QueryParameter('date_from', description="Платежи с даты (включительно, ISO 8601)", type='string'),
+        QueryParameter('date_to', description="Платежи до даты (не включительно, ISO 8601)", type='string'),
+        QueryParameter('status', description="Stripe статус платежа", type='string'),
+        QueryParameter('include_archived', description="Включать архивные платежи (по умолчанию - да)",
+                       type='boolean'),
+    ])
+    def get(self, request: Request, *args, **kwargs) -> FileResponse:
+        """
+        Возвращает платежи (с адресом плательщика и названием курса) файлом CSV или XLSX.
+        Фильтры совпадают с фильтрами списка платежей, архивные платежи выгружаются вместе с остальными.
+        CSV отдается потоком без загрузки платежей в память; для выгрузок, которые не успеют отдаться
+        за время запроса, используется /api/exports/. Большой XLSX ставится в очередь: ответ 202 с выгрузкой.
+        """
+        return super().get(request, *args, **kwargs)
+
+
+class ExportMixin:
+    serializer_class = ExportSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """
+        Возвращает выгрузки текущего пользователя, начиная с последней.
+        """
+        if getattr(self, 'swagger_fake_view', False):
+            return Export.objects.none()
+        return Export.get_for_user(self.request.user).order_by('-id')
+
+
+class ExportListCreateView(ExportMixin, generics.ListCreateAPIView):
+    pass
+
+
+class ExportRetrieveView(ExportMixin, generics.RetrieveAPIView):
+    pass
+
+
+class ExportDownloadView(ExportMixin, generics.GenericAPIView):
+    def get(self, request: Request, *args, **kwargs) -> FileResponse:
+        """
+        Возвращает файл готовой выгрузки текущего пользователя.
+        """
+        export = self.get_object()
+        if export.status != 'done':
+            raise Http404
+        return FileResponse(export.file.open('rb'), as_attachment=True, filename=os.path.basename(export.file.name))
+
+
+class RevenueView(generics.GenericAPIView):
+    serializer_class = RevenueSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @swagger_auto_schema(manual_parameters=[
+        QueryParameter('date_from', description="Первый день периода (ГГГГ-ММ-ДД)", type='string'),
+        QueryParameter('date_to', description="Последний день периода включительно (ГГГГ-ММ-ДД)", type='string'),
+        QueryParameter('course', description="ID курса", type='integer'),
+    ])
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Возвращает количество и сумму подтвержденных платежей за период: итог, по курсам и по дням.
+        Доступно только модераторам. Данные читаются из сводки платежей, а не из таблицы платежей.
+        """
+        query = RevenueQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        revenue = RevenueService.get_revenue(query.validated_data['date_from'], query.validated_data['date_to'],
+                                             query.validated_data.get('course'))
+        return Response(self.get_serializer(revenue).data)
+
 
 class PaymentIntentCreateView(generics.CreateAPIView):
     serializer_class = PaymentIntentCreateSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'payments'
 
     @swagger_auto_schema(
         responses={
-            201: openapi.Response('Payment successful', PaymentSerializer),
+            201: ResponseSpec('Payment successful', PaymentSerializer),
             400: 'Payment failed'
         }
     )
@@ -104,10 +219,11 @@ class PaymentIntentCreateView(generics.CreateAPIView):
 class PaymentMethodCreateView(generics.CreateAPIView):
     serializer_class = PaymentMethodCreateSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'payments'
 
     @swagger_auto_schema(
         responses={
-            201: openapi.Response('Payment method creation successful', PaymentSerializer),
+            201: ResponseSpec('Payment method creation successful', PaymentSerializer),
             400: 'Payment method creation failed'
         }
     )
@@ -117,9 +233,10 @@ class PaymentMethodCreateView(generics.CreateAPIView):
         if serializer.is_valid():
             payment_intent_id = serializer.validated_data['payment_intent_id']
             payment_token = serializer.validated_data['payment_token']
+            payment = serializer.validated_data['payment']
             try:
                 StripeService.create_and_attach_payment_method(payment_intent_id, payment_token)
-                payment = Payment.get_by_payment_intent_id(payment_intent_id=payment_intent_id)
+                payment.refresh_from_db(fields=['payment_method_id', 'status'])
                 payment_serializer = PaymentSerializer(payment)
                 return Response(payment_serializer.data, status=status.HTTP_201_CREATED)
             except Exception as error:
@@ -130,10 +247,11 @@ class PaymentMethodCreateView(generics.CreateAPIView):
 class PaymentIntentConfirmView(generics.CreateAPIView):
     serializer_class = PaymentIntentConfirmSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'payments'
 
     @swagger_auto_schema(
         responses={
-            201: openapi.Response('Payment intent confirmation successful', PaymentSerializer),
+            201: ResponseSpec('Payment intent confirmation successful', PaymentSerializer),
             400: 'Payment intent confirmation failed'
         }
     )
@@ -142,9 +260,10 @@ class PaymentIntentConfirmView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             payment_intent_id = serializer.validated_data['payment_intent_id']
+            payment = serializer.validated_data['payment']
             try:
-                StripeService.confirm_payment_intent(payment_intent_id)
-                payment = Payment.get_by_payment_intent_id(payment_intent_id=payment_intent_id)
+                payment_intent = StripeService.confirm_payment_intent(payment_intent_id, payment.payment_method_id)
+                payment.status = payment_intent['status']
                 payment_serializer = PaymentSerializer(payment)
                 return Response(payment_serializer.data, status=status.HTTP_201_CREATED)
             except Exception as error:
@@ -0,0 +1,64 @@
+"""
+Задержка /api/courses/ с постоянными соединениями с базой данных и без них.
+
+Запросы проходят через WSGIHandler, поэтому соединение закрывается или переиспользуется
+по сигналам request_started и request_finished так же, как под gunicorn.
+
+Запуск из корня проекта (нужна доступная база данных Postgres из настроек):
+    python -m benchmarks.bench_db_connections
+"""
+import time
+from unittest import mock
+
+from benchmarks.utils import test_database
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from app_course.models import Course  # noqa: E402
+from app_user.models import CustomUser  # noqa: E402
+from config.db import connection_stats  # noqa: E402
+
+REQUESTS = 300
+
+
+def fill_database() -> str:
+    user = CustomUser.objects.create(email='bench@example.com')
+    Course.objects.bulk_create(
+        Course(name=f'Курс {i}', description='Описание курса', created_by=user) for i in range(20)
+    )
+    return str(RefreshToken.for_user(user).access_token)
+
+
+def run(handler: WSGIHandler, environ: dict) -> list:
+    latencies = []
+    for _ in range(REQUESTS):
+        started = time.perf_counter()
+        response = handler(dict(environ), lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        latencies.append(time.perf_counter() - started)
+    return sorted(latencies)
+
+
+def main() -> None:
+    with test_database():
+        token = fill_database()
+        handler = WSGIHandler()
+        environ = RequestFactory().get('/api/courses/', HTTP_AUTHORIZATION=f'Bearer {token}').environ
+        print(f'{REQUESTS} запросов GET /api/courses/')
+        for name, conn_max_age in (('CONN_MAX_AGE=0', 0), ('CONN_MAX_AGE=60', 60)):
+            with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': conn_max_age}):
+                connection.close()
+                run(handler, environ)
+                opened = connection_stats().get('default', 0)
+                latencies = run(handler, environ)
+                opened = connection_stats().get('default', 0) - opened
+            print(f'{name:>16}: p50 {latencies[len(latencies) // 2] * 1000:6.2f} мс, '
+                  f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} мс, соединений открыто {opened}')
+
+
+if __name__ == '__main__':
+    main()
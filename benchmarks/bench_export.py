@@ -0,0 +1,79 @@
+"""
+Выгрузка платежей: загрузка всех строк в память (как /api/payments/) и потоковая выгрузка CSV и XLSX
+(/api/payments/export/). Для каждого способа выводятся время и пик памяти Python (tracemalloc).
+
+Запуск из корня проекта (нужна доступная база данных Postgres из настроек):
+    python -m benchmarks.bench_export
+"""
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from benchmarks.utils import test_database
+
+from django.db import connection  # noqa: E402
+
+from app_course.models import Course  # noqa: E402
+from app_user.exports import PaymentExporter  # noqa: E402
+from app_user.fast_serializers import PaymentFastSerializer  # noqa: E402
+from app_user.models import CustomUser, Payment  # noqa: E402
+from app_user.partitioning import ensure_partitions  # noqa: E402
+
+PAYMENTS = 100_000
+
+
+def fill_database() -> None:
+    user = CustomUser.objects.create(email='bench@example.com')
+    course = Course.objects.create(name='Курс', description='Описание курса', created_by=user)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO payments (user_id, paid_course_id, amount, payment_date, status, is_confirmed,
+                                  check_attempts, payment_intent_id, payment_method_id)
+            SELECT %s, %s, 1000 + g %% 7, now() - (g %% 60 || ' days')::interval, 'succeeded', TRUE, 0,
+                   'pi_' || g, 'pm_' || g
+            FROM generate_series(1, %s) AS g
+        """, [user.id, course.id, PAYMENTS])
+        cursor.execute('ANALYZE payments')
+
+
+def export(queryset, file_format: str) -> int:
+    with tempfile.TemporaryFile() as file:
+        return PaymentExporter.write([queryset.order_by('id')], file_format, file)
+
+
+def measure(func: Callable[[], object]) -> Tuple[float, float]:
+    """
+    Возвращает (время в секундах, пик памяти в МБ). Память измеряется отдельным запуском:
+    tracemalloc замедляет выполнение.
+    """
+    started = time.perf_counter()
+    func()
+    duration = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak / 1024 / 1024
+
+
+def main() -> None:
+    with test_database():
+        ensure_partitions()
+        fill_database()
+        queryset = Payment.get_all_payments()
+        print(f'{PAYMENTS} платежей')
+        results = {
+            'список в памяти': lambda: PaymentFastSerializer.to_representation(
+                queryset.values(*PaymentFastSerializer.columns)
+            ),
+            'поток CSV': lambda: export(queryset, 'csv'),
+            'XLSX (constant_memory)': lambda: export(queryset, 'xlsx'),
+        }
+        for name, func in results.items():
+            duration, peak = measure(func)
+            print(f'  {name:24} {duration * 1000:9.0f} мс, пик памяти {peak:7.1f} МБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Сравнение сериализаторов DRF и быстрых сериализаторов списков на 1000 строках
+(время включает запросы к базе данных).
+
+Запуск из корня проекта (нужна доступная база данных Postgres из настроек):
+    python -m benchmarks.bench_fast_serializers
+"""
+from types import SimpleNamespace
+
+from benchmarks.utils import best_of, test_database
+
+from django.db.models import Prefetch  # noqa: E402
+
+from app_course.fast_serializers import CourseFastSerializer, LessonFastSerializer  # noqa: E402
+from app_course.models import Course, Lesson  # noqa: E402
+from app_course.serializers import CourseSerializer, LessonSerializer  # noqa: E402
+from app_user.fast_serializers import PaymentFastSerializer  # noqa: E402
+from app_user.models import CustomUser, Payment  # noqa: E402
+from app_user.serializers import PaymentSerializer  # noqa: E402
+
+ROWS = 1000
+
+
+def fill_database() -> CustomUser:
+    user = CustomUser.objects.create(email='bench@example.com')
+    courses = Course.objects.bulk_create(
+        Course(name=f'Курс {i}', description='Описание курса ' * 10, created_by=user) for i in range(ROWS)
+    )
+    Lesson.objects.bulk_create(
+        Lesson(course=courses[i % ROWS], name=f'Урок {i}', description='Описание урока ' * 10,
+               video_url='https://www.youtube.com/watch?v=FTtEF1KDBXo', created_by=user)
+        for i in range(ROWS)
+    )
+    Payment.objects.bulk_create(
+        Payment(user=user, paid_course=courses[i], amount=50000, status='succeeded') for i in range(ROWS)
+    )
+    return user
+
+
+def main() -> None:
+    with test_database():
+        user = fill_database()
+        context = {'request': SimpleNamespace(user=user)}
+
+        courses = Course.objects.select_related('preview', 'created_by').order_by('id')
+        lessons = Lesson.objects.select_related('preview', 'created_by').order_by('id')
+        payments = Payment.objects.select_related('user').order_by('id')
+        prefetch = Prefetch('lessons', queryset=Lesson.objects.select_related('preview', 'created_by').order_by('id'))
+
+        cases = [
+            (
+                'courses',
+                lambda: CourseSerializer(courses.prefetch_related(prefetch), many=True, context=context).data,
+                lambda: CourseFastSerializer.to_representation(courses.values(*CourseFastSerializer.columns), user.id),
+            ),
+            (
+                'lessons',
+                lambda: LessonSerializer(lessons, many=True).data,
+                lambda: LessonFastSerializer.to_representation(lessons.values(*LessonFastSerializer.columns)),
+            ),
+            (
+                'payments',
+                lambda: PaymentSerializer(payments, many=True).data,
+                lambda: PaymentFastSerializer.to_representation(payments.values(*PaymentFastSerializer.columns)),
+            ),
+        ]
+        print(f'{ROWS} строк:')
+        for name, drf, fast in cases:
+            drf_time, fast_time = best_of(drf), best_of(fast)
+            print(f'{name:>9}: DRF {drf_time * 1000:7.1f} мс, fast {fast_time * 1000:6.1f} мс, '
+                  f'x{drf_time / fast_time:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Пропускная способность эндпоинтов API под gunicorn.
+
+Сравнивает прежний запуск (`gunicorn config.wsgi:application`: один sync-воркер, без preload)
+с config/gunicorn.conf.py для воркеров gthread и uvicorn. Каждый вариант обрабатывает
+одинаковую нагрузку по эндпоинтам курсов, уроков, ленты подписок и платежей.
+
+Запуск из корня проекта (нужна доступная база данных Postgres из настроек):
+    python -m benchmarks.bench_gunicorn
+"""
+import http.client
+import importlib.util
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.utils import test_database
+
+from django.db import connection  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from app_course.models import Course, CourseSubscription, Lesson  # noqa: E402
+from app_user.models import CustomUser, Payment  # noqa: E402
+
+HOST, PORT = '127.0.0.1', 8765
+ENDPOINTS = ['/api/courses/', '/api/lessons/', '/api/me/subscriptions/', '/api/payments/']
+CLIENTS = 8
+REQUESTS_PER_CLIENT = 100
+
+VARIANTS = {
+    'bare sync x1': ['gunicorn', 'config.wsgi:application'],
+    'conf gthread': ['gunicorn', '-c', 'config/gunicorn.conf.py'],
+    'conf uvicorn': ['gunicorn', '-c', 'config/gunicorn.conf.py'],
+}
+VARIANT_ENV = {
+    'conf gthread': {'GUNICORN_WORKER_CLASS': 'gthread'},
+    'conf uvicorn': {'GUNICORN_WORKER_CLASS': 'uvicorn'},
+}
+
+
+def fill_database() -> str:
+    user = CustomUser.objects.create(email='bench@example.com', is_staff=True)
+    courses = Course.objects.bulk_create(
+        Course(name=f'Курс {i}', description='Описание курса', created_by=user) for i in range(100)
+    )
+    Lesson.objects.bulk_create(
+        Lesson(course=courses[i % 100], name=f'Урок {i}', description='Описание урока',
+               video_url='https://www.youtube.com/watch?v=FTtEF1KDBXo', created_by=user)
+        for i in range(300)
+    )
+    CourseSubscription.objects.bulk_create(
+        CourseSubscription(user=user, course=course, subscribed=True) for course in courses[:40]
+    )
+    Payment.objects.bulk_create(
+        Payment(user=user, paid_course=course, amount=50000, status='succeeded') for course in courses[:40]
+    )
+    return str(RefreshToken.for_user(user).access_token)
+
+
+def request(client: http.client.HTTPConnection, path: str, token: str) -> int:
+    for attempt in range(2):
+        try:
+            client.request('GET', path, headers={'Host': '0.0.0.0', 'Authorization': f'Bearer {token}'})
+            response = client.getresponse()
+            response.read()
+            return response.status
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # Сервер закрыл keep-alive соединение (sync-воркеры не поддерживают keep-alive).
+            client.close()
+            if attempt:
+                raise
+
+
+def wait_until_ready(token: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if request(http.client.HTTPConnection(HOST, PORT, timeout=5), ENDPOINTS[0], token) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn не запустился')
+
+
+def run_load(token: str) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = []
+    lock = threading.Lock()
+
+    def client_loop(offset: int) -> None:
+        client = http.client.HTTPConnection(HOST, PORT, timeout=30)
+        local = []
+        for i in range(REQUESTS_PER_CLIENT):
+            started = time.perf_counter()
+            status = request(client, ENDPOINTS[(offset + i) % len(ENDPOINTS)], token)
+            local.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1000,
+        'errors': len(errors),
+    }
+
+
+def main() -> None:
+    with test_database():
+        token = fill_database()
+        env = {
+            **os.environ,
+            'POSTGRES_DB': connection.settings_dict['NAME'],
+            'DJANGO_DEBUG': 'False',
+            'GUNICORN_BIND': f'{HOST}:{PORT}',
+            'GUNICORN_ACCESS_LOG': '',
+        }
+        print(f'{CLIENTS} клиентов x {REQUESTS_PER_CLIENT} запросов, CPU: {len(os.sched_getaffinity(0))}')
+        for name, command in VARIANTS.items():
+            if 'uvicorn' in name and importlib.util.find_spec('uvicorn') is None:
+                print(f'{name:>14}: пропущен (uvicorn не установлен)')
+                continue
+            if command[1] == 'config.wsgi:application':
+                command = [*command, '--bind', f'{HOST}:{PORT}']
+            server = subprocess.Popen(
+                [sys.executable, '-m', *command],
+                env={**env, **VARIANT_ENV.get(name, {})},
+                stdout=subprocess.DEVNULL,
+                stderr=open(f'/tmp/bench_gunicorn_{name.replace(" ", "_")}.log', 'w')
+            )
+            try:
+                wait_until_ready(token)
+                run_load(token)
+                result = run_load(token)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+            print(f'{name:>14}: {result["rps"]:7.1f} req/s, p50 {result["p50"]:6.1f} мс, '
+                  f'p99 {result["p99"]:6.1f} мс, ошибок {result["errors"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Накладные расходы MetricsMiddleware на один запрос.
+
+Middleware вызывается с заранее подготовленными запросом и ответом, поэтому время
+включает только запись метрик. Для замера многопроцессного режима (как под gunicorn):
+    PROMETHEUS_MULTIPROC_DIR=$(mktemp -d) python -m benchmarks.bench_metrics_middleware
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_metrics_middleware
+"""
+import os
+
+from benchmarks.utils import best_of
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.urls import resolve  # noqa: E402
+
+from config.middleware import MetricsMiddleware  # noqa: E402
+
+REQUESTS = 100_000
+
+
+def main() -> None:
+    request = RequestFactory().get('/api/courses/')
+    request.resolver_match = resolve('/api/courses/')
+    response = HttpResponse(b'x' * 2048)
+
+    def view(request):
+        return response
+
+    middleware = MetricsMiddleware(view)
+
+    def bare():
+        for _ in range(REQUESTS):
+            view(request)
+
+    def instrumented():
+        for _ in range(REQUESTS):
+            middleware(request)
+
+    bare_time = best_of(bare)
+    instrumented_time = best_of(instrumented)
+    mode = 'multiprocess' if os.environ.get('PROMETHEUS_MULTIPROC_DIR') else 'single process'
+    print(f'{REQUESTS} запросов, режим {mode}')
+    print(f'  накладные расходы: {(instrumented_time - bare_time) / REQUESTS * 1e6:.1f} мкс на запрос')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Время запуска воркера и стоимость запроса схемы OpenAPI.
+
+Сравнивает загрузку URLConf с предсгенерированной схемой и с построением schema_view
+drf_yasg при импорте (как было раньше), а также генерацию схемы на каждый запрос
+с отдачей готового файла.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_openapi_schema
+"""
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import best_of
+
+from django.core.management import call_command  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+RUNS = 15
+
+BOOT_SCRIPT = """
+import os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+started = time.perf_counter()
+import django
+django.setup()
+if sys.argv[1] == 'drf_yasg':
+    from drf_yasg import openapi
+    from drf_yasg.views import get_schema_view
+    get_schema_view(openapi.Info(title='LMS API', default_version='v1'), public=True)
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - started)
+"""
+
+
+def boot_times() -> dict:
+    """
+    Возвращает лучшее время запуска для каждого режима; режимы чередуются,
+    чтобы фоновая нагрузка влияла на них одинаково.
+    """
+    timings = {'current': [], 'drf_yasg': []}
+    for _ in range(RUNS):
+        for mode, values in timings.items():
+            output = subprocess.check_output([sys.executable, '-c', BOOT_SCRIPT, mode], stderr=subprocess.DEVNULL)
+            values.append(float(output))
+    return {mode: min(values) for mode, values in timings.items()}
+
+
+def main() -> None:
+    timings = boot_times()
+    current, legacy = timings['current'], timings['drf_yasg']
+    print(f'Запуск (django.setup + URLConf), лучший из {RUNS} запусков:')
+    print(f'  drf_yasg при импорте: {legacy * 1000:6.1f} мс')
+    print(f'  готовая схема:        {current * 1000:6.1f} мс  (-{(legacy - current) * 1000:.1f} мс)')
+
+    from config.schema import generate_schema
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = f'{directory}/schema.json'
+        call_command('generate_openapi_schema', output=path, stdout=open('/dev/null', 'w'))
+        with override_settings(OPENAPI_SCHEMA_PATH=path, ALLOWED_HOSTS=['*']):
+            client = Client()
+            etag = client.get('/swagger.json')['ETag']
+            print('Запрос схемы:')
+            print(f'  генерация на каждый запрос: {best_of(generate_schema) * 1000:6.1f} мс')
+            print(f'  файл, 200:                  {best_of(lambda: client.get("/swagger.json")) * 1000:6.1f} мс')
+            print(f'  файл, 304 по ETag:          '
+                  f'{best_of(lambda: client.get("/swagger.json", HTTP_IF_NONE_MATCH=etag)) * 1000:6.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Сравнение времени кодирования страницы из 50 курсов (по 10 уроков в каждом)
+стандартным JSONRenderer и ORJSONRenderer.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_renderers
+"""
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from config.renderers import ORJSONRenderer  # noqa: E402
+
+
+def build_course_page(courses: int = 50, lessons: int = 10) -> dict:
+    """
+    Возвращает страницу курсов в формате ответа /api/courses/.
+    """
+    def lesson(course_id: int, lesson_id: int) -> dict:
+        return {
+            'id': lesson_id,
+            'name': f'Урок {lesson_id}: знакомство с Python',
+            'description': 'Подробное описание урока. ' * 10,
+            'preview': {'id': 1, 'image': '/media/lessons/default.png'},
+            'video_url': 'https://www.youtube.com/watch?v=FTtEF1KDBXo',
+            'course': course_id,
+            'created_by': {'id': 2, 'email': 'author@example.com'},
+        }
+
+    return {
+        'count': 1000,
+        'next': 'http://0.0.0.0:8000/api/courses/?page=2&page_size=50',
+        'previous': None,
+        'results': [
+            {
+                'id': course_id,
+                'name': f'Python-разработчик {course_id}',
+                'preview': {'id': 1, 'image': '/media/courses/default.png'},
+                'description': 'Описание курса. ' * 20,
+                'lessons': [lesson(course_id, course_id * lessons + i) for i in range(lessons)],
+                'lessons_count': lessons,
+                'created_by': {'id': 2, 'email': 'author@example.com'},
+                'subscribed': course_id % 2 == 0,
+            }
+            for course_id in range(courses)
+        ],
+    }
+
+
+def main(number: int = 200) -> None:
+    page = build_course_page()
+    size = len(JSONRenderer().render(page))
+    print(f'Страница из 50 курсов: {size / 1024:.1f} KiB')
+    for renderer in (JSONRenderer(), ORJSONRenderer()):
+        seconds = min(timeit.repeat(lambda: renderer.render(page), number=number, repeat=5)) / number
+        print(f'{type(renderer).__name__:>16}: {seconds * 1e6:8.1f} мкс на страницу')
+
+
+if __name__ == '__main__':
+    main()
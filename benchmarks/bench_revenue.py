@@ -0,0 +1,61 @@
+"""
+Отчет о выручке с начала года: агрегирование таблицы payments и чтение сводки payment_rollups.
+
+Запуск из корня проекта (нужна доступная база данных Postgres из настроек):
+    python -m benchmarks.bench_revenue
+"""
+from datetime import date
+
+from benchmarks.utils import best_of, test_database
+
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Sum  # noqa: E402
+
+from app_course.models import Course  # noqa: E402
+from app_user.models import CustomUser, Payment  # noqa: E402
+from app_user.partitioning import ensure_partitions  # noqa: E402
+from app_user.services import RevenueService  # noqa: E402
+
+PAYMENTS = 300_000
+COURSES = 50
+DAYS = 730
+
+
+def fill_database() -> None:
+    user = CustomUser.objects.create(email='bench@example.com')
+    Course.objects.bulk_create(
+        Course(name=f'Курс {i}', description='Описание курса', created_by=user) for i in range(COURSES)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO payments (user_id, paid_course_id, amount, payment_date, status, is_confirmed,
+                                  check_attempts, payment_intent_id, payment_method_id)
+            SELECT %s, (SELECT min(id) FROM courses) + g %% %s, 1000 + g %% 7, now() - (g %% %s || ' days')::interval,
+                   'succeeded', TRUE, 0, 'pi_' || g, 'pm_' || g
+            FROM generate_series(1, %s) AS g
+        """, [user.id, COURSES, DAYS, PAYMENTS])
+        cursor.execute('ANALYZE payments')
+    RevenueService.rebuild()
+
+
+def scan_payments(date_from: date, date_to: date) -> None:
+    list(
+        Payment.objects.filter(is_confirmed=True, payment_date__date__range=(date_from, date_to))
+        .values('paid_course_id').annotate(count=Count('id'), total=Sum('amount'))
+    )
+
+
+def main() -> None:
+    with test_database():
+        ensure_partitions()
+        fill_database()
+        date_from, date_to = date.today().replace(day=1, month=1), date.today()
+        print(f'{PAYMENTS} подтвержденных платежей, {COURSES} курсов, период {date_from} - {date_to}')
+        scan = best_of(lambda: scan_payments(date_from, date_to))
+        rollup = best_of(lambda: RevenueService.get_revenue(date_from, date_to))
+        print(f'  агрегирование payments: {scan * 1000:8.2f} мс')
+        print(f'  сводка payment_rollups: {rollup * 1000:8.2f} мс (итог, по курсам и по дням)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+
+@contextmanager
+def test_database() -> Iterator[None]:
+    """
+    Создает тестовую базу данных (как manage.py test) на время замера и удаляет ее после.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def best_of(func: Callable[[], object], repeat: int = 5) -> float:
+    """
+    Возвращает лучшее время выполнения func в секундах из repeat запусков.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
@@ -0,0 +1,83 @@
+"""
+Перенос строк из рабочих таблиц в архивные.
+
+Строки переносятся пачками: каждая пачка выбирается с блокировкой FOR UPDATE SKIP LOCKED,
+удаляется из рабочей таблицы и вставляется в архивную одним запросом в отдельной транзакции,
+поэтому блокировки держатся только на время переноса одной пачки, а строки, которые
+в этот момент изменяются, переносятся при следующем запуске.
+
+Освобожденное место учитывается как суммарный размер перенесенных строк: после очистки (VACUUM)
+оно используется таблицей повторно, размер файлов таблицы при этом не уменьшается.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ArchiveResult:
+    """
+    Результат архивирования таблицы.
+
+    Attrs:
+        - table: Рабочая таблица.
+        - rows: Количество перенесенных строк.
+        - bytes: Суммарный размер перенесенных строк, байты.
+    """
+    table: str
+    rows: int = 0
+    bytes: int = 0
+
+
+def table_size(table: str) -> int:
+    """
+    Возвращает размер таблицы вместе с индексами и TOAST (для секционированной таблицы - сумму по секциям).
+
+    :param table: Имя таблицы.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(sum(pg_total_relation_size(relid)), 0) FROM pg_partition_tree(%s)', [table])
+        return int(cursor.fetchone()[0])
+
+
+def move_rows(source: str, target: str, columns: Sequence[str], condition: str, params: Iterable,
+              batch_size: int, key: Sequence[str] = ('id',)) -> ArchiveResult:
+    """
+    Переносит строки source, удовлетворяющие условию, в таблицу target пачками по batch_size строк.
+    В target записываются столбцы columns и время переноса archived_at.
+
+    :param source: Рабочая таблица.
+    :param target: Архивная таблица.
+    :param columns: Переносимые столбцы.
+    :param condition: SQL-условие отбора строк.
+    :param params: Параметры условия.
+    :param batch_size: Размер пачки.
+    :param key: Столбцы, по которым строки пачки удаляются из source (для секционированной таблицы -
+        вместе с ключом секционирования, чтобы удаление затрагивало только нужные секции).
+    """
+    key_columns, column_list = ', '.join(key), ', '.join(columns)
+    sql = f"""
+        WITH batch AS (
+            SELECT {key_columns} FROM {source} WHERE {condition} ORDER BY {key_columns} LIMIT %s FOR UPDATE SKIP LOCKED
+        ), moved AS (
+            DELETE FROM {source} WHERE ({key_columns}) IN (SELECT {key_columns} FROM batch) RETURNING *
+        ), archived AS (
+            INSERT INTO {target} ({column_list}, archived_at) SELECT {column_list}, now() FROM moved
+        )
+        SELECT count(*), coalesce(sum(pg_column_size(moved.*)), 0) FROM moved
+    """
+    result, params = ArchiveResult(source), [*params, batch_size]
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows, size = cursor.fetchone()
+        if not rows:
+            break
+        result.rows += rows
+        result.bytes += int(size)
+        logger.info(f'{source}: перенесено в {target} строк: {result.rows}')
+    return result
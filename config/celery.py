@@ -1,12 +1,31 @@
 import os
+import time
 
 from celery import Celery
+from celery.signals import before_task_publish, worker_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks(['app_user', 'app_course'])
+app.autodiscover_tasks(['app_user', 'app_course', 'app_image'])
+
+
+@before_task_publish.connect
+def stamp_published_at(headers: dict, **kwargs) -> None:
+    """
+    Добавляет к сообщению время отправки задачи (для метрики времени ожидания в очереди).
+    """
+    headers.setdefault('published_at', time.time())
+
+
+@worker_init.connect
+def setup_task_metrics(**kwargs) -> None:
+    from config.metrics import reset_multiprocess_dir
+    from config.task_metrics import install
+
+    reset_multiprocess_dir()
+    install()
 
 
 @app.task(bind=True)
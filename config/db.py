@@ -0,0 +1,199 @@
+"""
+Соединения с базой данных.
+
+Счетчик открытых соединений (метрика db_connections_opened, по сигналу connection_created)
+показывает, насколько часто переиспользуются постоянные соединения (CONN_MAX_AGE). Функция iterate_queryset обходит
+большие выборки частями и при работе через PgBouncer в режиме пула транзакций
+(DISABLE_SERVER_SIDE_CURSORS) не использует курсоры на стороне сервера.
+
+ReplicaRouter направляет чтение на реплики (DATABASE_REPLICAS) только там, где это разрешено:
+безопасные HTTP-запросы (см. config.middleware.ReplicaRoutingMiddleware) и задачи,
+допускающие отставание реплики. Пользователь, изменивший данные, читает с основной базы
+в течение REPLICA_PIN_SECONDS секунд.
+"""
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Model, QuerySet
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject, empty
+
+from config.metrics import DB_CONNECTIONS_OPENED
+
+logger = logging.getLogger(__name__)
+
+
+def count_connection(sender, connection, **kwargs) -> None:
+    """
+    Учитывает открытое соединение в метрике db_connections_opened
+    (подключается к сигналу connection_created в AppUserConfig.ready).
+    """
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+    logger.debug('Opened database connection %r', connection.alias)
+
+
+def connection_stats() -> Dict[str, int]:
+    """
+    Возвращает количество соединений, открытых процессом с момента запуска, по псевдонимам баз данных.
+    """
+    return {
+        sample.labels['alias']: int(sample.value)
+        for metric in DB_CONNECTIONS_OPENED.collect()
+        for sample in metric.samples
+        if sample.name == 'db_connections_opened_total'
+    }
+
+
+def iterate_queryset(queryset: QuerySet, chunk_size: int = 1000) -> Iterator:
+    """
+    Возвращает итератор по строкам QuerySet, загружая их частями по chunk_size строк.
+
+    Обычно используется QuerySet.iterator() с курсором на стороне сервера. Если курсоры
+    на стороне сервера отключены (PgBouncer в режиме пула транзакций не сохраняет курсор
+    между транзакциями), строки выбираются страницами по первичному ключу.
+
+    :param queryset: QuerySet (в том числе после values() и values_list()).
+    :param chunk_size: Количество строк, загружаемых за один запрос.
+    """
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield from queryset.filter(pk__in=pks)
+        last_pk = pks[-1]
+
+
+@dataclass
+class RoutingState:
+    """
+    Состояние маршрутизации запросов к базе данных в текущем контексте (HTTP-запрос или задача).
+
+    Attrs:
+        - replica_reads: Чтение с реплики допустимо.
+        - request: HTTP-запрос (для проверки закрепления пользователя за основной базой).
+        - wrote: В текущем контексте выполнялась запись.
+        - replica: Реплика, выбранная для чтения в текущем контексте.
+    """
+    replica_reads: bool
+    request: Optional[HttpRequest] = None
+    wrote: bool = False
+    replica: Optional[str] = None
+
+
+_routing: ContextVar[Optional[RoutingState]] = ContextVar('db_routing', default=None)
+
+
+@contextmanager
+def database_routing(replica_reads: bool, request: Optional[HttpRequest] = None) -> Iterator[RoutingState]:
+    """
+    Задает маршрутизацию запросов к базе данных внутри блока.
+
+    :param replica_reads: Разрешить чтение с реплик.
+    :param request: HTTP-запрос, пользователь которого может быть закреплен за основной базой.
+    """
+    state = RoutingState(replica_reads=replica_reads, request=request)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+def use_replica():
+    """
+    Разрешает чтение с реплик внутри блока или функции (для задач, допускающих отставание реплики):
+
+        with use_replica():
+            ...
+
+        @use_replica()
+        def report(): ...
+    """
+    return database_routing(replica_reads=True)
+
+
+def pin_key(user_id: int) -> str:
+    return f'db:primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id: int) -> None:
+    """
+    Закрепляет пользователя за основной базой на REPLICA_PIN_SECONDS секунд,
+    чтобы он сразу видел свои изменения, даже если реплика отстает.
+
+    :param user_id: ID пользователя.
+    """
+    cache.set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def request_user(request: HttpRequest) -> Optional[Model]:
+    """
+    Возвращает аутентифицированного пользователя запроса, не выполняя запросов к базе данных:
+    ленивый request.user из AuthenticationMiddleware не вычисляется, пока его не вычислит представление
+    (DRF после аутентификации записывает пользователя в request.user).
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return user if user is not None and user.is_authenticated else None
+
+
+def is_pinned(request: HttpRequest) -> bool:
+    """
+    Проверяет, закреплен ли пользователь запроса за основной базой (результат запоминается в запросе).
+    """
+    pinned = request.__dict__.get('_db_pinned')
+    if pinned is None:
+        user = request_user(request)
+        if user is None:
+            return False
+        pinned = request._db_pinned = bool(cache.get(pin_key(user.pk)))
+    return pinned
+
+
+class ReplicaRouter:
+    """
+    Маршрутизатор основной базы и реплик.
+
+    Запись, миграции и чтение там, где реплики не разрешены, выполняются в основной базе ('default').
+    После записи чтение в том же контексте тоже выполняется в основной базе.
+    Пользователи в HTTP-запросах читаются из основной базы: аутентификация сразу после регистрации
+    не должна зависеть от отставания реплики. Реплика выбирается один раз на контекст (HTTP-запрос
+    или задачу), чтобы чтения одного запроса не попадали на реплики с разным отставанием.
+    """
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        state = _routing.get()
+        if not settings.DATABASE_REPLICAS or state is None or not state.replica_reads or state.wrote:
+            return None
+        if state.request is not None and (model is get_user_model() or is_pinned(state.request)):
+            return None
+        if state.replica is None:
+            state.replica = random.choice(settings.DATABASE_REPLICAS)
+        return state.replica
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db not in settings.DATABASE_REPLICAS
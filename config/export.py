@@ -0,0 +1,305 @@
+"""
+Выгрузка строк в CSV и XLSX без загрузки всех строк в память.
+
+Строки читаются курсором на стороне сервера (см. config.db.iterate_queryset) пачками по chunk_size строк.
+CSV отдается потоком: пачка строк кодируется и отправляется клиенту сразу после чтения.
+XLSX записывается XlsxWriter в режиме constant_memory: в памяти держится только текущая строка листа,
+книга собирается во временном файле. Лист XLSX вмещает чуть больше миллиона строк,
+поэтому большая выгрузка продолжается на следующих листах.
+
+Выгрузка может читать строки из нескольких выборок (например, платежи и архивные платежи): каждая выборка
+упорядочена по первому столбцу (id), строки выборок объединяются в общем порядке без сортировки в памяти.
+XLSX собирается во время запроса только для небольших выгрузок, большие ставятся в очередь Celery.
+"""
+import csv
+import heapq
+import io
+import tempfile
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+from django.db.models import QuerySet
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django_filters import FilterSet
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.db import iterate_queryset
+from config.openapi import QueryParameter, swagger_auto_schema
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Символы, с которых табличные редакторы начинают формулу.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def cell(value: Any) -> Any:
+    """
+    Приводит значение к виду ячейки: время - к часовому поясу TIME_ZONE без указания пояса.
+    """
+    if isinstance(value, datetime):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def csv_cell(value: Any) -> Any:
+    """
+    Приводит значение к виду ячейки CSV: строка, похожая на формулу, экранируется апострофом.
+    """
+    value = cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class Exporter:
+    """
+    Базовый класс выгрузки.
+    Attrs:
+        - name: Имя выгрузки (имя файла и листа).
+        - columns: Пары (заголовок столбца, поле для values_list).
+        - filterset_class: FilterSet параметров выгрузки.
+        - ordering: Порядок строк.
+        - chunk_size: Количество строк, читаемых из базы данных за один запрос.
+        - sheet_rows: Количество строк данных на листе XLSX.
+        - xlsx_sync_rows: Наибольшее количество строк XLSX, который собирается во время запроса.
+    """
+    name = 'export'
+    columns: Sequence[Tuple[str, str]] = ()
+    filterset_class: Optional[Type[FilterSet]] = None
+    ordering: Sequence[str] = ('id',)
+    chunk_size = 2000
+    sheet_rows = 1_048_575
+    xlsx_sync_rows = 10_000
+
+    @classmethod
+    def get_queryset(cls, user: Any) -> QuerySet:
+        """
+        Возвращает строки, доступные пользователю.
+
+        :param user: Пользователь, который запрашивает выгрузку.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def filter_queryset(cls, user: Any, params: Dict[str, Any]) -> QuerySet:
+        """
+        Возвращает строки, доступные пользователю и отобранные фильтрами filterset_class.
+
+        :param user: Пользователь, который запрашивает выгрузку.
+        :param params: Параметры фильтров.
+        :raises ValidationError: Если параметры фильтров некорректны.
+        """
+        return cls.apply_filters(cls.get_queryset(user), params).qs.order_by(*cls.ordering)
+
+    @classmethod
+    def apply_filters(cls, queryset: QuerySet, params: Dict[str, Any]) -> FilterSet:
+        """
+        Возвращает FilterSet параметров выгрузки для выборки.
+
+        :param queryset: Выборка.
+        :param params: Параметры фильтров.
+        :raises ValidationError: Если параметры фильтров некорректны.
+        """
+        filterset = cls.filterset_class(params, queryset=queryset)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset
+
+    @classmethod
+    def get_querysets(cls, user: Any, params: Dict[str, Any]) -> List[QuerySet]:
+        """
+        Возвращает выборки, строки которых попадают в выгрузку. Каждая выборка упорядочена по ordering.
+
+        :param user: Пользователь, который запрашивает выгрузку.
+        :param params: Параметры фильтров.
+        :raises ValidationError: Если параметры фильтров некорректны.
+        """
+        return [cls.filter_queryset(user, params)]
+
+    @classmethod
+    def is_large(cls, querysets: Sequence[QuerySet]) -> bool:
+        """
+        Проверяет, что в выборках больше xlsx_sync_rows строк. Считается не больше xlsx_sync_rows + 1 строки выборки.
+
+        :param querysets: Выборки выгрузки.
+        """
+        limit = cls.xlsx_sync_rows
+        return sum(queryset[:limit + 1].count() for queryset in querysets) > limit
+
+    @classmethod
+    def iter_rows(cls, queryset: QuerySet) -> Iterator[Tuple]:
+        """
+        Возвращает итератор по строкам выгрузки (значения столбцов columns).
+
+        :param queryset: Строки выгрузки.
+        """
+        return iterate_queryset(queryset.values_list(*(field for _, field in cls.columns)), cls.chunk_size)
+
+    @classmethod
+    def iter_querysets(cls, querysets: Sequence[QuerySet]) -> Iterator[Tuple]:
+        """
+        Возвращает итератор по строкам выборок в порядке первого столбца.
+
+        :param querysets: Выборки выгрузки, упорядоченные по первому столбцу.
+        """
+        if len(querysets) == 1:
+            return cls.iter_rows(querysets[0])
+        return heapq.merge(*(cls.iter_rows(queryset) for queryset in querysets), key=itemgetter(0))
+
+    @classmethod
+    def iter_csv(cls, rows: Iterable[Tuple]) -> Iterator[bytes]:
+        """
+        Возвращает CSV пачками по chunk_size строк. Файл начинается с BOM, чтобы Excel распознал UTF-8.
+
+        :param rows: Строки выгрузки.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow([header for header, _ in cls.columns])
+        rows = iter(rows)
+        while True:
+            writer.writerows([csv_cell(value) for value in row] for row in islice(rows, cls.chunk_size))
+            chunk = buffer.getvalue()
+            if not chunk:
+                return
+            yield chunk.encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    @classmethod
+    def write_xlsx(cls, rows: Iterable[Tuple], file: IO[bytes]) -> None:
+        """
+        Записывает строки в книгу XLSX.
+
+        :param rows: Строки выгрузки.
+        :param file: Файл, открытый для записи в двоичном режиме.
+        """
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(file, {
+            'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False,
+            'strings_to_numbers': False, 'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        })
+        headers: List[str] = [header for header, _ in cls.columns]
+        sheet, row_number = None, cls.sheet_rows
+        for row in rows:
+            if row_number == cls.sheet_rows:
+                sheet = workbook.add_worksheet(f'{cls.name} {len(workbook.worksheets()) + 1}')
+                sheet.write_row(0, 0, headers)
+                row_number = 0
+            row_number += 1
+            sheet.write_row(row_number, 0, [cell(value) for value in row])
+        if sheet is None:
+            workbook.add_worksheet(cls.name).write_row(0, 0, headers)
+        workbook.close()
+
+    @classmethod
+    def write(cls, querysets: Sequence[QuerySet], file_format: str, file: IO[bytes]) -> int:
+        """
+        Записывает выгрузку в файл. Возвращает количество строк.
+
+        :param querysets: Выборки выгрузки.
+        :param file_format: Формат файла ('csv' или 'xlsx').
+        :param file: Файл, открытый для записи в двоичном режиме.
+        """
+        count = 0
+
+        def counted(rows: Iterable[Tuple]) -> Iterator[Tuple]:
+            nonlocal count
+            for count, row in enumerate(rows, 1):
+                yield row
+
+        rows = counted(cls.iter_querysets(querysets))
+        if file_format == 'xlsx':
+            cls.write_xlsx(rows, file)
+        else:
+            for chunk in cls.iter_csv(rows):
+                file.write(chunk)
+        return count
+
+    @classmethod
+    def filename(cls, file_format: str) -> str:
+        return f'{cls.name}-{timezone.localdate():%Y%m%d}.{file_format}'
+
+    @classmethod
+    def response(cls, querysets: Sequence[QuerySet], file_format: str) -> StreamingHttpResponse:
+        """
+        Возвращает HTTP-ответ с выгрузкой: CSV отдается потоком по мере чтения строк,
+        XLSX - после записи книги во временный файл.
+
+        :param querysets: Выборки выгрузки.
+        :param file_format: Формат файла ('csv' или 'xlsx').
+        """
+        if file_format == 'xlsx':
+            file = tempfile.TemporaryFile()
+            cls.write_xlsx(cls.iter_querysets(querysets), file)
+            file.seek(0)
+            return FileResponse(file, as_attachment=True, filename=cls.filename(file_format),
+                                content_type=FORMATS[file_format])
+        response = StreamingHttpResponse(cls.iter_csv(cls.iter_querysets(querysets)), content_type=FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{cls.filename(file_format)}"'
+        return response
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """
+    Сериализатор параметров выгрузки.
+
+    Поля:
+    - file_format: Формат файла (csv или xlsx).
+    """
+    file_format = serializers.ChoiceField(choices=list(FORMATS), default='csv')
+
+
+class ExportView(APIView):
+    """
+    Базовое представление выгрузки: строки exporter, отобранные фильтрами из строки запроса,
+    отдаются файлом в формате file_format.
+    XLSX больше exporter.xlsx_sync_rows строк не собирается во время запроса: выгрузка создается
+    сериализатором export_serializer_class и записывается задачей Celery, ответ - 202 с созданной выгрузкой.
+    """
+    exporter: Type[Exporter] = Exporter
+    export_serializer_class: Optional[Type[serializers.Serializer]] = None
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(manual_parameters=[
+        QueryParameter('file_format', description='Формат файла: csv (по умолчанию) или xlsx', type='string'),
+    ])
+    def get(self, request: Request, *args, **kwargs) -> Union[StreamingHttpResponse, Response]:
+        """
+        Возвращает файл выгрузки. Параметры фильтров передаются в строке запроса.
+        """
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        file_format = query.validated_data['file_format']
+        querysets = self.exporter.get_querysets(request.user, request.query_params)
+        if file_format == 'xlsx' and self.export_serializer_class and self.exporter.is_large(querysets):
+            return self.queue_export(request, file_format)
+        return self.exporter.response(querysets, file_format)
+
+    def queue_export(self, request: Request, file_format: str) -> Response:
+        """
+        Создает выгрузку, которая записывается в файл задачей Celery, и возвращает ее с кодом 202.
+
+        :param request: Запрос выгрузки.
+        :param file_format: Формат файла.
+        """
+        params = {key: value for key, value in request.query_params.items() if key != 'file_format'}
+        serializer = self.export_serializer_class(data={
+            'dataset': self.exporter.name, 'file_format': file_format, 'params': params,
+        }, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,127 @@
+"""
+Конфигурация gunicorn.
+
+Запуск:
+    gunicorn -c config/gunicorn.conf.py
+
+Параметры задаются переменными окружения:
+- GUNICORN_BIND: Адрес сервера (по умолчанию 0.0.0.0:8000).
+- GUNICORN_WORKER_CLASS: Тип воркеров: gthread (по умолчанию), uvicorn или sync.
+- GUNICORN_WORKERS: Количество воркеров (по умолчанию 2 * CPU + 1, для uvicorn - CPU).
+- GUNICORN_THREADS: Количество потоков воркера gthread (по умолчанию 4).
+- GUNICORN_PRELOAD: Загружать приложение в мастер-процессе до запуска воркеров (по умолчанию True).
+- GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER: Перезапуск воркера после случайного
+  количества запросов из диапазона [max_requests, max_requests + jitter] (по умолчанию 1000 и 100).
+- GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE: Таймауты в секундах.
+- PROMETHEUS_MULTIPROC_DIR: Каталог метрик воркеров (по умолчанию /dev/shm/prometheus-gunicorn).
+"""
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Метрики воркеров собираются эндпоинтом /metrics из файлов общего каталога (см. config.metrics).
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    '/dev/shm/prometheus-gunicorn' if os.path.isdir('/dev/shm') else '/tmp/prometheus-gunicorn'
+)
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return value.lower() in ('true', '1') if value else default
+
+
+# Число доступных процессу CPU (учитывает ограничение cpuset контейнера).
+cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+WORKER_CLASSES = {
+    'sync': ('sync', 'config.wsgi:application'),
+    'gthread': ('gthread', 'config.wsgi:application'),
+    'uvicorn': ('uvicorn.workers.UvicornWorker', 'config.asgi:application'),
+}
+worker_class_name = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+worker_class, wsgi_app = WORKER_CLASSES[worker_class_name]
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Воркеры uvicorn обрабатывают запросы в цикле событий и не требуют запаса процессов на ожидание ввода-вывода.
+workers = env_int('GUNICORN_WORKERS', cpu_count if worker_class_name == 'uvicorn' else 2 * cpu_count + 1)
+threads = env_int('GUNICORN_THREADS', 4) if worker_class_name == 'gthread' else 1
+
+# Приложение импортируется в мастер-процессе, и воркеры разделяют загруженный код copy-on-write.
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Файлы контроля активности воркеров в памяти: в Docker /tmp может находиться на overlayfs.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server) -> None:
+    """
+    Очищает каталог метрик от файлов предыдущего запуска.
+    """
+    from config.metrics import reset_multiprocess_dir
+
+    reset_multiprocess_dir()
+
+
+def when_ready(server) -> None:
+    """
+    Прогревает приложение в мастер-процессе перед запуском воркеров (только с preload_app):
+    URLConf с представлениями и сериализаторами загружается один раз и разделяется воркерами.
+    """
+    if not server.cfg.preload_app:
+        return
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    server.log.info('URLConf loaded in master')
+
+
+def post_fork(server, worker) -> None:
+    """
+    Сбрасывает состояние, унаследованное воркером от мастер-процесса (только с preload_app):
+    соединения с базой данных нельзя использовать в нескольких процессах,
+    а клиент индекса подписок создается в воркере заново.
+    """
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    from app_course.subscription_index import reset_subscription_index
+
+    connections.close_all()
+    reset_subscription_index(setting='SUBSCRIPTION_INDEX')
+
+
+def post_worker_init(worker) -> None:
+    """
+    Прогревает воркер до первого запроса: создает клиент индекса подписок
+    и открывает соединение с хранилищем индекса (пул соединений Redis общий для потоков воркера).
+    Соединения с базой данных не прогреваются: Django открывает их в потоке, обрабатывающем запрос.
+    """
+    from app_course.subscription_index import get_subscription_index
+
+    get_subscription_index().is_ready()
+
+
+def child_exit(server, worker) -> None:
+    """
+    Удаляет файлы gauge-метрик завершившегося воркера.
+    """
+    from config.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,62 @@
+"""
+Метрики Prometheus.
+
+Метрики HTTP-запросов записывает config.middleware.MetricsMiddleware, количество открытых соединений
+с базой данных - config.db.count_connection; выгружает метрики представление config.views.metrics (/metrics).
+
+Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR, метрики процессов (воркеров gunicorn,
+дочерних процессов воркера Celery) записываются в файлы этого каталога и собираются вместе при выгрузке.
+Переменная должна быть задана до запуска процессов, каталог очищается при запуске сервиса.
+"""
+import os
+import shutil
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+
+HTTP_REQUESTS = Counter('http_requests', 'Обработанные HTTP-запросы.', ['route', 'method', 'status'])
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Длительность обработки HTTP-запроса.', ['route', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10)
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Размер тела ответа.', ['route'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+DB_CONNECTIONS_OPENED = Counter('db_connections_opened', 'Соединения с базой данных, открытые процессом.', ['alias'])
+
+
+def is_multiprocess() -> bool:
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Возвращает реестр для выгрузки метрик: в многопроцессном режиме - новый реестр,
+    собирающий метрики всех процессов из файлов, иначе - реестр текущего процесса.
+    """
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def reset_multiprocess_dir() -> None:
+    """
+    Очищает каталог метрик многопроцессного режима от файлов предыдущего запуска.
+    """
+    if not is_multiprocess():
+        return
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Удаляет файлы gauge-метрик (live*) завершившегося процесса.
+
+    :param pid: ID процесса.
+    """
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)
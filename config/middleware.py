@@ -0,0 +1,76 @@
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from prometheus_client import Counter, Histogram
+
+from config.db import database_routing, pin_to_primary, request_user
+from config.metrics import HTTP_LATENCY, HTTP_REQUESTS, HTTP_RESPONSE_SIZE
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для безопасных запросов.
+    Если во время запроса выполнялась запись, пользователь закрепляется за основной базой
+    (см. config.db.pin_to_primary), чтобы следующие запросы читали его изменения.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        with database_routing(replica_reads=request.method in SAFE_METHODS, request=request) as state:
+            response = self.get_response(request)
+        user = request_user(request)
+        if state.wrote and user is not None:
+            pin_to_primary(user.pk)
+        return response
+
+
+def response_size(response: HttpResponse) -> Optional[int]:
+    """
+    Возвращает размер тела ответа без чтения потокового содержимого (None - размер неизвестен).
+    """
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """
+    Записывает количество запросов, длительность обработки и размер ответов по маршрутам.
+    Маршрут - имя URL (course-list, lesson-detail, payment_list); запросы к несуществующим URL
+    учитываются под маршрутом <unresolved>, чтобы количество значений метки было ограничено.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        # Метрики с метками по (маршрут, метод, статус): поиск по меткам в prometheus_client
+        # выполняется под блокировкой, поэтому найденные метрики запоминаются.
+        self.children: Dict[Tuple[str, str, int], Tuple[Counter, Histogram, Histogram]] = {}
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        resolver_match = request.resolver_match
+        route = resolver_match.view_name if resolver_match is not None else '<unresolved>'
+        key = (route, request.method, response.status_code)
+        children = self.children.get(key)
+        if children is None:
+            children = self.children[key] = (
+                HTTP_REQUESTS.labels(*key), HTTP_LATENCY.labels(route, request.method), HTTP_RESPONSE_SIZE.labels(route)
+            )
+        requests, latency, response_sizes = children
+        requests.inc()
+        latency.observe(duration)
+        size = response_size(response)
+        if size is not None:
+            response_sizes.observe(size)
+        return response
@@ -0,0 +1,47 @@
+"""
+Описание операций API для схемы OpenAPI без импорта drf_yasg.
+
+Декоратор swagger_auto_schema принимает те же аргументы, что и одноименный декоратор drf_yasg,
+но параметры и ответы описываются легковесными QueryParameter и ResponseSpec. Объекты drf_yasg
+создаются из них только при генерации схемы (см. config.schema), поэтому модули представлений
+не загружают drf_yasg при запуске воркеров.
+"""
+from typing import Any, Callable, NamedTuple, Optional
+
+
+class QueryParameter(NamedTuple):
+    """
+    Параметр строки запроса (аналог openapi.Parameter с in_=openapi.IN_QUERY).
+
+    Attrs:
+        - name: Имя параметра.
+        - description: Описание параметра.
+        - type: Тип параметра в терминах OpenAPI ('integer', 'string', 'boolean', ...).
+    """
+    name: str
+    description: str
+    type: str = 'string'
+
+
+class ResponseSpec(NamedTuple):
+    """
+    Описание ответа (аналог openapi.Response).
+
+    Attrs:
+        - description: Описание ответа.
+        - schema: Сериализатор (класс или экземпляр) тела ответа.
+    """
+    description: str
+    schema: Optional[Any] = None
+
+
+def swagger_auto_schema(**overrides) -> Callable:
+    """
+    Сохраняет переопределения схемы операции в атрибуте _openapi_overrides метода представления.
+
+    :param overrides: Аргументы декоратора drf_yasg.utils.swagger_auto_schema.
+    """
+    def decorator(view_method: Callable) -> Callable:
+        view_method._openapi_overrides = overrides
+        return view_method
+    return decorator
@@ -0,0 +1,36 @@
+from typing import Any, IO, Optional
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """
+    Парсер JSON на основе orjson.
+    Как и JSONParser, отклоняет NaN и Infinity.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream: IO[bytes], media_type: Optional[str] = None,
+              parser_context: Optional[dict] = None) -> Any:
+        """
+        Разбирает тело запроса в формате JSON и возвращает полученные данные.
+
+        :param stream: Поток с телом запроса.
+        :param media_type: Тип содержимого запроса.
+        :param parser_context: Контекст парсера.
+        """
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
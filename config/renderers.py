@@ -0,0 +1,78 @@
+import datetime
+import decimal
+from typing import Any, Optional
+
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+_drf_encoder = JSONEncoder()
+
+
+def orjson_default(obj: Any) -> Any:
+    """
+    Преобразует типы, которые orjson не сериализует сам, по правилам
+    rest_framework.utils.encoders.JSONEncoder.
+
+    Decimal (Course.cost, Payment.amount) выводится строкой, как и в сериализаторах DRF,
+    если не отключена настройка COERCE_DECIMAL_TO_STRING. Datetime, date и time форматирует
+    сам JSONEncoder DRF (ISO 8601 с микросекундами, UTC с суффиксом Z), UUID orjson сериализует сам.
+
+    :param obj: Объект для сериализации.
+    """
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj) if api_settings.COERCE_DECIMAL_TO_STRING else float(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return _drf_encoder.default(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, QuerySet):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Рендерер JSON на основе orjson.
+
+    Выводит те же байты, что и JSONRenderer с настройками по умолчанию
+    (компактный вывод, UTF-8 без экранирования, экранирование \\u2028 и \\u2029),
+    но в несколько раз быстрее. Параметр indent в заголовке Accept
+    включает отступ в 2 пробела - других отступов orjson не поддерживает.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None,
+               renderer_context: Optional[dict] = None) -> bytes:
+        """
+        Сериализует данные в JSON и возвращает байтовую строку.
+
+        :param data: Данные ответа.
+        :param accepted_media_type: Согласованный тип содержимого.
+        :param renderer_context: Контекст рендеринга.
+        """
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=orjson_default, option=options)
+
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,102 @@
+"""
+Генерация схемы OpenAPI.
+
+Модуль импортирует drf_yasg и загружается только при генерации схемы
+(команда generate_openapi_schema или первый запрос схемы без сгенерированного файла).
+"""
+import copy
+from typing import Any, Dict, List
+
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.inspectors import DjangoRestResponsePagination, FilterInspector, PaginatorInspector, SwaggerAutoSchema
+from drf_yasg.utils import force_real_str, swagger_auto_schema
+
+from .openapi import QueryParameter, ResponseSpec
+
+info = openapi.Info(
+    title="LMS API",
+    default_version='v1',
+    description="API для платформы обучения"
+)
+
+
+def resolve(value: Any) -> Any:
+    """
+    Заменяет QueryParameter и ResponseSpec на объекты drf_yasg.
+
+    :param value: Значение переопределения схемы операции.
+    """
+    if isinstance(value, QueryParameter):
+        return openapi.Parameter(value.name, openapi.IN_QUERY, description=value.description, type=value.type)
+    if isinstance(value, ResponseSpec):
+        return openapi.Response(value.description, value.schema)
+    if isinstance(value, list):
+        return [resolve(item) for item in value]
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    return value
+
+
+class OpenAPICompatInspector(PaginatorInspector, FilterInspector):
+    """
+    Параметры запроса фильтров и пагинаторов из get_schema_operation_parameters.
+
+    Заменяет CoreAPICompatInspector из drf_yasg, которому нужен пакет coreapi: при установленном
+    coreapi django_filters и rest_framework импортируют его (вместе с requests и pkg_resources)
+    при запуске каждого воркера.
+    """
+    schema_attrs = ['format', 'pattern', 'enum', 'minimum', 'maximum']
+
+    def get_paginator_parameters(self, paginator) -> List[openapi.Parameter]:
+        return self.get_operation_parameters(paginator)
+
+    def get_filter_parameters(self, filter_backend) -> List[openapi.Parameter]:
+        return self.get_operation_parameters(filter_backend)
+
+    def get_operation_parameters(self, component) -> List[openapi.Parameter]:
+        if not hasattr(component, 'get_schema_operation_parameters'):
+            return []
+        parameters = []
+        for parameter in component.get_schema_operation_parameters(self.view):
+            schema = parameter.get('schema', {})
+            parameters.append(openapi.Parameter(
+                name=parameter['name'],
+                in_=parameter['in'],
+                required=parameter.get('required', False),
+                description=force_real_str(parameter.get('description')),
+                type=schema.get('type', openapi.TYPE_STRING),
+                **{attr: schema.get(attr) for attr in self.schema_attrs}
+            ))
+        return parameters
+
+
+class AutoSchema(SwaggerAutoSchema):
+    """
+    Инспектор операций, который получает параметры фильтров и пагинаторов без coreapi.
+    """
+    filter_inspectors = [OpenAPICompatInspector]
+    paginator_inspectors = [DjangoRestResponsePagination, OpenAPICompatInspector]
+
+
+class SchemaGenerator(OpenAPISchemaGenerator):
+    """
+    Генератор схемы, учитывающий переопределения из config.openapi.swagger_auto_schema.
+    """
+
+    def get_overrides(self, view, method: str) -> Dict[str, Any]:
+        action = getattr(view, 'action', method.lower())
+        overrides = getattr(getattr(view, action, None), '_openapi_overrides', None)
+        if overrides is None:
+            return super().get_overrides(view, method)
+        decorated = swagger_auto_schema(**resolve(copy.deepcopy(overrides)))(lambda: None)
+        return decorated._swagger_auto_schema
+
+
+def generate_schema() -> bytes:
+    """
+    Возвращает схему OpenAPI всех эндпоинтов API в формате JSON.
+    """
+    schema = SchemaGenerator(info).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from datetime import timedelta
 from dotenv import load_dotenv
 from pathlib import Path
@@ -11,7 +12,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-5r)jiux@ul)ag@xntt15e=w5%q@*75+(d3q5uf#5t37^gb4#jd'
 
-DEBUG = True
+DEBUG = os.getenv('DJANGO_DEBUG', 'True').lower() in ('true', '1')
 
 ALLOWED_HOSTS = ['0.0.0.0']
 
@@ -24,7 +25,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'rest_framework',
-    'drf_yasg',
     'django_filters',
     'rest_framework_simplejwt',
     'django_celery_beat',
@@ -35,12 +35,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -50,7 +52,7 @@ ROOT_URLCONF = 'config.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'config' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -73,9 +75,27 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOST'),
         'PORT': os.getenv('POSTGRES_PORT'),
+        # Соединение переиспользуется запросами и задачами Celery в течение CONN_MAX_AGE секунд
+        # и проверяется перед переиспользованием после ошибки или перезапуска Postgres.
+        'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        # PgBouncer в режиме пула транзакций: курсоры на стороне сервера не переживают транзакцию,
+        # поэтому большие выборки загружаются частями (см. config.db.iterate_queryset).
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('POSTGRES_PGBOUNCER', 'False').lower() in ('true', '1'),
     }
 }
 
+# Реплики основной базы (хосты через запятую). В тестах реплики - зеркала основной базы.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.getenv('POSTGRES_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['config.db.ReplicaRouter']
+
+# Время, в течение которого пользователь после записи читает данные из основной базы, с.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -103,6 +123,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = 'staticfiles/'
+# Статика Swagger UI из пакета drf_yasg. Сам пакет не входит в INSTALLED_APPS и не импортируется
+# при запуске: он нужен только команде generate_openapi_schema (см. config.schema).
+STATICFILES_DIRS = [
+    os.path.join(find_spec('drf_yasg').submodule_search_locations[0], 'static'),
+]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -119,9 +144,31 @@ REST_FRAMEWORK = {
 
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.ORJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+
+    # Ограничиваются только представления с атрибутом throttle_scope (см. config.throttling).
+    'DEFAULT_THROTTLE_CLASSES': ['config.throttling.TokenBucketThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('THROTTLE_RATE_LOGIN', '10/min'),
+        'register': os.getenv('THROTTLE_RATE_REGISTER', '5/hour'),
+        'payments': os.getenv('THROTTLE_RATE_PAYMENTS', '20/min'),
+        'subscriptions': os.getenv('THROTTLE_RATE_SUBSCRIPTIONS', '60/min'),
+    },
+
+    'DEFAULT_PARSER_CLASSES': [
+        'config.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+OPENAPI_SCHEMA_PATH = os.getenv('OPENAPI_SCHEMA_PATH', os.path.join(BASE_DIR, 'openapi', 'schema.json'))
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -131,7 +178,8 @@ SWAGGER_SETTINGS = {
         }
     },
     'USE_SESSION_AUTH': False,
-    'JSON_EDITOR': True
+    'JSON_EDITOR': True,
+    'DEFAULT_AUTO_SCHEMA_CLASS': 'config.schema.AutoSchema',
 }
 
 SIMPLE_JWT = {
@@ -141,6 +189,11 @@ SIMPLE_JWT = {
 
 STRIPE_API_KEY = os.getenv('STRIPE_API_KEY')
 
+# Метаданные видео уроков (название, автор, обложка) загружаются через oEmbed YouTube задачей
+# app_image.tasks.fetch_video_metadata и обновляются, когда им больше VIDEO_METADATA_TTL_DAYS дней.
+YOUTUBE_OEMBED_URL = os.getenv('YOUTUBE_OEMBED_URL', 'https://www.youtube.com/oembed')
+VIDEO_METADATA_TTL_DAYS = int(os.getenv('VIDEO_METADATA_TTL_DAYS', '7'))
+
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
@@ -149,6 +202,57 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Moscow'
 
+# Очереди задач: сверка платежей, рассылки и обработка медиафайлов выполняются отдельными воркерами
+# (см. docker-compose.yml), чтобы длинная рассылка не задерживала проверку платежей.
+# Сверка платежей и перестроение индекса подписок идемпотентны и подтверждаются после выполнения (acks_late);
+# рассылки подтверждаются при получении, чтобы перезапуск воркера не приводил к повторной отправке писем.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'app_user.tasks.check_and_update_payment_status': {'queue': 'payments'},
+    'app_user.tasks.reconcile_payments': {'queue': 'payments'},
+    'app_course.tasks.send_*_notifications': {'queue': 'email'},
+    'app_image.tasks.*': {'queue': 'media'},
+}
+# Количество задач, которые воркер забирает заранее, задается для каждого воркера (--prefetch-multiplier
+# в docker-compose.yml): 1 для длинных задач payments и default, больше - для коротких задач email и media.
+
+# Архивирование: подтвержденные платежи и отмененные подписки старше заданного количества дней
+# переносятся в архивные таблицы пачками по ARCHIVE_BATCH_SIZE строк (см. config.archive).
+PAYMENT_ARCHIVE_AFTER_DAYS = int(os.getenv('PAYMENT_ARCHIVE_AFTER_DAYS', '365'))
+SUBSCRIPTION_ARCHIVE_AFTER_DAYS = int(os.getenv('SUBSCRIPTION_ARCHIVE_AFTER_DAYS', '180'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+
+# Сети, из которых доступен эндпоинт /metrics (через запятую).
+METRICS_ALLOWED_NETWORKS = [
+    network.strip() for network in os.getenv('METRICS_ALLOWED_NETWORKS', '127.0.0.1/32,::1/128').split(',')
+    if network.strip()
+]
+
+# Порт HTTP-сервера метрик воркера Celery (пусто - метрики не выгружаются).
+CELERY_METRICS_PORT = int(os.getenv('CELERY_METRICS_PORT') or 0) or None
+
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
+
+CACHES = {
+    'default': (
+        {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL} if REDIS_URL
+        else {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    ),
+}
+
+THROTTLE_BUCKETS = {
+    'BACKEND': 'config.throttling.RedisTokenBucket' if REDIS_URL else 'config.throttling.LocalTokenBucket',
+    'LOCATION': REDIS_URL,
+}
+
+SUBSCRIPTION_INDEX = {
+    'BACKEND': (
+        'app_course.subscription_index.RedisSubscriptionIndex' if REDIS_URL
+        else 'app_course.subscription_index.DatabaseSubscriptionIndex'
+    ),
+    'LOCATION': REDIS_URL,
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.yandex.ru'
 EMAIL_PORT = 465
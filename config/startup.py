@@ -0,0 +1,217 @@
+"""
+Замер времени запуска воркеров.
+
+Сценарий запуска WSGI-приложения или воркера Celery выполняется в отдельном процессе
+с флагом -X importtime. Процесс печатает длительность этапов запуска, а из вывода
+importtime строится время импорта по пакетам и список самых долгих импортов.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+WSGI_BOOT_SCRIPT = """
+import json, os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+phases = {}
+started = time.perf_counter()
+
+def phase(name):
+    global started
+    now = time.perf_counter()
+    phases[name] = now - started
+    started = now
+
+from django.conf import settings
+settings.INSTALLED_APPS
+phase('settings')
+import django
+django.setup(set_prefix=False)
+phase('django.setup')
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+phase('wsgi application')
+from django.urls import get_resolver
+get_resolver().url_patterns
+phase('urlconf')
+print(json.dumps({'phases': phases, 'modules': sorted(sys.modules)}))
+"""
+
+CELERY_BOOT_SCRIPT = """
+import json, os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+phases = {}
+started = time.perf_counter()
+
+def phase(name):
+    global started
+    now = time.perf_counter()
+    phases[name] = now - started
+    started = now
+
+from config.celery import app
+phase('celery app')
+import django
+django.setup()
+phase('django.setup')
+if not os.environ.get('CELERY_SKIP_CHECKS'):
+    from django.core.checks import run_checks
+    run_checks()
+    phase('system checks')
+app.autodiscover_tasks(['app_user', 'app_course', 'app_image'], force=True)
+app.finalize()
+phase('tasks')
+print(json.dumps({'phases': phases, 'modules': sorted(sys.modules)}))
+"""
+
+BOOT_SCRIPTS = {
+    'wsgi': WSGI_BOOT_SCRIPT,
+    'celery': CELERY_BOOT_SCRIPT,
+}
+
+# Пакеты, время импорта которых показывается отдельно; остальные попадают в 'other'.
+PACKAGES = (
+    'app_course', 'app_user', 'app_image', 'config', 'drf_yasg', 'rest_framework_simplejwt', 'rest_framework',
+    'django_filters', 'django_celery_beat', 'django', 'celery', 'kombu', 'redis', 'requests', 'coreapi',
+    'pkg_resources', 'orjson', 'psycopg2', 'PIL',
+)
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+@dataclass
+class ImportRecord:
+    """
+    Строка вывода -X importtime.
+
+    Attrs:
+        - name: Имя модуля.
+        - self_us: Время выполнения модуля без вложенных импортов, мкс.
+        - cumulative_us: Время импорта модуля вместе с вложенными импортами, мкс.
+        - level: Уровень вложенности импорта.
+        - parent: Имя модуля, который импортировал данный модуль первым.
+    """
+    name: str
+    self_us: int
+    cumulative_us: int
+    level: int
+    parent: Optional[str] = None
+
+    @property
+    def package(self) -> str:
+        top = self.name.split('.')[0]
+        return top if top in PACKAGES else 'other'
+
+
+@dataclass
+class PackageStats:
+    """
+    Время импорта пакета.
+
+    Attrs:
+        - self_us: Суммарное время выполнения модулей пакета без вложенных импортов других пакетов, мкс.
+        - cumulative_us: Время импорта пакета вместе с импортированными им пакетами, мкс.
+        - imported_by: Модуль, импортировавший самую долгую по времени часть пакета
+          (None - импорт верхнего уровня сценария запуска).
+    """
+    self_us: int = 0
+    cumulative_us: int = 0
+    imported_by: Optional[str] = None
+
+
+@dataclass
+class StartupReport:
+    """
+    Результат замера запуска.
+
+    Attrs:
+        - target: Сценарий запуска ('wsgi' или 'celery').
+        - phases: Длительность этапов запуска в секундах.
+        - modules: Модули, загруженные после запуска (sys.modules).
+        - imports: Строки вывода -X importtime в порядке завершения импорта
+          (включая неудачные попытки импорта необязательных зависимостей).
+    """
+    target: str
+    phases: Dict[str, float]
+    modules: List[str] = field(default_factory=list)
+    imports: List[ImportRecord] = field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def packages(self) -> Dict[str, PackageStats]:
+        """
+        Возвращает время импорта по пакетам, отсортированное по убыванию.
+        """
+        stats = defaultdict(PackageStats)
+        largest_root_us: Dict[str, int] = {}
+        for record in self.imports:
+            package = record.package
+            stats[package].self_us += record.self_us
+            parent_package = ImportRecord(record.parent, 0, 0, 0).package if record.parent else None
+            if parent_package != package:
+                if record.cumulative_us > largest_root_us.get(package, -1):
+                    largest_root_us[package] = record.cumulative_us
+                    stats[package].imported_by = record.parent
+                stats[package].cumulative_us += record.cumulative_us
+        return dict(sorted(stats.items(), key=lambda item: item[1].cumulative_us, reverse=True))
+
+    def slowest(self, limit: int = 15, depth: Optional[int] = None) -> List[ImportRecord]:
+        """
+        Возвращает самые долгие импорты.
+
+        :param limit: Количество импортов.
+        :param depth: Максимальный уровень вложенности (None - без ограничения).
+        """
+        records = [record for record in self.imports if depth is None or record.level <= depth]
+        return sorted(records, key=lambda record: record.cumulative_us, reverse=True)[:limit]
+
+
+def parse_import_time(output: str) -> List[ImportRecord]:
+    """
+    Разбирает вывод -X importtime.
+    Вложенный импорт выводится раньше импортировавшего его модуля и с большим отступом,
+    поэтому родитель определяется по первой следующей строке с меньшим отступом.
+
+    :param output: Вывод stderr процесса.
+    """
+    records = []
+    pending: Dict[int, List[ImportRecord]] = defaultdict(list)
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        level = len(indent) // 2
+        record = ImportRecord(name, int(self_us), int(cumulative_us), level)
+        for child in pending.pop(level + 1, []):
+            child.parent = name
+        pending[level].append(record)
+        records.append(record)
+    return records
+
+
+def measure_startup(target: str, env: Optional[Dict[str, str]] = None) -> StartupReport:
+    """
+    Запускает сценарий запуска в отдельном процессе и возвращает отчет.
+
+    :param target: Сценарий запуска ('wsgi' или 'celery').
+    :param env: Дополнительные переменные окружения процесса.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPTS[target]],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings', **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    return StartupReport(target, result['phases'], result['modules'], parse_import_time(process.stderr))
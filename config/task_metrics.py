@@ -0,0 +1,147 @@
+"""
+Метрики задач Celery.
+
+Обработчики сигналов task_prerun, task_postrun, task_failure и task_retry подключаются
+в воркере (см. config.celery) и записывают длительность выполнения задач, время ожидания
+в очереди, ошибки и повторы. Время ожидания отсчитывается от заголовка published_at,
+который добавляется к сообщению при отправке задачи.
+
+Воркер выгружает метрики по HTTP на порту CELERY_METRICS_PORT вместе с длиной очередей брокера.
+"""
+import logging
+import time
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional
+
+from celery import current_task
+from celery.signals import task_failure, task_postrun, task_prerun, task_retry, worker_process_shutdown, worker_ready
+from django.conf import settings
+from kombu import Connection
+from kombu.exceptions import ChannelError
+from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+from config.metrics import mark_process_dead, metrics_registry
+
+logger = logging.getLogger(__name__)
+
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds', 'Длительность выполнения задачи Celery.', ['task', 'state'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+TASK_QUEUE_WAIT = Histogram(
+    'celery_task_queue_wait_seconds', 'Время от отправки задачи до начала ее выполнения.', ['task', 'queue'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 600)
+)
+TASK_FAILURES = Counter('celery_task_failures', 'Задачи, завершившиеся ошибкой.', ['task', 'exception'])
+TASK_RETRIES = Counter('celery_task_retries', 'Повторные запуски задач.', ['task'])
+TASK_ITEMS = Counter('celery_task_items', 'Элементы, обработанные задачами.', ['task', 'item'])
+
+# Время начала выполняемых процессом задач по ID задачи.
+_started: Dict[str, float] = {}
+
+
+def record_items(item: str, count: int = 1) -> None:
+    """
+    Увеличивает счетчик обработанных текущей задачей элементов (отправленных писем, проверенных платежей).
+
+    :param item: Вид элемента.
+    :param count: Количество элементов.
+    """
+    task_name = current_task.name if current_task else 'unknown'
+    TASK_ITEMS.labels(task=task_name, item=item).inc(count)
+
+
+def on_task_prerun(task_id: str, task, **kwargs) -> None:
+    _started[task_id] = time.perf_counter()
+    published_at = (task.request.headers or {}).get('published_at')
+    if published_at is not None:
+        queue = (task.request.delivery_info or {}).get('routing_key') or 'unknown'
+        TASK_QUEUE_WAIT.labels(task=task.name, queue=queue).observe(max(time.time() - published_at, 0))
+
+
+def on_task_postrun(task_id: str, task, state: Optional[str] = None, **kwargs) -> None:
+    started = _started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task=task.name, state=state or 'UNKNOWN').observe(time.perf_counter() - started)
+
+
+def on_task_failure(sender, exception: BaseException, **kwargs) -> None:
+    TASK_FAILURES.labels(task=sender.name, exception=type(exception).__name__).inc()
+
+
+def on_task_retry(sender, **kwargs) -> None:
+    TASK_RETRIES.labels(task=sender.name).inc()
+
+
+def task_queues() -> List[str]:
+    """
+    Возвращает имена очередей задач: очередь по умолчанию и очереди из CELERY_TASK_ROUTES.
+    """
+    queues = {settings.CELERY_TASK_DEFAULT_QUEUE}
+    queues.update(route['queue'] for route in settings.CELERY_TASK_ROUTES.values() if 'queue' in route)
+    return sorted(queues)
+
+
+def queue_depths(queues: Iterable[str], connection: Optional[Connection] = None) -> Dict[str, int]:
+    """
+    Возвращает количество сообщений в очередях брокера.
+    Очередь, которая еще не создана в брокере (в Redis - пустая очередь), считается пустой.
+
+    :param queues: Имена очередей.
+    :param connection: Соединение с брокером (по умолчанию - соединение приложения Celery).
+    """
+    from config.celery import app
+
+    depths = {}
+    with nullcontext(connection) if connection else app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for queue in queues:
+            try:
+                depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+            except ChannelError:
+                depths[queue] = 0
+    return depths
+
+
+class QueueDepthCollector:
+    """
+    Коллектор длины очередей брокера: длина запрашивается у брокера при каждой выгрузке метрик.
+    """
+    def collect(self):
+        gauge = GaugeMetricFamily('celery_queue_messages', 'Количество сообщений в очереди брокера.',
+                                  labels=['queue'])
+        try:
+            depths = queue_depths(task_queues())
+        except Exception as error:
+            logger.warning(f'Не удалось получить длину очередей: {error}')
+            depths = {}
+        for queue, messages in depths.items():
+            gauge.add_metric([queue], messages)
+        yield gauge
+
+
+def start_metrics_server(**kwargs) -> None:
+    port = settings.CELERY_METRICS_PORT
+    if not port:
+        return
+    registry = metrics_registry()
+    registry.register(QueueDepthCollector())
+    start_http_server(port, registry=registry)
+    logger.info(f'Метрики Celery доступны на порту {port}')
+
+
+def on_worker_process_shutdown(pid: int, **kwargs) -> None:
+    mark_process_dead(pid)
+
+
+def install() -> None:
+    """
+    Подключает обработчики сигналов воркера.
+    """
+    task_prerun.connect(on_task_prerun, dispatch_uid='task_metrics_prerun')
+    task_postrun.connect(on_task_postrun, dispatch_uid='task_metrics_postrun')
+    task_failure.connect(on_task_failure, dispatch_uid='task_metrics_failure')
+    task_retry.connect(on_task_retry, dispatch_uid='task_metrics_retry')
+    worker_ready.connect(start_metrics_server, dispatch_uid='task_metrics_server')
+    worker_process_shutdown.connect(on_worker_process_shutdown, dispatch_uid='task_metrics_shutdown')
@@ -0,0 +1,55 @@
+from django.test import TestCase
+
+from app_course import tasks as course_tasks
+from app_user import tasks as user_tasks
+from config.celery import app
+
+
+def queue_of(task_name: str) -> str:
+    return app.amqp.router.route({}, task_name)['queue'].name
+
+
+class TaskRoutingTestCase(TestCase):
+    def test_queues(self):
+        """
+        Сверка платежей, рассылки и обработка медиафайлов выполняются в отдельных очередях.
+        """
+        expected = {
+            user_tasks.check_and_update_payment_status.name: 'payments',
+            user_tasks.reconcile_payments.name: 'payments',
+            course_tasks.send_course_update_notifications.name: 'email',
+            course_tasks.send_lesson_update_notifications.name: 'email',
+            course_tasks.rebuild_subscription_index.name: 'default',
+            'app_image.tasks.fetch_video_metadata': 'media',
+        }
+        self.assertEqual({name: queue_of(name) for name in expected}, expected)
+
+    def test_task_options(self):
+        """
+        Сверка платежей подтверждается после выполнения и ограничена по времени, рассылка - при получении.
+        """
+        payment_task = app.tasks[user_tasks.check_and_update_payment_status.name]
+        self.assertTrue(payment_task.acks_late)
+        self.assertEqual((payment_task.soft_time_limit, payment_task.time_limit), (30, 60))
+        # Рассылка подтверждается при получении: повторный запуск разослал бы письма повторно.
+        self.assertFalse(app.tasks[course_tasks.send_course_update_notifications.name].acks_late)
+
+    def test_periodic_task_name(self):
+        """
+        Периодическая задача ссылается на зарегистрированную задачу Celery,
+        имя задачи, созданной с ошибкой, исправляется.
+        """
+        from django_celery_beat.models import PeriodicTask
+
+        user_tasks.create_periodic_task()
+        PeriodicTask.objects.filter(name='Check and Update Payment Status').update(
+            task='app_user.tasks.py.check_and_update_payment_status'
+        )
+        user_tasks.create_periodic_task()
+        periodic_task = PeriodicTask.objects.get(name='Check and Update Payment Status')
+        self.assertIn(periodic_task.task, app.tasks)
+        self.assertEqual(queue_of(periodic_task.task), 'payments')
+        self.assertEqual(periodic_task.expire_seconds, 5)
+        self.assertIn(PeriodicTask.objects.get(name='Create Payment Partitions').task, app.tasks)
+        self.assertIn(PeriodicTask.objects.get(name='Compute Course Analytics').task, app.tasks)
+        self.assertEqual(queue_of(PeriodicTask.objects.get(name='Refresh Video Metadata').task), 'media')
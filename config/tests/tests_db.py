@@ -0,0 +1,224 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import close_old_connections, connection, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app_course.models import Course, CourseSubscription
+from app_user.models import CustomUser
+from config.db import connection_stats, iterate_queryset, use_replica
+from config.middleware import ReplicaRoutingMiddleware
+
+
+class IterateQuerysetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='ivan@example.com')
+        courses = Course.objects.bulk_create(
+            Course(name=f'Course {i}', description='-', created_by=cls.user) for i in range(7)
+        )
+        CourseSubscription.objects.bulk_create(
+            CourseSubscription(user=cls.user, course=course, subscribed=True) for course in courses
+        )
+        cls.expected = list(
+            CourseSubscription.objects.order_by('pk').values_list('user_id', 'course_id')
+        )
+
+    def test_server_side_cursor(self):
+        """
+        По умолчанию строки читаются курсором на стороне сервера.
+        """
+        queryset = CourseSubscription.objects.values_list('user_id', 'course_id')
+        self.assertCountEqual(list(iterate_queryset(queryset, chunk_size=3)), self.expected)
+
+    def test_pgbouncer_pages(self):
+        """
+        Без курсоров на стороне сервера строки загружаются страницами по первичному ключу:
+        на каждую страницу - запрос ключей и запрос строк.
+        """
+        queryset = CourseSubscription.objects.values_list('user_id', 'course_id')
+        with mock.patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+            with self.assertNumQueries(7):
+                rows = list(iterate_queryset(queryset, chunk_size=3))
+        self.assertEqual(rows, self.expected)
+
+
+class PersistentConnectionTestCase(TransactionTestCase):
+    """
+    Границы запросов (и задач Celery) имитируются вызовом close_old_connections,
+    который Django выполняет по сигналам request_started и request_finished.
+    """
+    serialized_rollback = True
+
+    def opened_during_requests(self, conn_max_age: int) -> int:
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': conn_max_age}):
+            connection.close()
+            Course.objects.count()
+            close_old_connections()
+            opened = connection_stats().get('default', 0)
+            for _ in range(3):
+                Course.objects.count()
+                close_old_connections()
+            return connection_stats().get('default', 0) - opened
+
+    def test_persistent_connection_reused(self):
+        """
+        С CONN_MAX_AGE соединение переиспользуется следующими запросами.
+        """
+        self.assertEqual(self.opened_during_requests(60), 0)
+
+    def test_connection_per_request(self):
+        """
+        С CONN_MAX_AGE=0 каждый запрос открывает новое соединение.
+        """
+        self.assertEqual(self.opened_during_requests(0), 3)
+
+    def test_metric(self):
+        """
+        Открытые соединения выгружаются в метрику db_connections_opened_total.
+        """
+        self.opened_during_requests(0)
+        opened = REGISTRY.get_sample_value('db_connections_opened_total', {'alias': 'default'})
+        self.assertEqual(opened, connection_stats()['default'])
+        self.assertGreaterEqual(opened, 3)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = SimpleNamespace(pk=1, is_authenticated=True)
+
+    def request(self, method: str, write: bool = False) -> dict:
+        """
+        Выполняет запрос через ReplicaRoutingMiddleware и возвращает базы, выбранные маршрутизатором.
+        """
+        routes = {}
+
+        def view(request):
+            routes['course'] = router.db_for_read(Course)
+            routes['user'] = router.db_for_read(CustomUser)
+            if write:
+                router.db_for_write(Course)
+                routes['after_write'] = router.db_for_read(Course)
+            return HttpResponse()
+
+        request = RequestFactory().generic(method, '/api/courses/')
+        request.user = self.user
+        ReplicaRoutingMiddleware(view)(request)
+        return routes
+
+    def test_primary_by_default(self):
+        self.assertEqual(router.db_for_read(Course), 'default')
+
+    def test_safe_request_reads_replica(self):
+        """
+        Безопасный запрос читает с реплики, но пользователи читаются из основной базы.
+        """
+        self.assertEqual(self.request('GET'), {'course': 'replica_0', 'user': 'default'})
+
+    def test_unsafe_request_reads_primary(self):
+        self.assertEqual(self.request('POST'), {'course': 'default', 'user': 'default'})
+
+    def test_read_your_writes(self):
+        """
+        После записи пользователь читает из основной базы и в том же запросе, и в следующих.
+        """
+        self.assertEqual(self.request('POST', write=True)['after_write'], 'default')
+        self.assertEqual(self.request('GET')['course'], 'default')
+        self.user = SimpleNamespace(pk=2, is_authenticated=True)
+        self.assertEqual(self.request('GET')['course'], 'replica_0')
+
+    def test_use_replica(self):
+        """
+        Задачи читают с реплики внутри use_replica(), включая пользователей.
+        """
+        with use_replica():
+            self.assertEqual(router.db_for_read(Course), 'replica_0')
+            self.assertEqual(router.db_for_read(CustomUser), 'replica_0')
+        self.assertEqual(router.db_for_read(Course), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'])
+    def test_one_replica_per_request(self):
+        """
+        Все чтения одного запроса выполняются с одной реплики.
+        """
+        with mock.patch('config.db.random.choice', side_effect=['replica_1', 'replica_0']) as choice:
+            self.assertEqual(self.request('GET')['course'], 'replica_1')
+            with use_replica():
+                self.assertEqual({router.db_for_read(Course) for _ in range(3)}, {'replica_0'})
+        self.assertEqual(choice.call_count, 2)
+
+    def test_migrations_on_primary(self):
+        self.assertTrue(router.allow_migrate('default', 'app_course'))
+        self.assertFalse(router.allow_migrate('replica_0', 'app_course'))
+
+
+REPLICA_ALIAS = 'replica_mirror'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA_ALIAS])
+class ReplicaMirrorTestCase(TransactionTestCase):
+    """
+    Маршрутизация запросов API со вторым псевдонимом базы данных - тестовым зеркалом основной базы
+    (отдельное соединение с той же базой, как реплика в POSTGRES_REPLICA_HOSTS).
+    """
+    serialized_rollback = True
+
+    @classmethod
+    def setUpClass(cls):
+        # Псевдоним добавляется после проверок тестового раннера и настройки TransactionTestCase,
+        # запрещающей запросы к базам вне databases.
+        super().setUpClass()
+        primary = connections['default'].settings_dict
+        connections.settings[REPLICA_ALIAS] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': 'default'}}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.settings[REPLICA_ALIAS]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(email='ivan@example.com')
+        self.course = Course.objects.create(name='Python', description='Course', created_by=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def courses_read_from(self) -> set:
+        """
+        Запрашивает список курсов и возвращает псевдонимы баз, из которых читались курсы.
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = self.client.get('/api/courses/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([course['id'] for course in response.json()['results']], [self.course.id])
+        return {
+            alias for alias, queries in (('default', primary), (REPLICA_ALIAS, replica))
+            if any('FROM "courses"' in query['sql'] for query in queries)
+        }
+
+    def test_reads_replica_writes_pin_primary(self):
+        """
+        Безопасный запрос читает с реплики. Запись выполняется в основной базе,
+        после нее пользователь читает из основной базы, остальные пользователи - с реплики.
+        """
+        self.assertEqual(self.courses_read_from(), {REPLICA_ALIAS})
+
+        with CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = self.client.post('/api/course-subscriptions/', {'course': self.course.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(self.courses_read_from(), {'default'})
+
+        self.client.force_authenticate(CustomUser.objects.create(email='moderator@example.com', is_staff=True))
+        self.assertEqual(self.courses_read_from(), {REPLICA_ALIAS})
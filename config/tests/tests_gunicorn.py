@@ -0,0 +1,43 @@
+import os
+import runpy
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+GUNICORN_CONF = os.path.join(settings.BASE_DIR, 'config', 'gunicorn.conf.py')
+
+
+def load_conf(**env) -> dict:
+    with mock.patch.dict(os.environ, env), mock.patch('os.sched_getaffinity', return_value={0, 1}, create=True):
+        return runpy.run_path(GUNICORN_CONF)
+
+
+class GunicornConfTestCase(SimpleTestCase):
+    def test_defaults(self):
+        """
+        По умолчанию используются воркеры gthread с WSGI-приложением и preload.
+        """
+        conf = load_conf()
+        self.assertEqual(conf['worker_class'], 'gthread')
+        self.assertEqual(conf['wsgi_app'], 'config.wsgi:application')
+        self.assertEqual(conf['workers'], 5)
+        self.assertEqual(conf['threads'], 4)
+        self.assertTrue(conf['preload_app'])
+        self.assertEqual((conf['max_requests'], conf['max_requests_jitter']), (1000, 100))
+
+    def test_uvicorn(self):
+        """
+        Воркеры uvicorn обслуживают ASGI-приложение, по одному воркеру на CPU.
+        """
+        conf = load_conf(GUNICORN_WORKER_CLASS='uvicorn')
+        self.assertEqual(conf['worker_class'], 'uvicorn.workers.UvicornWorker')
+        self.assertEqual(conf['wsgi_app'], 'config.asgi:application')
+        self.assertEqual(conf['workers'], 2)
+        self.assertEqual(conf['threads'], 1)
+
+    def test_env_overrides(self):
+        conf = load_conf(GUNICORN_WORKERS='3', GUNICORN_PRELOAD='False', GUNICORN_ACCESS_LOG='')
+        self.assertEqual(conf['workers'], 3)
+        self.assertFalse(conf['preload_app'])
+        self.assertIsNone(conf['accesslog'])
@@ -0,0 +1,46 @@
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from app_user.models import CustomUser
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(email='ivan@example.com'))
+
+    def test_route_metrics(self):
+        """
+        Запрос учитывается под именем URL с методом и статусом ответа.
+        """
+        requests = sample('http_requests_total', route='course-list', method='GET', status='200')
+        latency = sample('http_request_duration_seconds_count', route='course-list', method='GET')
+        size = sample('http_response_size_bytes_sum', route='course-list')
+        response = self.client.get('/api/courses/')
+        self.assertEqual(sample('http_requests_total', route='course-list', method='GET', status='200'), requests + 1)
+        self.assertEqual(sample('http_request_duration_seconds_count', route='course-list', method='GET'), latency + 1)
+        self.assertEqual(sample('http_response_size_bytes_sum', route='course-list'), size + len(response.content))
+
+    def test_unresolved_route(self):
+        requests = sample('http_requests_total', route='<unresolved>', method='GET', status='404')
+        self.client.get('/api/no-such-endpoint/')
+        self.assertEqual(sample('http_requests_total', route='<unresolved>', method='GET', status='404'), requests + 1)
+
+
+class MetricsEndpointTestCase(TestCase):
+    def test_allowed_network(self):
+        self.client.get('/api/courses/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'http_requests_total{method="GET",route="course-list",status="401"}', response.content)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'])
+    def test_forbidden_network(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from config import views
+
+
+class OpenAPISchemaTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.schema_path = os.path.join(directory.name, 'openapi', 'schema.json')
+        call_command('generate_openapi_schema', output=self.schema_path, stdout=StringIO())
+        settings_override = override_settings(OPENAPI_SCHEMA_PATH=self.schema_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_command_writes_schema(self):
+        """
+        Команда generate_openapi_schema записывает схему со всеми эндпоинтами API
+        и переопределениями из config.openapi.swagger_auto_schema.
+        """
+        with open(self.schema_path, 'rb') as file:
+            schema = json.load(file)
+        self.assertEqual(schema['info']['title'], 'LMS API')
+        self.assertIn('/courses/', schema['paths'])
+        self.assertIn('/payments/', schema['paths'])
+        parameters = {parameter['name'] for parameter in schema['paths']['/courses/']['get']['parameters']}
+        self.assertIn('page', parameters)
+        responses = schema['paths']['/payments/create/']['post']['responses']
+        self.assertEqual(responses['201']['description'], 'Payment successful')
+
+    def test_schema_served_from_file_with_etag(self):
+        """
+        Схема отдается из файла с ETag, повторный запрос с тем же ETag получает 304.
+        """
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        with open(self.schema_path, 'rb') as file:
+            self.assertEqual(b''.join(response.streaming_content), file.read())
+
+        not_modified = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.assertEqual(self.client.get('/swagger/?format=openapi').status_code, 200)
+
+    def test_schema_generated_in_memory_without_file(self):
+        """
+        Без файла схема генерируется в памяти процесса один раз.
+        """
+        self.addCleanup(setattr, views, '_generated_schema', None)
+        views._generated_schema = None
+        with override_settings(OPENAPI_SCHEMA_PATH=os.path.join(os.path.dirname(self.schema_path), 'missing.json')):
+            response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['info']['title'], 'LMS API')
+
+    def test_swagger_ui(self):
+        """
+        Страница Swagger UI загружает схему с /swagger.json.
+        """
+        response = self.client.get('/swagger/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "url: '/swagger.json'")
+        self.assertContains(response, 'drf-yasg/swagger-ui-dist/swagger-ui-bundle.js')
+
+    def test_drf_yasg_not_imported_on_startup(self):
+        """
+        Запуск Django и загрузка URLConf не импортируют drf_yasg.
+        """
+        script = (
+            'import sys, django; django.setup(); '
+            'from django.urls import get_resolver; get_resolver().url_patterns; '
+            'print(sorted(name for name in sys.modules if name.startswith("drf_yasg")))'
+        )
+        output = subprocess.check_output(
+            [sys.executable, '-c', script],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'},
+            stderr=subprocess.DEVNULL
+        )
+        self.assertEqual(output.decode().strip(), '[]')
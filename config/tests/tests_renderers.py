@@ -0,0 +1,107 @@
+import io
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from config.parsers import ORJSONParser
+from config.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    payload = {
+        'count': 2,
+        'next': None,
+        'results': [
+            {
+                'id': 1,
+                'name': 'Python-разработчик',
+                'preview': {'id': 1, 'image': '/media/courses/default.png'},
+                'lessons': [{'id': 5, 'name': 'Змейка', 'video_url': 'https://www.youtube.com/watch?v=FTtEF1KDBXo'}],
+                'subscribed': True,
+                'updated_at': '2023-07-20T21:26:27.216000+03:00',
+                'amount': '50000.00',
+            },
+            {'id': 2, 'name': 'line separator', 'ratio': 0.1, 'lessons': []},
+        ],
+    }
+
+    def test_same_bytes_as_json_renderer(self):
+        """
+        Вывод совпадает с JSONRenderer для данных, которые возвращают сериализаторы.
+        """
+        self.assertEqual(ORJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_indent(self):
+        """
+        Параметр indent в Accept включает форматированный вывод.
+        """
+        rendered = ORJSONRenderer().render({'a': [1]}, 'application/json; indent=4')
+        self.assertEqual(rendered, b'{\n  "a": [\n    1\n  ]\n}')
+
+    def test_special_types(self):
+        """
+        Decimal выводится строкой, время в UTC - с суффиксом Z, ленивые строки переводятся.
+        """
+        message = gettext_lazy('This field must be unique.')
+        rendered = ORJSONRenderer().render({
+            'cost': Decimal('50000.00'),
+            'payment_date': datetime(2023, 7, 18, 7, 5, 56, tzinfo=dt_timezone.utc),
+            'message': message,
+            1: None,
+        })
+        self.assertEqual(
+            rendered,
+            f'{{"cost":"50000.00","payment_date":"2023-07-18T07:05:56Z","message":"{message}","1":null}}'.encode()
+        )
+
+    def test_datetime_precision(self):
+        """
+        Дата и время выводятся как в JSONRenderer, без потери микросекунд.
+        """
+        values = [
+            datetime(2023, 7, 18, 7, 5, 56, 123456, tzinfo=dt_timezone.utc),
+            datetime(2023, 7, 18, 10, 5, 56, 999999, tzinfo=dt_timezone(timedelta(hours=3))),
+            datetime(2023, 7, 18, 7, 5, 56, 1000),
+            date(2023, 7, 18),
+            time(7, 5, 56, 500),
+        ]
+        self.assertEqual(ORJSONRenderer().render(values), JSONRenderer().render(values))
+        self.assertEqual(
+            ORJSONRenderer().render(values[:2]),
+            b'["2023-07-18T07:05:56.123456Z","2023-07-18T10:05:56.999999+03:00"]'
+        )
+
+    def test_none(self):
+        """
+        Для ответа без тела (например, 204) возвращаются пустые байты.
+        """
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTestCase(SimpleTestCase):
+    def parse(self, body: bytes):
+        return ORJSONParser().parse(io.BytesIO(body), 'application/json', {'encoding': 'utf-8'})
+
+    def test_parse(self):
+        """
+        Тело в UTF-8 разбирается в словарь.
+        """
+        self.assertEqual(self.parse('{"course": 1, "name": "Курс"}'.encode()), {'course': 1, 'name': 'Курс'})
+
+    def test_parse_error(self):
+        """
+        Некорректный JSON отклоняется с ParseError (ответ 400).
+        """
+        with self.assertRaises(ParseError):
+            self.parse(b'{"course": ')
+
+    def test_rejects_nan(self):
+        """
+        NaN отклоняется, как и в JSONParser.
+        """
+        with self.assertRaises(ParseError):
+            self.parse(b'{"cost": NaN}')
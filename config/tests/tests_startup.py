@@ -0,0 +1,55 @@
+import os
+
+from django.test import SimpleTestCase
+
+from config.startup import measure_startup, parse_import_time
+
+# Верхняя граница времени запуска (с накладными расходами -X importtime), с.
+STARTUP_TIME_BUDGET = float(os.getenv('STARTUP_TIME_BUDGET', '3.0'))
+
+# Пакеты, которые не должны загружаться при запуске воркеров.
+LAZY_PACKAGES = ('drf_yasg', 'pkg_resources', 'coreapi')
+
+
+class ParseImportTimeTestCase(SimpleTestCase):
+    def test_parse(self):
+        """
+        Вложенные импорты выводятся раньше родителя и с большим отступом.
+        """
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       100 |        100 |     urllib3\n'
+            'import time:        50 |        150 |   requests\n'
+            'import time:        30 |        180 | app_user.services\n'
+            'import time:        20 |         20 | redis\n'
+        )
+        records = parse_import_time(output)
+        self.assertEqual([record.name for record in records], ['urllib3', 'requests', 'app_user.services', 'redis'])
+        self.assertEqual([record.level for record in records], [2, 1, 0, 0])
+        self.assertEqual([record.parent for record in records], ['requests', 'app_user.services', None, None])
+        self.assertEqual(records[1].cumulative_us, 150)
+
+
+class StartupTimeTestCase(SimpleTestCase):
+    def assert_startup(self, target: str, **env):
+        report = measure_startup(target, env)
+        self.assertLess(report.total, STARTUP_TIME_BUDGET, report.phases)
+        loaded = {module.split('.')[0] for module in report.modules}
+        for package in LAZY_PACKAGES:
+            self.assertNotIn(package, loaded, f'{package} импортирован при запуске {target}')
+        return report
+
+    def test_wsgi_startup(self):
+        """
+        Запуск WSGI-приложения с загрузкой URLConf укладывается в бюджет
+        и не импортирует пакеты, нужные только для генерации схемы OpenAPI.
+        """
+        report = self.assert_startup('wsgi')
+        self.assertEqual(list(report.phases), ['settings', 'django.setup', 'wsgi application', 'urlconf'])
+
+    def test_celery_startup(self):
+        """
+        Запуск воркера Celery без системных проверок укладывается в бюджет.
+        """
+        report = self.assert_startup('celery', CELERY_SKIP_CHECKS='1')
+        self.assertNotIn('system checks', report.phases)
@@ -0,0 +1,86 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from kombu import Connection
+from prometheus_client import REGISTRY
+
+from app_user import tasks as user_tasks
+from app_user.models import CustomUser, Payment
+from config.celery import stamp_published_at
+from config.task_metrics import install, queue_depths, task_queues
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TaskMetricsTestCase(TestCase):
+    task_name = user_tasks.reconcile_payments.name
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create(email='ivan@example.com')
+        Payment.objects.create(user=user, amount=1000, payment_method_id='pm_1', payment_intent_id='pi_1')
+
+    def setUp(self):
+        install()
+
+    @mock.patch('app_user.services.StripeService.retrieve_payment_intent', return_value={'status': 'succeeded'})
+    def test_success(self, retrieve_payment_intent):
+        """
+        Успешное выполнение записывает длительность задачи и количество проверенных платежей.
+        """
+        duration = sample('celery_task_duration_seconds_count', task=self.task_name, state='SUCCESS')
+        checked = sample('celery_task_items_total', task=self.task_name, item='payments_checked')
+        user_tasks.reconcile_payments.apply()
+        self.assertEqual(sample('celery_task_duration_seconds_count', task=self.task_name, state='SUCCESS'),
+                         duration + 1)
+        self.assertEqual(sample('celery_task_items_total', task=self.task_name, item='payments_checked'),
+                         checked + 1)
+
+    @mock.patch('app_user.services.PaymentReconciliationService.claim_batch', side_effect=ConnectionError)
+    def test_failure(self, claim_batch):
+        failures = sample('celery_task_failures_total', task=self.task_name, exception='ConnectionError')
+        duration = sample('celery_task_duration_seconds_count', task=self.task_name, state='FAILURE')
+        with self.assertLogs('celery.app.trace', level='ERROR'):
+            user_tasks.reconcile_payments.apply()
+        self.assertEqual(sample('celery_task_failures_total', task=self.task_name, exception='ConnectionError'),
+                         failures + 1)
+        self.assertEqual(sample('celery_task_duration_seconds_count', task=self.task_name, state='FAILURE'),
+                         duration + 1)
+
+    @mock.patch('app_user.services.StripeService.retrieve_payment_intent', return_value={'status': 'processing'})
+    def test_queue_wait(self, retrieve_payment_intent):
+        """
+        Время ожидания в очереди отсчитывается от заголовка published_at, добавленного при отправке.
+        """
+        headers = {}
+        stamp_published_at(headers=headers)
+        headers['published_at'] -= 2
+        user_tasks.reconcile_payments.apply(headers=headers)
+        self.assertGreaterEqual(
+            sample('celery_task_queue_wait_seconds_sum', task=self.task_name, queue='unknown'), 2
+        )
+
+
+class QueueDepthTestCase(TestCase):
+    def test_queue_depths(self):
+        """
+        Длина очереди читается у брокера, несозданная очередь считается пустой.
+        """
+        with Connection('memory://') as connection:
+            queue = connection.SimpleQueue('email')
+            for i in range(3):
+                queue.put({'n': i})
+            self.assertEqual(queue_depths(['email', 'payments'], connection), {'email': 3, 'payments': 0})
+            queue.close()
+
+    def test_command(self):
+        self.assertEqual(task_queues(), ['default', 'email', 'media', 'payments'])
+        with mock.patch('config.task_metrics.queue_depths', return_value={'default': 0, 'email': 12}):
+            out = StringIO()
+            call_command('celery_queues', stdout=out)
+        self.assertIn('email', out.getvalue())
+        self.assertIn('12', out.getvalue())
@@ -0,0 +1,118 @@
+from unittest import mock
+
+import fakeredis
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from config.throttling import LocalTokenBucket, RedisTokenBucket, get_token_bucket, parse_rate
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def test_parse_rate(self):
+        """
+        Ставка DRF разбирается в количество запросов и период в секундах.
+        """
+        self.assertEqual(parse_rate('10/min'), (10, 60))
+        self.assertEqual(parse_rate('5/hour'), (5, 3600))
+
+    def test_burst_and_refill(self):
+        """
+        Корзина пропускает capacity запросов подряд, затем сообщает время до появления токена.
+        """
+        bucket = LocalTokenBucket()
+        with mock.patch('time.monotonic', return_value=100.0):
+            self.assertEqual([bucket.consume('key', 2, 0.5)[0] for _ in range(3)], [True, True, False])
+            self.assertEqual(bucket.consume('key', 2, 0.5), (False, 2.0))
+        with mock.patch('time.monotonic', return_value=102.0):
+            self.assertEqual(bucket.consume('key', 2, 0.5), (True, 0.0))
+
+    def test_eviction_keeps_active_buckets(self):
+        """
+        При переполнении удаляются корзины, к которым дольше всего не обращались:
+        запросы с новых адресов не сбрасывают лимит активного клиента.
+        """
+        bucket = LocalTokenBucket()
+        with mock.patch.object(bucket, 'max_buckets', 3), mock.patch('time.monotonic', return_value=100.0):
+            self.assertEqual([bucket.consume('client', 1, 0.1)[0] for _ in range(2)], [True, False])
+            for number in range(10):
+                bucket.consume(f'flood-{number}', 1, 0.1)
+                self.assertFalse(bucket.consume('client', 1, 0.1)[0])
+        self.assertEqual(list(bucket.buckets), ['flood-8', 'flood-9', 'client'])
+
+    def test_redis_unavailable(self):
+        """
+        Без Redis запросы ограничиваются корзинами в памяти процесса,
+        повторное подключение к Redis откладывается на retry_interval.
+        """
+        bucket = RedisTokenBucket('redis://127.0.0.1:1/0')
+        with self.assertLogs('config.throttling', 'WARNING') as logs:
+            self.assertEqual([bucket.consume('key', 1, 1)[0] for _ in range(2)], [True, False])
+        self.assertEqual(len(logs.output), 1)
+
+
+class RedisTokenBucketTestCase(SimpleTestCase):
+    """
+    Lua-скрипт корзины в Redis (fakeredis); время сервера Redis задается через time.time.
+    """
+    def setUp(self):
+        self.bucket = RedisTokenBucket('redis://throttle:6379/0', connection_class=fakeredis.FakeConnection)
+        self.bucket.client.flushall()
+
+    def consume(self, now: float) -> tuple:
+        with mock.patch('time.time', return_value=now):
+            return self.bucket.consume('key', 2, 0.5)
+
+    def test_burst_and_refill(self):
+        """
+        Корзина пропускает capacity запросов подряд, отказывает со временем до появления токена
+        и пополняется со скоростью refill_rate; ключ истекает, когда корзина заполнится.
+        """
+        self.assertEqual([self.consume(1000.0)[0] for _ in range(2)], [True, True])
+        self.assertEqual(self.consume(1000.0), (False, 2.0))
+        self.assertEqual(self.consume(1001.0), (False, 1.0))
+        self.assertEqual(self.consume(1002.0), (True, 0.0))
+        with mock.patch('time.time', return_value=1002.0):
+            self.assertEqual(self.bucket.client.pttl('key'), 5000)
+        # Через 4 с корзина снова полна: пропускает 2 запроса, а не больше.
+        self.assertEqual([self.consume(1006.0)[0] for _ in range(3)], [True, True, False])
+        self.assertEqual(self.bucket.buckets, {})
+
+
+REST_FRAMEWORK = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'register': '2/min'},
+}
+
+
+@override_settings(REST_FRAMEWORK=REST_FRAMEWORK)
+class RegisterThrottleTestCase(TestCase):
+    def setUp(self):
+        get_token_bucket().reset()
+
+    def register(self, client: APIClient, number: int):
+        return client.post('/api/register/', {
+            'email': f'user{number}@example.com', 'password': 'qwerty123!', 'password2': 'qwerty123!',
+            'first_name': 'Ivan', 'last_name': 'Ivanov', 'phone': '+7(981)789-09-89', 'city': 'Moscow',
+        })
+
+    def test_retry_after(self):
+        """
+        Третья регистрация за минуту с одного адреса отклоняется с Retry-After до появления токена (30 с).
+        """
+        client = APIClient()
+        self.assertEqual([self.register(client, i).status_code for i in range(2)], [status.HTTP_201_CREATED] * 2)
+        response = self.register(client, 2)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_keyed_by_ip(self):
+        """
+        Анонимные запросы ограничиваются по IP-адресу: другой адрес получает свою корзину.
+        """
+        client = APIClient()
+        for i in range(2):
+            self.register(client, i)
+        other_client = APIClient(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(self.register(other_client, 2).status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,11 @@
+from django.test.utils import CaptureQueriesContext
+
+
+def writes(queries: CaptureQueriesContext) -> list:
+    """
+    Возвращает изменяющие запросы (UPDATE, INSERT, DELETE) из перехваченных запросов.
+
+    :param queries: Перехваченные запросы.
+    """
+    sql = [query['sql'].strip() for query in queries]
+    return [query for query in sql if query.startswith(('UPDATE', 'INSERT', 'DELETE'))]
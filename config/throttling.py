@@ -0,0 +1,178 @@
+"""
+Ограничение частоты запросов алгоритмом token bucket.
+
+Корзина вмещает N токенов и пополняется со скоростью N токенов за период (ставка 'N/период'
+из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']): клиент может выполнить до N запросов подряд,
+после чего - не чаще, чем позволяет скорость пополнения. Состояние корзин хранится в Redis
+и изменяется атомарно Lua-скриптом; если Redis недоступен, используются корзины в памяти процесса.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Разбирает ставку в формате DRF ('10/min', '5/hour') и возвращает (количество запросов, период в секундах).
+    """
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class LocalTokenBucket:
+    """
+    Корзины в памяти процесса. Лимит действует отдельно в каждом воркере.
+    Корзины хранятся в порядке последнего обращения: при превышении max_buckets удаляется корзина,
+    к которой дольше всего не обращались, поэтому поток запросов с новых адресов не сбрасывает
+    лимиты активных клиентов.
+    """
+    max_buckets = 100_000
+
+    def __init__(self, location: Optional[str] = None, **options):
+        self.buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float]:
+        """
+        Забирает токен из корзины. Возвращает (разрешен ли запрос, через сколько секунд появится токен).
+
+        :param key: Ключ корзины.
+        :param capacity: Вместимость корзины.
+        :param refill_rate: Скорость пополнения, токенов в секунду.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated_at = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            while len(self.buckets) >= self.max_buckets:
+                self.buckets.popitem(last=False)
+            self.buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (1 - tokens) / refill_rate
+
+    def reset(self) -> None:
+        with self.lock:
+            self.buckets.clear()
+
+
+class RedisTokenBucket(LocalTokenBucket):
+    """
+    Корзины в Redis: лимит общий для всех воркеров. Время берется с сервера Redis,
+    поэтому расхождение часов воркеров не влияет на пополнение.
+    При ошибке Redis запросы ограничиваются корзинами в памяти процесса,
+    следующая попытка обратиться к Redis - через retry_interval секунд.
+    """
+    retry_interval = 5
+    script = """
+        local capacity = tonumber(ARGV[1])
+        local refill_rate = tonumber(ARGV[2])
+        local server_time = redis.call('TIME')
+        local now = tonumber(server_time[1]) + tonumber(server_time[2]) / 1000000
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+        local tokens = tonumber(bucket[1]) or capacity
+        local updated_at = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+        local allowed = 0
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        else
+            wait = (1 - tokens) / refill_rate
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill_rate * 1000) + 1000)
+        return {allowed, tostring(wait)}
+    """
+
+    def __init__(self, location: Optional[str] = None, **options):
+        super().__init__(location, **options)
+        options.setdefault('socket_timeout', 0.1)
+        options.setdefault('socket_connect_timeout', 0.1)
+        self.client = redis.Redis.from_url(location, **options)
+        self.consume_script = self.client.register_script(self.script)
+        self.unavailable_until = 0.0
+
+    def consume(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float]:
+        if time.monotonic() >= self.unavailable_until:
+            try:
+                allowed, wait = self.consume_script(keys=[key], args=[capacity, refill_rate])
+                return bool(allowed), float(wait)
+            except redis.RedisError as error:
+                logger.warning(f'Redis недоступен, лимиты запросов действуют в памяти процесса: {error}')
+                self.unavailable_until = time.monotonic() + self.retry_interval
+        return super().consume(key, capacity, refill_rate)
+
+
+_bucket: Optional[LocalTokenBucket] = None
+
+
+def get_token_bucket() -> LocalTokenBucket:
+    """
+    Возвращает хранилище корзин, настроенное в settings.THROTTLE_BUCKETS.
+    """
+    global _bucket
+    if _bucket is None:
+        config = dict(settings.THROTTLE_BUCKETS)
+        backend = import_string(config.pop('BACKEND'))
+        _bucket = backend(config.pop('LOCATION', None), **config.pop('OPTIONS', {}))
+    return _bucket
+
+
+@receiver(setting_changed)
+def reset_token_bucket(setting: str, **kwargs) -> None:
+    """
+    Сбрасывает хранилище корзин при изменении настроек (например, в тестах).
+    """
+    global _bucket
+    if setting == 'THROTTLE_BUCKETS':
+        _bucket = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ограничивает запросы к представлениям с атрибутом throttle_scope по ставке
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][throttle_scope]. Аутентифицированные
+    пользователи ограничиваются по ID, анонимные - по IP-адресу.
+    Ответ 429 содержит заголовок Retry-After - время до появления токена.
+    """
+    def __init__(self):
+        self.retry_after: Optional[float] = None
+
+    def allow_request(self, request: Any, view: Any) -> bool:
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        try:
+            rate = api_settings.DEFAULT_THROTTLE_RATES[scope]
+        except KeyError:
+            raise ImproperlyConfigured(f'No default throttle rate set for "{scope}" scope')
+        capacity, period = parse_rate(rate)
+
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        allowed, self.retry_after = get_token_bucket().consume(f'throttle:{scope}:{ident}', capacity,
+                                                               capacity / period)
+        return allowed
+
+    def wait(self) -> Optional[float]:
+        return self.retry_after
@@ -2,28 +2,17 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="LMS API",
-        default_version='v1',
-        description="API для платформы обучения"
-    ),
-    public=True,
-    permission_classes=(AllowAny,),
-    authentication_classes=(JWTAuthentication,),
-)
+from .views import metrics, openapi_schema, swagger_ui
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('app_image.urls')),
     path('api/', include('app_course.urls')),
     path('api/', include('app_user.urls')),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('swagger/', swagger_ui, name='schema-swagger-ui'),
+    path('swagger.json', openapi_schema, name='openapi-schema'),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,94 @@
+import hashlib
+import ipaddress
+import logging
+import os
+from typing import Optional
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+logger = logging.getLogger(__name__)
+
+_generated_schema: Optional[bytes] = None
+
+
+def get_generated_schema() -> bytes:
+    """
+    Возвращает схему OpenAPI, сгенерированную в памяти процесса.
+    Используется, если файл схемы не был создан командой generate_openapi_schema.
+    """
+    global _generated_schema
+    if _generated_schema is None:
+        from .schema import generate_schema
+
+        logger.warning(f'Файл схемы OpenAPI {settings.OPENAPI_SCHEMA_PATH} не найден, схема генерируется в памяти')
+        _generated_schema = generate_schema()
+    return _generated_schema
+
+
+def schema_etag(request: HttpRequest, *args, **kwargs) -> str:
+    """
+    Возвращает ETag схемы OpenAPI.
+    Для файла схемы ETag строится по времени изменения и размеру файла без его чтения.
+    """
+    try:
+        stat = os.stat(settings.OPENAPI_SCHEMA_PATH)
+    except FileNotFoundError:
+        return hashlib.md5(get_generated_schema()).hexdigest()
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+@require_safe
+@condition(etag_func=schema_etag)
+def openapi_schema(request: HttpRequest) -> HttpResponse:
+    """
+    Отдает схему OpenAPI из файла, созданного командой generate_openapi_schema.
+    Клиент с актуальным ETag получает ответ 304 без тела.
+    """
+    try:
+        response = FileResponse(open(settings.OPENAPI_SCHEMA_PATH, 'rb'), content_type='application/json')
+    except FileNotFoundError:
+        response = HttpResponse(get_generated_schema(), content_type='application/json')
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+@require_safe
+def swagger_ui(request: HttpRequest) -> HttpResponse:
+    """
+    Отдает страницу Swagger UI, которая загружает схему с эндпоинта openapi_schema.
+    Запрос с параметром format=openapi возвращает саму схему (как раньше в drf_yasg).
+    """
+    if request.GET.get('format') == 'openapi':
+        return openapi_schema(request)
+    return render(request, 'swagger-ui.html', {'schema_url': reverse('openapi-schema')})
+
+
+def is_metrics_client(request: HttpRequest) -> bool:
+    """
+    Проверяет, входит ли адрес клиента в сети METRICS_ALLOWED_NETWORKS.
+    """
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+@require_safe
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Отдает метрики Prometheus (всех воркеров gunicorn в многопроцессном режиме).
+    Для адресов вне METRICS_ALLOWED_NETWORKS эндпоинт не существует (404).
+    """
+    if not is_metrics_client(request):
+        raise Http404
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    from .metrics import metrics_registry
+
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)